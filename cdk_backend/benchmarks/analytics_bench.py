@@ -0,0 +1,179 @@
+"""
+Offline throughput benchmark: per-record vs batched analytics ingestion.
+
+Pushes synthetic interaction records through logclassifier against a
+moto-mocked DynamoDB table, once per event shape:
+
+- single-record: one invocation and one `put_item` per record (the async-invoke path)
+- sqs batch:     `navigator.analytics.LocalQueue` SQS batches, with redelivery
+- kinesis batch: Kinesis events of --batch-size base64-encoded records
+- list batch:    direct invokes with a list of --batch-size records
+
+Batched shapes write with `BatchWriteItem` in chunks of 25. With
+--unprocessed-rate, that share of every BatchWriteItem is returned as
+UnprocessedItems to exercise the retry path. Reported per shape: records/s
+and records per invocation.
+
+Requires `moto` (pip install moto).
+
+Usage:
+    python benchmarks/analytics_bench.py [--records 2000] [--batch-size 100] [--unprocessed-rate 0.1]
+"""
+
+import argparse
+import base64
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "shared", "python"))
+
+import boto3  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+from navigator.analytics import LocalQueue, interaction_record  # noqa: E402
+
+TABLE = "NCMWBenchSessionLogs"
+HANDLER_PATH = os.path.join(os.path.dirname(__file__), "..", "lambda", "logclassifier", "handler.py")
+
+
+def load_logclassifier():
+    os.environ["DYNAMODB_TABLE"] = TABLE
+    spec = importlib.util.spec_from_file_location("logclassifier_handler", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.BATCH_WRITE_BASE_DELAY = 0  # measure work, not backoff sleeps
+    return module
+
+
+def stored_rows(table):
+    """Rows in the table; a scan page stops at 1 MB, so Count is summed over every page."""
+    pages = table.meta.client.get_paginator("scan").paginate(TableName=table.name, Select="COUNT")
+    return sum(page["Count"] for page in pages)
+
+
+def create_table():
+    ddb = boto3.resource("dynamodb", region_name="us-east-1")
+    return ddb.create_table(
+        TableName=TABLE,
+        KeySchema=[{"AttributeName": "session_id", "KeyType": "HASH"},
+                   {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "session_id", "AttributeType": "S"},
+                              {"AttributeName": "timestamp", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def synthetic_records(rng, count):
+    return [
+        interaction_record(f"session-{rng.randrange(count // 4 + 1)}", f"How do I renew my certification? #{i}",
+                           "Renewal is available online. " * rng.randint(2, 20), user_role=rng.choice(
+                               ["learner", "instructor", "staff"]))
+        for i in range(count)
+    ]
+
+
+def flaky_batch_writes(client, rng, rate):
+    """Wrap batch_write_item so `rate` of each request comes back unprocessed."""
+    original = client.batch_write_item
+    calls = {"n": 0}
+
+    def batch_write_item(RequestItems):
+        calls["n"] += 1
+        table, requests = next(iter(RequestItems.items()))
+        kept = [r for r in requests if rng.random() >= rate]
+        dropped = [r for r in requests if r not in kept]
+        resp = original(RequestItems={table: kept}) if kept else {"UnprocessedItems": {}}
+        if dropped:
+            resp["UnprocessedItems"] = {table: dropped}
+        return resp
+
+    client.batch_write_item = batch_write_item
+    return calls
+
+
+def kinesis_events(records, batch_size):
+    for start in range(0, len(records), batch_size):
+        yield {"Records": [
+            {"eventSource": "aws:kinesis",
+             "kinesis": {"sequenceNumber": str(start + i),
+                         "data": base64.b64encode(json.dumps(r).encode("utf-8")).decode("ascii")}}
+            for i, r in enumerate(records[start:start + batch_size])
+        ]}
+
+
+def list_events(records, batch_size):
+    for start in range(0, len(records), batch_size):
+        yield [dict(r) for r in records[start:start + batch_size]]
+
+
+def run_events(handler, events):
+    """Invoke once per event, redelivering failed records like the event source would."""
+    invocations = 0
+    for event in events:
+        while event:
+            invocations += 1
+            result = handler.lambda_handler(event, None)
+            if isinstance(event, list):
+                statuses = json.loads(result["body"])["results"]
+                event = [event[int(r["id"])] for r in statuses if r["status"] == handler.FAILED]
+            else:
+                failed = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+                event = {"Records": [r for r in event["Records"]
+                                     if r["kinesis"]["sequenceNumber"] in failed]} if failed else None
+    return invocations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100, help="records per batched invocation")
+    parser.add_argument("--unprocessed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    rng = random.Random(3)
+    records = synthetic_records(rng, args.records)
+    rows = []
+
+    with mock_aws(), contextlib.redirect_stdout(io.StringIO()):
+        handler = load_logclassifier()
+        calls = flaky_batch_writes(handler.ddb.meta.client, rng, args.unprocessed_rate)
+
+        def measure(name, run):
+            table = create_table()
+            calls["n"] = 0
+            started = time.perf_counter()
+            invocations = run()
+            elapsed = time.perf_counter() - started
+            rows.append((name, invocations, calls["n"] or args.records, elapsed,
+                         stored_rows(table)))
+            table.delete()
+
+        measure("single-record", lambda: [handler.lambda_handler(dict(r), None) for r in records] and len(records))
+
+        def sqs():
+            queue = LocalQueue()
+            queue.send_message_batch(Entries=[{"Id": str(i), "MessageBody": json.dumps(r)}
+                                              for i, r in enumerate(records)])
+            return queue.drain(handler.lambda_handler, batch_size=args.batch_size)["batches"]
+
+        measure("sqs batch", sqs)
+        measure("kinesis batch", lambda: run_events(handler, kinesis_events(records, args.batch_size)))
+        measure("list batch", lambda: run_events(handler, list_events(records, args.batch_size)))
+
+    print(f"records: {args.records}  batch size: {args.batch_size}  unprocessed rate: {args.unprocessed_rate}")
+    print(f"{'mode':<14} {'invocations':>12} {'ddb calls':>10} {'records/s':>10} {'per invoke':>11} {'stored':>8}")
+    for name, invocations, ddb_calls, elapsed, stored in rows:
+        print(f"{name:<14} {invocations:>12} {ddb_calls:>10} {args.records / elapsed:>10.0f} "
+              f"{args.records / invocations:>11.1f} {stored:>8}")
+    assert all(stored == args.records for *_, stored in rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark: citation de-duplication for large knowledge-base traces.
+
+Replays synthetic orchestration traces through the citation code previously
+inlined in chatResponseHandler (rebuilds the set of known sources on every
+lookup) and streamingHandler (list comprehension per reference), and through
+`navigator.citations.CitationIndex`.
+
+Usage:
+    python benchmarks/citations_bench.py [--references 500] [--lookups 25] [--documents 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "shared", "python"))
+
+from navigator.citations import CitationIndex, kb_lookup_references  # noqa: E402
+
+
+def trace_event(refs):
+    return {'trace': {'trace': {'orchestrationTrace': {'observation': {
+        'knowledgeBaseLookupOutput': {'retrievedReferences': refs}}}}}}
+
+
+def synthetic_trace(rng, references, lookups, documents):
+    per_lookup = max(1, references // lookups)
+    events = []
+    for _ in range(lookups):
+        refs = []
+        for _ in range(per_lookup):
+            doc = rng.randrange(documents)
+            refs.append({
+                'location': {'type': 'S3', 's3Location': {'uri': f's3://national-council/docs/doc-{doc}.pdf'}},
+                'content': {'text': 'MHFA course material ' * 40},
+            })
+        events.append(trace_event(refs))
+    return events
+
+
+def legacy_chat(events):
+    citations = []
+    for event in events:
+        retrieved_refs = kb_lookup_references(event)
+        citation_info = {'text': '', 'references': []}
+        seen_sources = set()
+        for ref in retrieved_refs:
+            uri = ref.get('location', {}).get('s3Location', {}).get('uri', '')
+            if uri and uri not in seen_sources:
+                citation_info['references'].append({'source': uri, 'title': uri.split('/')[-1]})
+                seen_sources.add(uri)
+        if citation_info['references']:
+            existing_sources = set()
+            for existing_citation in citations:
+                for r in existing_citation.get('references', []):
+                    existing_sources.add(r.get('source', ''))
+            new_refs = [r for r in citation_info['references'] if r['source'] not in existing_sources]
+            if new_refs:
+                citation_info['references'] = new_refs
+                citations.append(citation_info)
+    return citations
+
+
+def legacy_sse(events):
+    citations = []
+    for event in events:
+        for ref in kb_lookup_references(event):
+            uri = ref.get('location', {}).get('s3Location', {}).get('uri', '')
+            if uri and uri not in [c.get('uri') for c in citations]:
+                citations.append({'uri': uri, 'content': ref.get('content', {}).get('text', '')[:200]})
+    return citations
+
+
+def indexed(events, shape):
+    index = CitationIndex()
+    for event in events:
+        index.add_trace_references(kb_lookup_references(event))
+    return index.as_citations() if shape == 'chat' else index.as_sources()
+
+
+def timed(fn, traces, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for events in traces:
+            result = fn(events)
+        best = min(best, time.perf_counter() - start)
+    return best / len(traces), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--references", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=25)
+    parser.add_argument("--documents", type=int, default=200, help="distinct documents in the KB")
+    parser.add_argument("--traces", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    traces = [synthetic_trace(rng, args.references, args.lookups, args.documents)
+              for _ in range(args.traces)]
+
+    rows = [
+        ("chat legacy", lambda ev: legacy_chat(ev)),
+        ("chat CitationIndex", lambda ev: indexed(ev, 'chat')),
+        ("sse legacy", lambda ev: legacy_sse(ev)),
+        ("sse CitationIndex", lambda ev: indexed(ev, 'sse')),
+    ]
+    results = {}
+    print(f"references/trace: {args.references}  lookups/trace: {args.lookups}  documents: {args.documents}")
+    print(f"{'implementation':<22} {'us/trace':>10} {'citations':>10}")
+    for name, fn in rows:
+        per_trace, out = timed(fn, traces, args.repeat)
+        results[name] = out
+        count = sum(len(c['references']) for c in out) if name.startswith('chat') else len(out)
+        print(f"{name:<22} {per_trace * 1e6:>10.1f} {count:>10}")
+
+    assert results["chat legacy"] == results["chat CitationIndex"]
+    assert results["sse legacy"] == results["sse CitationIndex"]
+    print("outputs identical to legacy implementations")
+
+
+if __name__ == "__main__":
+    main()
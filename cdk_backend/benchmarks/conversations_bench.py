@@ -0,0 +1,252 @@
+"""
+Offline benchmark: read cost, peak memory and latency of the analytics window read.
+
+Seeds a moto-mocked session log table (with the DayIndex GSI) with --rows
+conversations (answers of --response-chars characters) spread over the last
+--days days, then reads every timeframe three ways:
+
+- one-phase scan:      the former pipeline, reproduced here. Scan with `query`
+                       and `response` projected, keep every row, sort them all,
+                       slice the newest 50
+- two-phase scan:      retrieveSessionLogs as deployed, without the index. Narrow
+                       key-only projection folded into a WindowAggregate (bounded
+                       top-K heap), then BatchGetItem for the 50 bodies it returns
+- two-phase day index: the same over the DayIndex, which projects only
+                       location and user_role
+
+Reported per timeframe and pipeline, after one warm-up call each:
+
+- read MB: size of the items DynamoDB returned to the function (JSON), what
+           the network transfer and deserialization scale with
+- RCU:     read capacity billed, estimated from the mean item size of the
+           table and of the index: 0.5 per started 4 KB of the items a scan or
+           query evaluated (projection and filter do not reduce it), per item
+           for BatchGetItem
+- bodies:  the index RCU if the index projected `query` and `response` too
+- peak MB: tracemalloc peak during the call
+- ms:      wall time
+
+A scan is billed on whole rows, so the narrow projection saves transfer and
+memory there, not RCU. RCU only falls where the rows read are small: the
+index without the bodies. moto runs in-process, so peak memory also counts
+its own per-page copies of the projected rows, and wall time is mostly moto
+evaluating the scan filter or walking the table for each index query. All
+pipelines must return the same conversations.
+
+Requires `moto` (pip install moto).
+
+Usage:
+    python benchmarks/conversations_bench.py [--rows 5000] [--days 365] [--response-chars 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from boto3.dynamodb.conditions import Attr  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+from day_index_bench import (  # noqa: E402
+    FEEDBACK_TABLE, INDEXED_SINCE, TABLE, TIMEFRAMES, create_tables, load_handler,
+)
+from navigator.session_logs import scan_pages  # noqa: E402
+
+# Attributes of a DayIndex item: table and index keys plus the projected ones
+INDEX_ATTRIBUTES = ("session_id", "timestamp", "day_bucket", "original_ts", "location", "user_role")
+SENTENCE = "Renewal is available online through the MHFA Connect portal. "
+
+
+def seed(table, logclassifier, rows, days, response_chars, rng):
+    now = datetime.utcnow()
+    span = days * 86400
+    response = (SENTENCE * (response_chars // len(SENTENCE) + 1))[:response_chars]
+    with table.batch_writer() as writer:
+        for i in range(rows):
+            ts = now - timedelta(seconds=span * i / rows + rng.random())
+            writer.put_item(Item=logclassifier.build_item({
+                "session_id": f"session-{i // 4}",
+                "timestamp": ts.isoformat(),
+                "query": f"How do I renew my certification? #{i}",
+                "response": response,
+                "location": rng.choice(["Charlotte", "Raleigh", "Durham", "Asheville"]),
+                "record_id": f"{i:08x}",
+            }))
+
+
+def item_size(item):
+    """Approximate DynamoDB size of an item: attribute names plus values."""
+    return sum(len(name) + len(str(value).encode()) for name, value in item.items())
+
+
+def read_units(size):
+    """RCU of an eventually consistent read of `size` bytes."""
+    return math.ceil(size / 4096) / 2
+
+
+class ReadCounter:
+    """
+    Forwards `scan` / `query` / `batch_get_item`, including calls through a
+    Table's `meta.client`, and adds up the JSON size of the items returned
+    (`bytes`) and the estimated RCU billed (`units`, and `units_bodies` with
+    index items as large as table rows). `sizes` maps None (the table) and
+    index names to their mean item size.
+    """
+
+    def __init__(self, target, sizes, counter=None):
+        self.target = target
+        self.sizes = sizes
+        self.counter = counter or self
+        self.lock = threading.Lock()
+        self.reset()
+        if counter is None and hasattr(target, "name"):
+            self.name = target.name
+            self.meta = SimpleNamespace(client=ReadCounter(target.meta.client, sizes, counter=self))
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+    def reset(self):
+        self.bytes, self.units, self.units_bodies = 0, 0, 0
+
+    def _count(self, items, units, units_bodies):
+        size = len(json.dumps(items, default=str))
+        with self.counter.lock:
+            self.counter.bytes += size
+            self.counter.units += units
+            self.counter.units_bodies += units_bodies
+
+    def _evaluated(self, resp, index):
+        scanned = resp.get("ScannedCount", 0)
+        self._count(resp.get("Items", []), read_units(scanned * self.sizes[index]),
+                    read_units(scanned * self.sizes[None]))
+        return resp
+
+    def scan(self, **kwargs):
+        return self._evaluated(self.target.scan(**kwargs), kwargs.get("IndexName"))
+
+    def query(self, **kwargs):
+        return self._evaluated(self.target.query(**kwargs), kwargs.get("IndexName"))
+
+    def batch_get_item(self, **kwargs):
+        resp = self.target.batch_get_item(**kwargs)
+        units = sum(len(items) for items in resp.get("Responses", {}).values()) * read_units(self.sizes[None])
+        self._count(resp.get("Responses", {}), units, units)
+        return resp
+
+
+def window(timeframe, now):
+    start = {
+        "today": datetime(now.year, now.month, now.day),
+        "weekly": (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0),
+        "monthly": datetime(now.year, now.month, 1),
+        "yearly": datetime(now.year, 1, 1),
+    }[timeframe]
+    return start, now
+
+
+def one_phase(table, timeframe):
+    start, end = window(timeframe, datetime.utcnow())
+    kwargs = {
+        "FilterExpression": Attr("original_ts").between(start.isoformat(), end.isoformat()),
+        "ProjectionExpression": "session_id, #loc, #q, #r, original_ts",
+        "ExpressionAttributeNames": {"#loc": "location", "#q": "query", "#r": "response"},
+    }
+    items = []
+    while True:
+        resp = table.scan(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    conversations = [{"session_id": it["session_id"], "timestamp": it["original_ts"],
+                      "query": it["query"], "response": it["response"]} for it in items]
+    conversations.sort(key=lambda c: c["timestamp"], reverse=True)
+    return conversations[:50]
+
+
+def two_phase(handler, timeframe, day_index):
+    handler.DAY_INDEX = day_index
+    with contextlib.redirect_stdout(io.StringIO()):
+        resp = handler.lambda_handler({"queryStringParameters": {"timeframe": timeframe}}, None)
+    return [{k: c[k] for k in ("session_id", "timestamp", "query", "response")}
+            for c in json.loads(resp["body"])["conversations"]]
+
+
+def mean_sizes(table):
+    """{None: mean table item size, 'DayIndex': mean index item size}."""
+    items = [item for page in scan_pages(table) for item in page]
+    indexed = [{k: it[k] for k in INDEX_ATTRIBUTES if k in it} for it in items if it.get("day_bucket")]
+    return {None: sum(map(item_size, items)) / len(items),
+            "DayIndex": sum(map(item_size, indexed)) / max(len(indexed), 1)}
+
+
+def measure(counters, fn, *args):
+    fn(*args)   # warm container: clients, models and imports already loaded
+    for counter in counters:
+        counter.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    read = sum(counter.bytes for counter in counters)
+    units = sum(counter.units for counter in counters)
+    units_bodies = sum(counter.units_bodies for counter in counters)
+    return result, read / 2**20, units, units_bodies, peak / 2**20, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--response-chars", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "DYNAMODB_TABLE": TABLE,
+                       "FEEDBACK_TABLE": FEEDBACK_TABLE, "DAY_INDEX": "DayIndex",
+                       "DAY_INDEX_SINCE": INDEXED_SINCE})
+    os.environ.pop("ROLLUP_TABLE", None)
+
+    rows = []
+    with mock_aws():
+        table = create_tables()
+        logclassifier = load_handler("logclassifier")
+        handler = load_handler("retrieveSessionLogs")
+        seed(table, logclassifier, args.rows, args.days, args.response_chars, random.Random(11))
+        sizes = mean_sizes(table)
+        counted_table = ReadCounter(table, sizes)
+        handler.table = ReadCounter(table, sizes)
+        handler.ddb = ReadCounter(handler.ddb, sizes)
+
+        for timeframe in TIMEFRAMES:
+            baseline, *one = measure([counted_table], one_phase, counted_table, timeframe)
+            rows.append((timeframe, "one-phase", "scan", *one))
+            for path, day_index in (("scan", ""), ("day index", "DayIndex")):
+                lazy, *two = measure([handler.table, handler.ddb], two_phase, handler, timeframe, day_index)
+                assert baseline == lazy, f"{timeframe} ({path}): conversations differ"
+                rows.append((timeframe, "two-phase", path, *two))
+
+    print(f"rows: {args.rows}  days: {args.days}  response: {args.response_chars} chars  "
+          f"item: {sizes[None]:.0f} B  index item: {sizes['DayIndex']:.0f} B")
+    print(f"{'timeframe':<10} {'pipeline':<10} {'path':<10} {'read MB':>8} {'RCU':>8} {'bodies':>8} "
+          f"{'peak MB':>8} {'ms':>8}")
+    for timeframe, name, path, read_mb, units, units_bodies, peak_mb, elapsed in rows:
+        bodies = f"{units_bodies:>8.1f}" if path == "day index" else f"{'-':>8}"
+        print(f"{timeframe:<10} {name:<10} {path:<10} {read_mb:>8.2f} {units:>8.1f} {bodies} "
+              f"{peak_mb:>8.1f} {elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Offline benchmark: cost of fetching deep pages of conversations.
+
+Seeds a moto-mocked session log table (with the DayIndex GSI) with --rows
+conversation rows spread over the last --days days, then walks the whole
+window with the conversations endpoint, --limit rows per page, following
+`next_cursor` to the end (optionally with a --location filter). The pages,
+concatenated, must equal the window's rows sorted newest first.
+
+Reported for the first page and every page at the sampled --depths:
+
+- cursor:   the conversations endpoint. Rows DynamoDB read for that page
+            (`ScannedCount`), Queries issued and wall time
+- cap:      what the analytics endpoint would have to do to reach the same
+            page: retrieveSessionLogs with CONVERSATIONS_LIMIT raised to
+            depth * limit, reading the whole window every time
+
+moto evaluates every GSI query by walking the whole table, so wall time
+grows with the Queries a page issues rather than with the rows it reads. The
+point is that both stay flat as pages get deeper, while the raised cap grows
+with the window.
+
+Requires `moto` (pip install moto).
+
+Usage:
+    python benchmarks/conversations_paging_bench.py [--rows 5000] [--days 90] [--limit 25] [--depths 1,10,50,100] [--location Raleigh]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from moto import mock_aws  # noqa: E402
+
+from day_index_bench import (  # noqa: E402
+    FEEDBACK_TABLE, INDEXED_SINCE, TABLE, CountingTable, create_tables, load_handler, seed,
+)
+from navigator.session_logs import scan_pages  # noqa: E402
+
+
+def call(handler, params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        resp = handler.lambda_handler({"queryStringParameters": params}, None)
+    assert resp["statusCode"] == 200, resp["body"]
+    return json.loads(resp["body"])
+
+
+def walk(handler, table, limit, location):
+    """Every page of the window: [(conversations, rows read, queries, ms)]."""
+    params = {"limit": str(limit)}
+    if location:
+        params["location"] = location
+    pages = []
+    while True:
+        handler.table = counting = CountingTable(table)
+        started = time.perf_counter()
+        body = call(handler, params)
+        elapsed = (time.perf_counter() - started) * 1000
+        pages.append((body["conversations"], counting.scanned, counting.queries, elapsed))
+        if not body["next_cursor"]:
+            return pages
+        params = {"limit": str(limit), "cursor": body["next_cursor"]}
+
+
+def raised_cap(handler, table, days, top):
+    """Rows read and ms of the analytics endpoint returning the newest `top` conversations."""
+    handler.CONVERSATIONS_LIMIT = top
+    handler.table = counting = CountingTable(table)
+    started = time.perf_counter()
+    call(handler, {"timeframe": "custom", "start_date": days[0], "end_date": days[1]})
+    return counting.scanned, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--limit", type=int, default=25, help="rows per page")
+    parser.add_argument("--depths", default="1,10,50,100", help="pages to report, comma-separated")
+    parser.add_argument("--location", default="", help="browse one location only")
+    args = parser.parse_args()
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "DYNAMODB_TABLE": TABLE,
+                       "FEEDBACK_TABLE": FEEDBACK_TABLE, "DAY_INDEX": "DayIndex",
+                       "DAY_INDEX_SINCE": INDEXED_SINCE, "DEFAULT_WINDOW_DAYS": str(args.days)})
+    for name in ("ROLLUP_TABLE", "FEEDBACK_SESSION_INDEX"):
+        os.environ.pop(name, None)
+    depths = sorted({int(d) for d in args.depths.split(",") if d})
+
+    with mock_aws():
+        table = create_tables()
+        seed(table, load_handler("logclassifier"), args.rows, args.days, random.Random(5))
+        conversations = load_handler("conversations")
+        analytics = load_handler("retrieveSessionLogs")
+        analytics.FEEDBACK_SESSION_INDEX = ""
+
+        pages = walk(conversations, table, args.limit, args.location)
+        first = call(conversations, {"limit": "1"})
+        window = (first["start_date"], first["end_date"])
+
+        everything = [item for page in scan_pages(table) for item in page]
+        expected = sorted((it for it in everything if window[0] <= it["original_ts"][:10] <= window[1]
+                           and (not args.location or it.get("location") == args.location)),
+                          key=lambda it: it["original_ts"], reverse=True)
+        got = [(c["session_id"], c["timestamp"]) for page, *_ in pages for c in page]
+        assert got == [(it["session_id"], it["original_ts"]) for it in expected], "pages differ from the window"
+
+        rows = []
+        for depth in depths:
+            if depth > len(pages):
+                continue
+            _, scanned, queries, elapsed = pages[depth - 1]
+            cap_scanned, cap_elapsed = raised_cap(analytics, table, window, depth * args.limit)
+            rows.append((depth, scanned, queries, elapsed, cap_scanned, cap_elapsed))
+
+    print(f"rows: {args.rows}  days: {args.days}  limit: {args.limit}  location: {args.location or 'any'}  "
+          f"pages: {len(pages)}  conversations: {len(got)}")
+    print(f"{'page':>6} {'cursor read':>12} {'queries':>8} {'ms':>8} {'cap read':>10} {'cap ms':>8}")
+    for depth, scanned, queries, elapsed, cap_scanned, cap_elapsed in rows:
+        print(f"{depth:>6} {scanned:>12} {queries:>8} {elapsed:>8.0f} {cap_scanned:>10} {cap_elapsed:>8.0f}")
+    mean = sum(p[3] for p in pages) / len(pages)
+    print(f"all pages: mean {mean:.0f} ms, max {max(p[3] for p in pages):.0f} ms, "
+          f"max {max(p[2] for p in pages)} queries per page")
+
+
+if __name__ == "__main__":
+    main()
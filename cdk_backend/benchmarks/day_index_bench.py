@@ -0,0 +1,192 @@
+"""
+Offline benchmark: analytics reads by table scan vs day-index queries.
+
+Seeds a moto-mocked session log table (with the DayIndex GSI) with --rows
+conversation rows spread evenly over the last --days days, built by
+logclassifier's `build_item` so they carry `day_bucket`. Then runs
+retrieveSessionLogs for each timeframe twice: with DAY_INDEX unset (the
+filtered scan) and set (one Query per day and shard).
+
+Reported per timeframe and path:
+
+- rows read:  rows DynamoDB had to read (`ScannedCount`), which is what read
+              capacity is billed on
+- @project:   rows read scaled linearly to --project-rows (default 1M): the
+              scan reads the whole table, the index reads the window's share
+- returned:   rows in the window
+- ms:         handler wall time under moto
+
+moto evaluates every GSI query by walking the whole table, so its index path
+costs O(table) per day queried and its wall time is no guide (a 1M-row seed
+would need hours for the yearly window). Rows read is the measure to compare;
+it scales linearly, which is why the seed defaults to 20k rows.
+
+Requires `moto` (pip install moto).
+
+Usage:
+    python benchmarks/day_index_bench.py [--rows 20000] [--project-rows 1000000] [--days 365] [--shards 1]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+sys.path.insert(0, os.path.join(LAMBDA_DIR, "shared", "python"))
+
+import boto3  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+TABLE = "NCMWBenchSessionLogs"
+FEEDBACK_TABLE = "NCMWBenchFeedback"
+TIMEFRAMES = ("today", "weekly", "monthly", "yearly")
+# Every seeded row is written with day_bucket, so the index covers the whole table
+INDEXED_SINCE = "2000-01-01"
+
+
+def load_handler(name):
+    spec = importlib.util.spec_from_file_location(f"{name}_handler", os.path.join(LAMBDA_DIR, name, "handler.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_tables():
+    ddb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = ddb.create_table(
+        TableName=TABLE,
+        KeySchema=[{"AttributeName": "session_id", "KeyType": "HASH"},
+                   {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "session_id", "AttributeType": "S"},
+                              {"AttributeName": "timestamp", "AttributeType": "S"},
+                              {"AttributeName": "day_bucket", "AttributeType": "S"},
+                              {"AttributeName": "original_ts", "AttributeType": "S"}],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "DayIndex",
+            "KeySchema": [{"AttributeName": "day_bucket", "KeyType": "HASH"},
+                          {"AttributeName": "original_ts", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "INCLUDE",
+                           "NonKeyAttributes": ["location", "user_role"]},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    ddb.create_table(
+        TableName=FEEDBACK_TABLE,
+        KeySchema=[{"AttributeName": "message_id", "KeyType": "HASH"},
+                   {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "message_id", "AttributeType": "S"},
+                              {"AttributeName": "timestamp", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return table
+
+
+def seed(table, logclassifier, rows, days, rng):
+    now = datetime.utcnow()
+    span = days * 86400
+    with table.batch_writer() as writer:
+        for i in range(rows):
+            ts = now - timedelta(seconds=span * i / rows + rng.random())
+            writer.put_item(Item=logclassifier.build_item({
+                "session_id": f"session-{i // 4}",
+                "timestamp": ts.isoformat(),
+                "query": f"How do I renew my certification? #{i}",
+                "response": "Renewal is available online.",
+                "location": rng.choice(["Charlotte", "Raleigh", "Durham", "Asheville"]),
+                "user_role": rng.choice(["learner", "instructor", "staff"]),
+                "record_id": f"{i:08x}",
+            }))
+
+
+class CountingTable:
+    """
+    Forwards to a Table, adding up `ScannedCount` over scans and queries, and
+    counting queries. Calls through `meta.client` (what the worker threads
+    use) are counted too.
+    """
+
+    def __init__(self, table, counter=None):
+        self.table = table
+        self.counter = counter or self
+        self.scanned = 0
+        self.queries = 0
+        self.lock = threading.Lock()
+        if counter is None:
+            self.name = table.name
+            self.meta = SimpleNamespace(client=CountingTable(table.meta.client, counter=self))
+
+    def __getattr__(self, name):
+        return getattr(self.table, name)
+
+    def _record(self, resp, queries):
+        with self.counter.lock:
+            self.counter.scanned += resp.get("ScannedCount", 0)
+            self.counter.queries += queries
+        return resp
+
+    def scan(self, **kwargs):
+        return self._record(self.table.scan(**kwargs), 0)
+
+    def query(self, **kwargs):
+        return self._record(self.table.query(**kwargs), 1)
+
+
+def run(handler, table, timeframe, day_index):
+    handler.DAY_INDEX = day_index
+    handler.table = counting = CountingTable(table)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resp = handler.lambda_handler({"queryStringParameters": {"timeframe": timeframe}}, None)
+    elapsed = (time.perf_counter() - started) * 1000
+    body = json.loads(resp["body"])
+    return counting.scanned, body["sentiment"], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000, help="rows seeded into moto")
+    parser.add_argument("--project-rows", type=int, default=1_000_000, help="table size to scale rows read to")
+    parser.add_argument("--days", type=int, default=365, help="days the seeded rows are spread over")
+    parser.add_argument("--shards", type=int, default=1, help="DAY_BUCKET_SHARDS")
+    args = parser.parse_args()
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "DYNAMODB_TABLE": TABLE,
+                       "FEEDBACK_TABLE": FEEDBACK_TABLE, "DAY_BUCKET_SHARDS": str(args.shards),
+                       "DAY_INDEX_SINCE": INDEXED_SINCE})
+    os.environ.pop("ROLLUP_TABLE", None)
+
+    with mock_aws():
+        table = create_tables()
+        logclassifier = load_handler("logclassifier")
+        handler = load_handler("retrieveSessionLogs")
+
+        started = time.perf_counter()
+        seed(table, logclassifier, args.rows, args.days, random.Random(7))
+        seeded = time.perf_counter() - started
+
+        rows = []
+        for timeframe in TIMEFRAMES:
+            for name, index in (("scan", ""), ("day index", "DayIndex")):
+                scanned, sentiment, elapsed = run(handler, table, timeframe, index)
+                rows.append((timeframe, name, scanned, sum(sentiment.values()), elapsed))
+
+    print(f"rows: {args.rows} (projected to {args.project_rows})  days: {args.days}  shards: {args.shards}  "
+          f"(seeded in {seeded:.0f} s)")
+    scale = args.project_rows / args.rows
+    print(f"{'timeframe':<10} {'path':<10} {'rows read':>10} {'@project':>10} {'returned':>9} {'ms':>9}")
+    for timeframe, name, scanned, returned, elapsed in rows:
+        print(f"{timeframe:<10} {name:<10} {scanned:>10} {scanned * scale:>10.0f} {returned:>9} {elapsed:>9.0f}")
+    for i in range(0, len(rows), 2):
+        assert rows[i][3] == rows[i + 1][3], f"{rows[i][0]}: scan and index disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Micro-benchmark: decoding and accumulating multi-MB streamed answers.
+
+Splits a synthetic UTF-8 answer (accented text, curly quotes, emoji) into
+byte chunks at arbitrary offsets, the way the Bedrock event stream may, and
+feeds it through the per-chunk `decode('utf-8')` + `+=` loop the handlers used
+to run and through `navigator.response.ResponseAccumulator` (with and without
+a spill cap). Reports time, peak traced memory and decode failures.
+
+Usage:
+    python benchmarks/response_bench.py [--megabytes 4] [--chunk-bytes 16-512] [--spill-chars 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "shared", "python"))
+
+from navigator.response import ResponseAccumulator  # noqa: E402
+
+WORDS = (
+    "Erste Hilfe für psychische Gesundheit — «ALGEE» plan d'action évaluer écouter "
+    "rassurer “professional help” self‑help 💬 crisis support 🧠 wellbeing "
+    "certificación instructor learner niño año café résumé naïve"
+).split()
+
+
+def synthetic_stream(rng, megabytes, lo, hi):
+    words = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word.encode('utf-8')) + 1
+    data = ' '.join(words).encode('utf-8')
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        step = rng.randint(lo, hi)
+        chunks.append(data[pos:pos + step])
+        pos += step
+    return data.decode('utf-8'), chunks
+
+
+def legacy(chunks):
+    full_response = ""
+    failures = 0
+    for data in chunks:
+        try:
+            chunk_text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            failures += 1
+            chunk_text = data.decode('utf-8', errors='replace')
+        full_response += chunk_text
+    return full_response, failures
+
+
+def accumulated(chunks, spill_chars=None):
+    answer = ResponseAccumulator(spill_chars=spill_chars)
+    for data in chunks:
+        answer.feed(data)
+    answer.finish()
+    answer.text  # materialize, as the handlers do
+    return answer
+
+
+class UploadSink:
+    """Stands in for the S3 client: keeps what `ResponseAccumulator.upload` sends."""
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.body = fileobj.read()
+
+
+def measure(fn):
+    """Best-of-3 wall time, then one run under tracemalloc for the peak."""
+    elapsed = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        fn()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=float, default=4)
+    parser.add_argument("--chunk-bytes", default="16-512", help="chunk size range in bytes, lo-hi")
+    parser.add_argument("--spill-chars", type=int, default=100000)
+    args = parser.parse_args()
+    lo, hi = (int(v) for v in args.chunk_bytes.split("-"))
+
+    rng = random.Random(5)
+    expected, chunks = synthetic_stream(rng, args.megabytes, lo, hi)
+    print(f"stream: {sum(len(c) for c in chunks) / 1e6:.1f} MB in {len(chunks)} chunks ({lo}-{hi} bytes)")
+    print(f"{'implementation':<28} {'ms':>8} {'peak MB':>8} {'correct':>8}")
+
+    (text, failures), elapsed, peak = measure(lambda: legacy(chunks))
+    print(f"{'legacy decode + +=':<28} {elapsed * 1e3:>8.1f} {peak / 1e6:>8.1f} {str(text == expected):>8}"
+          f"   ({failures} chunks failed to decode)")
+
+    answer, elapsed, peak = measure(lambda: accumulated(chunks))
+    correct = answer.text == expected
+    print(f"{'ResponseAccumulator':<28} {elapsed * 1e3:>8.1f} {peak / 1e6:>8.1f} {str(correct):>8}")
+    assert correct
+
+    answer, elapsed, peak = measure(lambda: accumulated(chunks, args.spill_chars))
+    sink = UploadSink()
+    answer.upload(sink, 'bench', 'answer.txt')
+    correct = sink.body.decode('utf-8') == expected
+    label = f"  spill at {args.spill_chars} chars"
+    print(f"{label:<28} {elapsed * 1e3:>8.1f} {peak / 1e6:>8.1f} {str(correct):>8}")
+    assert correct and answer.spilled
+
+
+if __name__ == "__main__":
+    main()
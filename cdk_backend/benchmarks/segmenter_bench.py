@@ -0,0 +1,168 @@
+"""
+Micro-benchmark: WebSocket sends and CPU per response for chunk fan-out.
+
+Compares the per-chunk splitter that chatResponseHandler used to run on every
+Bedrock chunk (sentence regex, then 8-word groups) with the stateful
+`navigator.streaming.SentenceSegmenter`. "hold ms" is how long a character
+waits in the segmenter before its frame is sent (mean and p95): the latency
+the client pays for fewer frames. The legacy splitter sends on arrival.
+
+Usage:
+    python benchmarks/segmenter_bench.py [--responses 500] [--chunk-chars 4-120]
+                                         [--min-chars 120] [--max-delay-ms 250]
+
+Use a small --chunk-chars range (e.g. 2-16) to model token-sized agent chunks.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "shared", "python"))
+
+from navigator.streaming import DEFAULT_MAX_DELAY_MS, DEFAULT_MIN_CHARS, SentenceSegmenter  # noqa: E402
+
+WORDS = (
+    "mental health first aid ALGEE action plan assess risk listen nonjudgmentally "
+    "give reassurance encourage appropriate professional help self-help strategies "
+    "instructor certification learner course blended virtual in-person renewal "
+    "resources manual participant crisis support wellbeing recertification"
+).split()
+
+
+def legacy_split(chunk_text):
+    """Per-chunk splitter previously inlined in chatResponseHandler.lambda_handler."""
+    if not chunk_text.strip():
+        return []
+    sentences = re.split(r'([.!?]+(?:\s+|$))', chunk_text)
+    parts = []
+    idx = 0
+    while idx < len(sentences):
+        if idx + 1 < len(sentences):
+            combined = sentences[idx] + sentences[idx + 1]
+            if combined.strip():
+                parts.append(combined)
+            idx += 2
+        else:
+            if sentences[idx].strip():
+                parts.append(sentences[idx])
+            idx += 1
+
+    if not parts or len(parts) == 1 or any(len(p) > 100 for p in parts if p):
+        words = [w for w in chunk_text.split(' ') if w.strip()]
+        if words:
+            word_chunks = []
+            for word_idx in range(0, len(words), 8):
+                chunk = ' '.join(words[word_idx:word_idx + 8])
+                if word_idx + 8 < len(words):
+                    chunk += ' '
+                word_chunks.append(chunk)
+            parts = word_chunks
+        else:
+            parts = [chunk_text]
+    return [p for p in parts if p and p.strip()]
+
+
+def synthetic_response(rng, sentences=18):
+    out = []
+    for _ in range(sentences):
+        n = rng.randint(6, 24)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(n))
+        out.append(sentence.capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+        out.append("\n\n" if rng.random() < 0.15 else " ")
+    return "".join(out)
+
+
+def synthetic_chunks(rng, text, lo, hi):
+    """Split text at arbitrary offsets, like Bedrock agent chunk boundaries."""
+    chunks, i = [], 0
+    while i < len(text):
+        n = rng.randint(lo, hi)
+        chunks.append(text[i:i + n])
+        i += n
+    return chunks
+
+
+def run_legacy(streams):
+    sends = 0
+    start = time.process_time()
+    for chunks, _gaps in streams:
+        for chunk in chunks:
+            sends += len(legacy_split(chunk))
+    return sends, time.process_time() - start
+
+
+def run_segmenter(streams, min_chars, max_delay_ms):
+    sends = 0
+    start = time.process_time()
+    for chunks, gaps in streams:
+        now = [0.0]
+        segmenter = SentenceSegmenter(min_chars=min_chars, max_delay_ms=max_delay_ms,
+                                      clock=lambda: now[0])
+        out = []
+        for chunk, gap in zip(chunks, gaps):
+            now[0] += gap
+            out.extend(segmenter.feed(chunk))
+        out.extend(segmenter.flush())
+        sends += len(out)
+    return sends, time.process_time() - start
+
+
+def segmenter_hold(streams, min_chars, max_delay_ms):
+    """Mean and p95 time (ms) a character waits in the segmenter before it is sent."""
+    waits = []
+    for chunks, gaps in streams:
+        now = [0.0]
+        segmenter = SentenceSegmenter(min_chars=min_chars, max_delay_ms=max_delay_ms,
+                                      clock=lambda: now[0])
+        arrivals = []   # arrival time of every buffered character, oldest first
+        for chunk, gap in zip(chunks, gaps):
+            now[0] += gap
+            arrivals.extend([now[0]] * len(chunk))
+            for part in segmenter.feed(chunk):
+                waits.extend(now[0] - t for t in arrivals[:len(part)])
+                del arrivals[:len(part)]
+        # Whatever is left goes out with the final frame, when the stream ends
+        waits.extend(now[0] - t for t in arrivals)
+    waits.sort()
+    return sum(waits) / len(waits) * 1000, waits[int(len(waits) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--responses", type=int, default=500)
+    parser.add_argument("--chunk-chars", default="4-120", help="min-max Bedrock chunk size")
+    parser.add_argument("--min-chars", type=int, default=DEFAULT_MIN_CHARS)
+    parser.add_argument("--max-delay-ms", type=int, default=DEFAULT_MAX_DELAY_MS)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    lo, hi = (int(v) for v in args.chunk_chars.split("-"))
+    rng = random.Random(args.seed)
+    streams = []
+    for _ in range(args.responses):
+        chunks = synthetic_chunks(rng, synthetic_response(rng), lo, hi)
+        # Inter-chunk arrival gaps of 5-40 ms
+        gaps = [rng.uniform(0.005, 0.040) for _ in chunks]
+        streams.append((chunks, gaps))
+
+    total_chunks = sum(len(c) for c, _ in streams)
+    legacy_sends, legacy_cpu = run_legacy(streams)
+    seg_sends, seg_cpu = run_segmenter(streams, args.min_chars, args.max_delay_ms)
+    hold_mean, hold_p95 = segmenter_hold(streams, args.min_chars, args.max_delay_ms)
+
+    n = args.responses
+    print(f"responses                : {n}")
+    print(f"bedrock chunks/response  : {total_chunks / n:.1f}")
+    print(f"{'splitter':<24} {'sends/resp':>11} {'cpu us/resp':>12} {'hold ms':>8} {'p95 ms':>7}")
+    print(f"{'legacy per-chunk':<24} {legacy_sends / n:>11.1f} {legacy_cpu / n * 1e6:>12.1f} {0:>8.0f} {0:>7.0f}")
+    print(f"{'SentenceSegmenter':<24} {seg_sends / n:>11.1f} {seg_cpu / n * 1e6:>12.1f} "
+          f"{hold_mean:>8.0f} {hold_p95:>7.0f}")
+    print(f"send reduction           : {legacy_sends / max(seg_sends, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Transport benchmark: SSE (chunked HTTP) vs WebSocket frames under concurrent clients.
+
+Both handlers answer from the same synthetic Bedrock agent, which yields
+--chunks text chunks every --token-ms after a --first-token-ms delay. The
+SSE path runs streamingHandler behind `navigator.sse` on a loopback port and
+reads each response with a real HTTP client; the WebSocket path runs
+chatResponseHandler's `answer_message` on one thread per client with a
+management API stand-in that takes --ws-post-ms per `post_to_connection`
+(an HTTPS call in production).
+
+Reported per transport, over --clients concurrent requests:
+
+- ttfb:       request start to the first answer chunk at the client (ms)
+- total:      request start to the `complete` event (ms)
+- throughput: answer characters delivered per second, across all clients
+
+Both run in one process, so the GIL is shared with the clients; absolute
+numbers are a lower bound on a real deployment, the gap between the two
+transports is what to compare.
+
+Usage:
+    python benchmarks/sse_bench.py [--clients 50] [--chunks 120] [--token-ms 15] [--ws-post-ms 8]
+"""
+
+import argparse
+import contextlib
+import http.client
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+sys.path.insert(0, os.path.join(LAMBDA_DIR, "shared", "python"))
+
+from navigator.sse import start_background  # noqa: E402
+
+PLACEHOLDER_ENV = {
+    "AGENT_ID": "bench-agent",
+    "AGENT_ALIAS_ID": "bench-alias",
+    "LOG_CLASSIFIER_FN_NAME": "bench-logclassifier",
+    "WS_API_ENDPOINT": "https://bench.invalid",
+    "AWS_DEFAULT_REGION": "us-west-2",
+}
+SENTENCE = "Assess for risk of suicide or harm, then listen nonjudgmentally. "
+
+
+class SyntheticAgent:
+    """Paces `invoke_agent` completions like a model generating tokens."""
+
+    def __init__(self, chunks, chunk_chars, token_ms, first_token_ms):
+        text = (SENTENCE * (chunks * chunk_chars // len(SENTENCE) + 1))[:chunks * chunk_chars]
+        self.parts = [text[i:i + chunk_chars].encode("utf-8") for i in range(0, len(text), chunk_chars)]
+        self.token_s = token_ms / 1000
+        self.first_token_s = first_token_ms / 1000
+        self.answer_chars = len(text)
+
+    def invoke_agent(self, **kwargs):
+        def completion():
+            time.sleep(self.first_token_s)
+            for part in self.parts:
+                yield {"chunk": {"bytes": part}}
+                time.sleep(self.token_s)
+        return {"completion": completion()}
+
+
+class DiscardAnalytics:
+    def publish(self, record):
+        return "discarded"
+
+
+class ManagementApi:
+    """`post_to_connection` stand-in: records when each client got its first chunk and its complete frame."""
+
+    def __init__(self, post_ms):
+        self.post_s = post_ms / 1000
+        self.first_chunk = {}
+        self.complete = {}
+        self.chars = {}
+        self._lock = threading.Lock()
+
+    def post_to_connection(self, ConnectionId, Data):
+        time.sleep(self.post_s)
+        frame = json.loads(Data)
+        now = time.perf_counter()
+        with self._lock:
+            if frame.get("type") == "chunk":
+                self.first_chunk.setdefault(ConnectionId, now)
+                self.chars[ConnectionId] = self.chars.get(ConnectionId, 0) + len(frame["chunk"])
+            elif frame.get("type") == "complete":
+                self.complete[ConnectionId] = now
+
+
+def load_handler(name, agent):
+    os.environ.update({k: v for k, v in PLACEHOLDER_ENV.items() if k not in os.environ})
+    spec = importlib.util.spec_from_file_location(f"{name}_handler", os.path.join(LAMBDA_DIR, name, "handler.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.bedrock_agent = agent
+    module.analytics = DiscardAnalytics()
+    return module
+
+
+def sse_client(port, index, results):
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request("POST", "/", body=json.dumps({"querytext": f"bench question {index}",
+                                               "session_id": f"sse-{index}", "user_role": "learner"}),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    first_chunk = complete = None
+    chars = 0
+    buffer = ""
+    while complete is None:
+        data = response.read1(65536)
+        if not data:
+            break
+        buffer += data.decode("utf-8")
+        *events, buffer = buffer.split("\n\n")
+        for raw in events:
+            data_lines = [line[len("data: "):] for line in raw.split("\n") if line.startswith("data: ")]
+            if not data_lines:
+                continue  # retry: field or heartbeat comment
+            event = json.loads(data_lines[0])
+            if event["type"] == "chunk":
+                first_chunk = first_chunk or time.perf_counter()
+                chars += len(event["chunk"])
+            elif event["type"] == "complete":
+                complete = time.perf_counter()
+    conn.close()
+    results[index] = (started, first_chunk, complete, chars)
+
+
+def run_sse(agent, clients):
+    handler = load_handler("streamingHandler", agent)
+    server = start_background(handler.lambda_handler)
+    port = server.server_address[1]
+    results = [None] * clients
+    threads = [threading.Thread(target=sse_client, args=(port, i, results)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    server.shutdown()
+    return results, wall
+
+
+def run_websocket(agent, clients, post_ms):
+    handler = load_handler("chatResponseHandler", agent)
+    api = ManagementApi(post_ms)
+    handler.api_gateway = api
+    starts = {}
+
+    def invoke(index):
+        connection_id = f"conn-{index}"
+        starts[connection_id] = time.perf_counter()
+        context = types.SimpleNamespace(aws_request_id=f"ws-{index}", get_remaining_time_in_millis=lambda: 120000)
+        handler.answer_message({"querytext": f"bench question {index}", "connectionId": connection_id,
+                                "session_id": f"ws-{index}", "user_role": "learner"}, context)
+
+    threads = [threading.Thread(target=invoke, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    results = [(starts[cid], api.first_chunk.get(cid), api.complete.get(cid), api.chars.get(cid, 0))
+               for cid in sorted(starts)]
+    return results, wall
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(name, results, wall, answer_chars):
+    ttfb = [(first - start) * 1000 for start, first, _, _ in results if first]
+    total = [(done - start) * 1000 for start, _, done, _ in results if done]
+    delivered = sum(chars for *_, chars in results)
+    complete = sum(1 for _, _, done, chars in results if done and chars == answer_chars)
+    print(f"{name:<10} {percentile(ttfb, 50):>9.1f} {percentile(ttfb, 95):>9.1f} "
+          f"{percentile(total, 50):>10.1f} {percentile(total, 95):>10.1f} "
+          f"{delivered / wall:>12.0f} {complete:>5}/{len(results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=120, help="Bedrock chunks per answer")
+    parser.add_argument("--chunk-chars", type=int, default=24)
+    parser.add_argument("--token-ms", type=float, default=15, help="delay between Bedrock chunks")
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--ws-post-ms", type=float, default=8, help="latency of one post_to_connection")
+    args = parser.parse_args()
+
+    agent = SyntheticAgent(args.chunks, args.chunk_chars, args.token_ms, args.first_token_ms)
+    # Handler logging would dominate the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        sse = run_sse(agent, args.clients)
+        websocket = run_websocket(agent, args.clients, args.ws_post_ms)
+
+    print(f"clients: {args.clients}  answer: {agent.answer_chars} chars in {args.chunks} chunks  "
+          f"token: {args.token_ms} ms  first token: {args.first_token_ms} ms  ws post: {args.ws_post_ms} ms")
+    print(f"{'transport':<10} {'ttfb p50':>9} {'ttfb p95':>9} {'total p50':>10} {'total p95':>10} "
+          f"{'chars/s':>12} {'complete':>11}")
+    summarize("sse", *sse, agent.answer_chars)
+    summarize("websocket", *websocket, agent.answer_chars)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Cold-start benchmark for every Lambda handler.
+
+Each handler module is imported in a fresh interpreter (as on a Lambda cold
+start) with placeholder environment variables. Reported per handler:
+
+- import:  time to import the module, including the navigator layer
+- clients: number of module-level lazy clients/tables and the time to build
+           them all, i.e. what an eager import used to pay up front
+- invoke:  latency of the first invocation. Handlers on the request path get a
+           real request against moto-mocked AWS (tables, buckets, queue, topic,
+           log group, SES identity) with Bedrock agent calls answered by a
+           botocore stub, so the clients they now build on first use are
+           paid here; when the handler import did not load boto3, its import
+           time is added too. The rest get a request that needs no AWS call
+           (CORS pre-flight, WebSocket $connect, rejected record).
+
+The mocked resources are created in the same interpreter, after boto3 is
+imported, through a separate boto3 Session, so the handler's own session
+still loads its service models and builds its clients. `time.sleep` is a
+no-op during the invocation (sessionLogs polls Logs Insights once a
+second), and kb-sync runs without AGENT_ID so it skips the answer-cache
+warm-up of every quick action. Clients are built in a second interpreter
+per run, so the build column does not see the ones the invocation built.
+
+--max-import-ms makes the script exit non-zero when any handler's import time
+exceeds the budget, so it can run as a cold-start regression check.
+
+Requires `moto` (pip install moto).
+
+Usage:
+    python benchmarks/startup_bench.py [--runs 3] [--max-import-ms 400]
+"""
+
+import argparse
+import contextlib
+import copy
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+LAYER_DIR = os.path.join(LAMBDA_DIR, "shared", "python")
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HANDLERS = [
+    "adminFile", "chatResponseHandler", "conversations", "email", "emailReply", "escalatedQueries", "feedback",
+    "kb-sync", "logclassifier", "retrieveSessionLogs", "sessionLogs", "streamingHandler",
+    "userProfile", "websocketHandler",
+]
+
+PLACEHOLDER_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "WS_API_ENDPOINT": "https://example.execute-api.us-east-1.amazonaws.com/production",
+    "AGENT_ID": "AGENT", "AGENT_ALIAS_ID": "ALIAS", "LOG_CLASSIFIER_FN_NAME": "logclassifier",
+    "ANSWER_CACHE_TABLE": "NCMWAnswerCache", "SESSION_TABLE": "NCMWSessionMetadata",
+    "BUCKET_NAME": "bucket", "BUCKET": "bucket", "KNOWLEDGE_BASE_ID": "KB", "DATA_SOURCE_ID": "DS",
+    "SOURCE_BUCKET_NAME": "bucket", "DESTINATION_BUCKET_NAME": "bucket", "ADMIN_EMAIL": "admin@example.com",
+    "ESCALATED_QUERIES_TABLE": "NCMWEscalatedQueries", "DYNAMODB_TABLE": "NCMWDashboardSessionlogs",
+    "GROUP_NAME": "/aws/lambda/chat", "RESPONSE_FUNCTION_ARN": "arn:aws:lambda:us-east-1:000000000000:function:chat",
+    "USER_PROFILE_TABLE": "NCMWUserProfiles", "VERIFIED_SOURCE_EMAIL": "bot@example.com",
+    "ANALYTICS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/123456789012/NCMWAnalytics",
+    "ADMIN_NOTIFICATION_TOPIC_ARN": "arn:aws:sns:us-east-1:123456789012:NCMWAdminNotifications",
+}
+
+# Per-handler overrides of PLACEHOLDER_ENV
+HANDLER_ENV = {
+    "conversations": {"DAY_INDEX": "DayIndex", "DAY_INDEX_SINCE": "2000-01-01"},
+    "kb-sync": {"AGENT_ID": ""},
+}
+
+# Key schema of every table the mocked first events touch
+TABLES = {
+    "NCMWDashboardSessionlogs": [("session_id", "HASH"), ("timestamp", "RANGE")],
+    "NCMWResponseFeedback": [("message_id", "HASH"), ("timestamp", "RANGE")],
+    "NCMWEscalatedQueries": [("query_id", "HASH"), ("timestamp", "RANGE")],
+    "NCMWAnswerCache": [("cache_key", "HASH")],
+    "NCMWSessionMetadata": [("session_id", "HASH")],
+}
+DAY_INDEX_KEYS = [("day_bucket", "HASH"), ("original_ts", "RANGE")]
+EMAIL_KEY = "incoming/bench-reply"
+EMAIL = (b"From: admin@example.com\r\nTo: bot@example.com\r\nSubject: Re: Agent Assistance Requested\r\n"
+         b"Content-Type: text/plain\r\n\r\n"
+         b"QUESTION: How do I renew my certification?\r\nANSWER: Renewal is available online.\r\n")
+
+OPTIONS_EVENT = {"httpMethod": "OPTIONS", "path": "/", "pathParameters": None}
+QUERY = {"querytext": "How do I renew my certification?", "session_id": "bench-session", "user_role": "learner"}
+S3_RECORD = {"eventName": "ObjectCreated:Put", "eventTime": "2026-01-01T00:00:00Z",
+             "s3": {"bucket": {"name": "bucket"}, "object": {"key": EMAIL_KEY}}}
+FIRST_EVENTS = {
+    "chatResponseHandler": dict(QUERY, connectionId="bench", message_id="bench-message"),
+    "streamingHandler": {"body": json.dumps(QUERY)},
+    "kb-sync": {"Records": [S3_RECORD]},
+    "retrieveSessionLogs": {"queryStringParameters": {"timeframe": "today"}},
+    "conversations": {"queryStringParameters": {}},
+    "email": {"parameters": [{"name": "email", "value": "learner@example.com"},
+                             {"name": "querytext", "value": QUERY["querytext"]},
+                             {"name": "agentResponse", "value": "I could not find that."}]},
+    "emailReply": {"Records": [S3_RECORD]},
+    "sessionLogs": {"action": "store_logs"},
+    "adminFile": OPTIONS_EVENT,
+    "escalatedQueries": OPTIONS_EVENT,
+    "feedback": OPTIONS_EVENT,
+    "userProfile": OPTIONS_EVENT,
+    "websocketHandler": {"requestContext": {"connectionId": "bench", "routeKey": "$connect"}},
+    "logclassifier": {"session_id": "bench"},
+}
+# Handlers whose first event calls AWS, and so runs against moto
+MOCKED = {"chatResponseHandler", "streamingHandler", "kb-sync", "retrieveSessionLogs", "conversations",
+          "email", "emailReply", "sessionLogs"}
+
+# Bedrock agent responses, as botocore would parse them
+BEDROCK_RESPONSES = {
+    ("bedrock-agent-runtime", "InvokeAgent"): {
+        "completion": [{"chunk": {"bytes": b"Renewal is available online."}}],
+        "contentType": "application/json", "sessionId": QUERY["session_id"],
+    },
+    ("bedrock-agent", "StartIngestionJob"): {"ingestionJob": {"ingestionJobId": "bench-job", "status": "STARTING"}},
+    ("bedrock-agent", "GetIngestionJob"): {"ingestionJob": {"ingestionJobId": "bench-job", "status": "COMPLETE"}},
+}
+
+
+class LambdaContext:
+    aws_request_id = "bench-request"
+    function_name = "bench"
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:bench"
+
+    def get_remaining_time_in_millis(self):
+        return 900_000
+
+
+def stub_bedrock():
+    """
+    Answers the Bedrock agent calls in BEDROCK_RESPONSES before they are sent
+    (moto does not implement them). Registered as a builtin handler, as moto
+    does, so the session navigator.aws creates later picks it up.
+    """
+    from botocore.awsrequest import AWSResponse
+    from botocore.handlers import BUILTIN_HANDLERS
+
+    def respond(model, **kwargs):
+        parsed = BEDROCK_RESPONSES.get((model.service_model.service_id.hyphenize(), model.name))
+        if parsed is not None:
+            return AWSResponse("https://bedrock.amazonaws.com", 200, {}, None), copy.deepcopy(parsed)
+        return None
+
+    for service, operation in BEDROCK_RESPONSES:
+        BUILTIN_HANDLERS.append((f"before-call.{service}.{operation}", respond))
+
+
+def create_resources():
+    """Everything the MOCKED first events touch, through a session of its own."""
+    import boto3
+
+    session = boto3.session.Session(region_name="us-east-1")
+    ddb = session.resource("dynamodb")
+    for name, keys in TABLES.items():
+        indexes = {}
+        if name == PLACEHOLDER_ENV["DYNAMODB_TABLE"]:
+            indexes["GlobalSecondaryIndexes"] = [{
+                "IndexName": "DayIndex",
+                "KeySchema": [{"AttributeName": k, "KeyType": t} for k, t in DAY_INDEX_KEYS],
+                "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["location", "user_role"]},
+            }]
+            keys = keys + DAY_INDEX_KEYS
+        ddb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": k, "KeyType": t} for k, t in TABLES[name]],
+            AttributeDefinitions=[{"AttributeName": k, "AttributeType": "S"} for k, _ in keys],
+            BillingMode="PAY_PER_REQUEST", **indexes,
+        )
+    now = datetime.utcnow().isoformat()
+    row = {"session_id": "bench-session", "timestamp": now, "original_ts": now, "day_bucket": now[:10],
+           "query": QUERY["querytext"], "response": "Renewal is available online.",
+           "location": "Raleigh", "user_role": "learner"}
+    ddb.Table(PLACEHOLDER_ENV["DYNAMODB_TABLE"]).put_item(Item=row)
+
+    s3 = session.client("s3")
+    s3.create_bucket(Bucket=PLACEHOLDER_ENV["BUCKET"])
+    s3.put_object(Bucket=PLACEHOLDER_ENV["BUCKET"], Key=EMAIL_KEY, Body=EMAIL)
+    session.client("sqs").create_queue(QueueName=PLACEHOLDER_ENV["ANALYTICS_QUEUE_URL"].rsplit("/", 1)[1])
+    session.client("sns").create_topic(Name=PLACEHOLDER_ENV["ADMIN_NOTIFICATION_TOPIC_ARN"].rsplit(":", 1)[1])
+    session.client("ses").verify_email_identity(EmailAddress=PLACEHOLDER_ENV["VERIFIED_SOURCE_EMAIL"])
+    logs = session.client("logs")
+    logs.create_log_group(logGroupName=PLACEHOLDER_ENV["GROUP_NAME"])
+    logs.create_log_stream(logGroupName=PLACEHOLDER_ENV["GROUP_NAME"], logStreamName="bench")
+    logs.put_log_events(logGroupName=PLACEHOLDER_ENV["GROUP_NAME"], logStreamName="bench",
+                        # Logs Insights windows end on a whole second, so log it a little earlier
+                        logEvents=[{"timestamp": int(time.time() * 1000) - 5000, "message": json.dumps(row)}])
+
+
+@contextlib.contextmanager
+def mocked_aws():
+    """moto for everything, the Bedrock stub and no sleeping, around one first invocation."""
+    from moto import mock_aws
+
+    with mock_aws():
+        create_resources()
+        stub_bedrock()
+        sleep, time.sleep = time.sleep, lambda seconds: None
+        try:
+            yield
+        finally:
+            time.sleep = sleep
+
+CHILD = r"""
+import contextlib, io, json, sys, time
+handler_dir, mode, event, mocked = sys.argv[1], sys.argv[2], json.loads(sys.argv[3]), sys.argv[4] == "1"
+sys.path[:0] = [handler_dir]
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import handler
+import_ms = (time.perf_counter() - started) * 1000
+
+result = {"import_ms": import_ms}
+if mode == "invoke" and event is not None:
+    setup = contextlib.nullcontext()
+    boto3_ms = 0.0
+    if mocked:
+        if "boto3" not in sys.modules:
+            started = time.perf_counter()
+            import boto3
+            boto3_ms = (time.perf_counter() - started) * 1000
+        import startup_bench
+        setup = startup_bench.mocked_aws()
+    with setup, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        response = handler.lambda_handler(event, startup_bench.LambdaContext() if mocked else None)
+        for _ in getattr(response, "body", None) or ():
+            pass
+        result["invoke_ms"] = boto3_ms + (time.perf_counter() - started) * 1000
+elif mode == "build":
+    from navigator.aws import _Lazy
+    lazies = [v for v in vars(handler).values() if isinstance(v, _Lazy)]
+    started = time.perf_counter()
+    for lazy in lazies:
+        lazy._resolve()
+    result.update(clients=len(lazies), clients_ms=(time.perf_counter() - started) * 1000)
+print(json.dumps(result))
+"""
+
+
+def run_child(name, mode):
+    env = dict(os.environ, **PLACEHOLDER_ENV)
+    env.update(HANDLER_ENV.get(name, {}))
+    env["PYTHONPATH"] = os.pathsep.join([LAYER_DIR, BENCH_DIR, env.get("PYTHONPATH", "")])
+    event = json.dumps(FIRST_EVENTS.get(name))
+    out = subprocess.run([sys.executable, "-c", CHILD, os.path.join(LAMBDA_DIR, name), mode, event,
+                          "1" if name in MOCKED else "0"], env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{name}: {out.stderr.strip().splitlines()[-1]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(name):
+    invoked, built = run_child(name, "invoke"), run_child(name, "build")
+    return dict(built, import_ms=min(invoked["import_ms"], built["import_ms"]), invoke_ms=invoked.get("invoke_ms"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per handler (best is reported)")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    print(f"{'handler':<22} {'import ms':>10} {'clients':>8} {'build ms':>9} {'invoke ms':>10}")
+    over_budget = []
+    for name in HANDLERS:
+        try:
+            runs = [measure(name) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<22} failed: {e}")
+            over_budget.append(name)
+            continue
+        best = min(runs, key=lambda r: r["import_ms"])
+        invoke = min((r["invoke_ms"] for r in runs if r["invoke_ms"] is not None), default=None)
+        invoke_col = f"{invoke:>10.1f}" if invoke is not None else f"{'-':>10}"
+        print(f"{name:<22} {best['import_ms']:>10.1f} {best['clients']:>8} "
+              f"{min(r['clients_ms'] for r in runs):>9.1f} {invoke_col}")
+        if args.max_import_ms is not None and best["import_ms"] > args.max_import_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,21 @@ import urllib.parse
 from base64 import b64decode, b64encode
 from datetime import datetime
 
-import boto3
 from botocore.exceptions import ClientError
 
+from navigator.aws import lazy_client
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  AWS clients & env
 # ──────────────────────────────────────────────────────────────────────────────
-s3            = boto3.client("s3")
-bedrock_agent = boto3.client("bedrock-agent")
+s3            = lazy_client("s3")
+bedrock_agent = lazy_client("bedrock-agent")
+lambda_client = lazy_client("lambda")
 
 BUCKET_NAME       = os.environ["BUCKET_NAME"]
 KNOWLEDGE_BASE_ID = os.environ["KNOWLEDGE_BASE_ID"]
 DATA_SOURCE_ID    = os.environ["DATA_SOURCE_ID"]
+KB_SYNC_FN_NAME   = os.environ.get("KB_SYNC_FN_NAME")
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  CORS
@@ -131,14 +134,29 @@ def sync_knowledge_base():
             knowledgeBaseId=KNOWLEDGE_BASE_ID,
             dataSourceId=DATA_SOURCE_ID,
         )
-        job_id = response.get("ingestionJobId")
+        job_id = response.get("ingestionJob", {}).get("ingestionJobId")
         log("KB sync job id            :", job_id)
+        watch_ingestion_job(job_id)
         return {"status": "success", "jobId": job_id}
     except Exception as exc:
         log("KB sync ERROR             :", exc)
         return {"status": "error", "message": str(exc)}
 
 
+def watch_ingestion_job(job_id):
+    """Ask kb-sync to wait for the job and run the post-ingestion steps (cache refresh)."""
+    if not job_id or not KB_SYNC_FN_NAME:
+        return
+    try:
+        lambda_client.invoke(
+            FunctionName=KB_SYNC_FN_NAME,
+            InvocationType="Event",
+            Payload=json.dumps({"action": "await_ingestion", "ingestionJobId": job_id}),
+        )
+    except Exception as exc:
+        log("KB sync watch ERROR       :", exc)
+
+
 def handle_list_files():
     log("LIST files in bucket       :", BUCKET_NAME)
     try:
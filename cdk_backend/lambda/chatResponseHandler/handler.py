@@ -14,20 +14,99 @@ scenarios (email escalation to administrators).
 """
 
 import json
-import boto3
 import os
-import re
+import threading
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
 
-# Initialize AWS clients
-bedrock_agent = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
-api_gateway = boto3.client('apigatewaymanagementapi', endpoint_url=os.environ['WS_API_ENDPOINT'])
-lambda_client = boto3.client('lambda')
+from navigator.admission import Admission, ConcurrencyGate
+from navigator.analytics import AnalyticsPublisher, interaction_record
+from navigator.answer_cache import AnswerCache, is_quick_action
+from navigator.aws import lazy_client, lazy_table
+from navigator.citations import CitationFeed, CitationIndex, Presigner, kb_lookup_references
+from navigator.connections import CANCELLED, CLOSED, ConnectionRegistry
+from navigator.metrics import RequestTrace, model_usage
+from navigator.response import ResponseAccumulator
+from navigator.retry import wait_for_retry
+from navigator.roles import metric_role, role_session_state
+from navigator.scheduler import is_queue_event, queued_requests
+from navigator.session_state import SessionRoleStore
+from navigator.streaming import DeliveredText, SentenceSegmenter
+from navigator.websocket import WebSocketSender
+
+# AWS clients (created on first use)
+bedrock_agent = lazy_client('bedrock-agent-runtime', region_name='us-west-2')
+api_gateway = lazy_client('apigatewaymanagementapi', endpoint_url=os.environ['WS_API_ENDPOINT'])
+lambda_client = lazy_client('lambda')
+s3 = lazy_client('s3')
+sqs = lazy_client('sqs')
 
 agent_id = os.environ["AGENT_ID"]
 agent_alias_id = os.environ["AGENT_ALIAS_ID"]
 LOG_CLASSIFIER_FN_NAME = os.environ['LOG_CLASSIFIER_FN_NAME']
 
+# Interaction records go to the analytics queue (batched by logclassifier);
+# without ANALYTICS_QUEUE_URL each record is sent as an async logclassifier invoke
+ANALYTICS_QUEUE_URL = os.environ.get('ANALYTICS_QUEUE_URL')
+analytics = AnalyticsPublisher(ANALYTICS_QUEUE_URL, sqs_client=sqs, lambda_client=lambda_client,
+                               function_name=LOG_CLASSIFIER_FN_NAME)
+
+# Streaming flush budget: release buffered text once a full sentence of at least
+# STREAM_MIN_CHARS is available, or once the oldest text has waited STREAM_MAX_DELAY_MS
+STREAM_MIN_CHARS = int(os.environ.get('STREAM_MIN_CHARS', '120'))
+STREAM_MAX_DELAY_MS = int(os.environ.get('STREAM_MAX_DELAY_MS', '250'))
+
+# Pipelined WebSocket sends: worker threads and per-worker queue bound (backpressure)
+WS_SEND_WORKERS = int(os.environ.get('WS_SEND_WORKERS', '2'))
+WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE', '64'))
+
+# Agent retries: capped exponential backoff with full jitter; no retry once less than
+# RETRY_RESERVE_MS of Lambda time would be left for the new attempt
+AGENT_MAX_ATTEMPTS = int(os.environ.get('AGENT_MAX_ATTEMPTS', '2'))
+RETRY_BASE_DELAY_MS = int(os.environ.get('RETRY_BASE_DELAY_MS', '250'))
+RETRY_MAX_DELAY_MS = int(os.environ.get('RETRY_MAX_DELAY_MS', '4000'))
+RETRY_RESERVE_MS = int(os.environ.get('RETRY_RESERVE_MS', '20000'))
+
+# Knowledge-base references are sent as `citations` frames while the answer streams,
+# with download URLs presigned in the background (valid CITATION_URL_TTL_SECONDS)
+CITATION_URL_TTL_SECONDS = int(os.environ.get('CITATION_URL_TTL_SECONDS', '3600'))
+presigner = Presigner(s3, ttl_seconds=CITATION_URL_TTL_SECONDS)
+
+# Answer cache (disabled when ANSWER_CACHE_TABLE is not set)
+ANSWER_CACHE_TABLE = os.environ.get('ANSWER_CACHE_TABLE')
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '86400'))
+answer_cache = (
+    AnswerCache(lazy_table(ANSWER_CACHE_TABLE), ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
+    if ANSWER_CACHE_TABLE else None
+)
+
+# Which role context each agent session already has (in-process only when SESSION_TABLE is not set)
+SESSION_TABLE = os.environ.get('SESSION_TABLE')
+session_roles = SessionRoleStore(lazy_table(SESSION_TABLE) if SESSION_TABLE else None)
+
+# Open WebSocket connections written by websocketHandler (checks disabled when unset):
+# a closed connection or cancelled message is skipped up front and re-checked every
+# CONNECTION_CHECK_INTERVAL_MS
+CONNECTIONS_TABLE = os.environ.get('CONNECTIONS_TABLE')
+CONNECTION_CHECK_INTERVAL_MS = int(os.environ.get('CONNECTION_CHECK_INTERVAL_MS', '2000'))
+connections = ConnectionRegistry(lazy_table(CONNECTIONS_TABLE)) if CONNECTIONS_TABLE else None
+
+# Concurrency slots of websocketHandler's admission control, released here. The worker
+# renews a queued request's slot when it starts, or takes a new one if it expired in the
+# queue (MAX_IN_FLIGHT_GENERATIONS, 0 = no cap)
+ADMISSION_TABLE = os.environ.get('ADMISSION_TABLE')
+MAX_IN_FLIGHT_GENERATIONS = int(os.environ.get('MAX_IN_FLIGHT_GENERATIONS', '0'))
+BUSY_RETRY_AFTER_MS = int(os.environ.get('BUSY_RETRY_AFTER_MS', '5000'))
+admission_gate = ConcurrencyGate(
+    lazy_table(ADMISSION_TABLE), limit=MAX_IN_FLIGHT_GENERATIONS or None, retry_after=BUSY_RETRY_AFTER_MS / 1000
+) if ADMISSION_TABLE else None
+
+# Answers longer than RESPONSE_SPILL_CHARS are spooled and uploaded to RESPONSE_SPILL_BUCKET;
+# logclassifier then gets an S3 reference instead of the full text (disabled when unset)
+RESPONSE_SPILL_BUCKET = os.environ.get('RESPONSE_SPILL_BUCKET')
+RESPONSE_SPILL_CHARS = int(os.environ.get('RESPONSE_SPILL_CHARS', '0')) if RESPONSE_SPILL_BUCKET else 0
+
 def send_ws_response(connection_id, response):
     if connection_id and connection_id.startswith("mock-"):
         print(f"[TEST] Skipping WebSocket send for mock ID: {connection_id}")
@@ -42,260 +121,411 @@ def send_ws_response(connection_id, response):
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
 
-def get_role_specific_instructions(user_role):
+def send_frame(sender, connection_id, frame):
+    """Queue a frame on the pipelined sender. Returns False once the client is gone."""
+    if not connection_id:
+        return False
+    if connection_id.startswith("mock-"):
+        return True
+    return sender.send(connection_id, frame)
+
+def send_chunk(sender, connection_id, part):
+    """Queue one streamed text part as a `chunk` frame."""
+    if part:
+        send_frame(sender, connection_id, {'type': 'chunk', 'chunk': part})
+
+def send_parts(sender, connection_id, delivered, parts):
+    """
+    Sends segmented parts, skipping text the client already received from an
+    earlier attempt. A `reset` frame precedes the text when the attempt diverged.
+    """
+    for part in parts:
+        reset, text = delivered.accept(part)
+        if reset:
+            print("↩️ Retried answer diverged from delivered text, resetting client")
+            send_frame(sender, connection_id, {'type': 'reset'})
+        send_chunk(sender, connection_id, text)
+
+def close_event_stream(response):
+    """Stop reading the Bedrock completion stream early."""
+    completion = response.get('completion')
+    close = getattr(completion, 'close', None)
+    if close:
+        try:
+            close()
+        except Exception as e:
+            print(f"⚠️ Error closing Bedrock stream: {str(e)}")
+
+def send_citations(sender, connection_id, frames, request_trace):
+    """Queue the `citations` frames whose references have been presigned."""
+    if frames:
+        request_trace.mark('FirstCitationMs')
+    for frame in frames:
+        send_frame(sender, connection_id, frame)
+
+def stream_agent_answer(sender, connection_id, session_id, query, session_state, request_trace, delivered,
+                        cancelled=None, citation_feed=None, answer=None):
+    """
+    Invokes the Bedrock Agent once and relays its answer as `chunk` frames.
+    `delivered` holds the text sent by earlier attempts, which is not sent again.
+    New references go out through `citation_feed` as `citations` frames.
+    Once the `cancelled` event is set the stream is closed and buffered text is dropped.
+    The text is collected in `answer` (a new ResponseAccumulator by default), so the
+    caller keeps what was received when the stream fails.
+    Returns (answer, citation_index, client_gone).
+    """
+    citation_feed = citation_feed or CitationFeed()
+    answer = answer or ResponseAccumulator(spill_chars=RESPONSE_SPILL_CHARS)
+    delivered.begin_attempt()
+    with request_trace.span('BedrockInvokeMs'):
+        response = bedrock_agent.invoke_agent(
+            agentId=agent_id,
+            agentAliasId=agent_alias_id,
+            sessionId=session_id,
+            inputText=query,
+            enableTrace=True,  # CRITICAL: Enable trace to get knowledge base citations
+            sessionState=session_state
+        )
+
+    citation_index = CitationIndex()
+    segmenter = SentenceSegmenter(min_chars=STREAM_MIN_CHARS, max_delay_ms=STREAM_MAX_DELAY_MS)
+
+    print(f"🔄 Starting to stream response for connection: {connection_id}")
+    for event in response['completion']:
+        if connection_id and sender.is_gone(connection_id):
+            # Client left: stop consuming so Lambda time and Bedrock tokens are not spent on it
+            print(f"🛑 Connection {connection_id} is gone, abandoning generation")
+            close_event_stream(response)
+            return answer, citation_index, True
+        if cancelled is not None and cancelled.is_set():
+            print(f"⏹️ Generation cancelled for connection {connection_id}, closing Bedrock stream")
+            close_event_stream(response)
+            answer.finish()
+            return answer, citation_index, False
+
+        if 'chunk' in event:
+            chunk = event['chunk']
+            if 'bytes' in chunk:
+                # Decoded incrementally: a chunk may end inside a multi-byte character
+                chunk_text = answer.feed(chunk['bytes'])
+                request_trace.mark('FirstChunkMs')
+                request_trace.mark('LastChunkMs', first_only=False)
+                request_trace.count('Chunks')
+                print(f"📨 Received chunk from Bedrock ({len(chunk_text)} chars): {chunk_text[:50]}...")
+
+                # Re-segment into sentence-aligned parts; partial sentences stay
+                # buffered until the size/time budget releases them
+                if connection_id:
+                    send_parts(sender, connection_id, delivered, segmenter.feed(chunk_text))
+
+            # Extract citations if present in chunk attribution
+            for citation in chunk.get('attribution', {}).get('citations', []):
+                citation_feed.publish(citation_index.add_attribution(citation))
+
+        elif connection_id:
+            # Trace events still advance the flush timer for buffered text
+            send_parts(sender, connection_id, delivered, segmenter.poll())
+
+        usage = model_usage(event)
+        if usage:
+            request_trace.count('InputTokens', usage.get('inputTokens', 0))
+            request_trace.count('OutputTokens', usage.get('outputTokens', 0))
+
+        # Extract citations from trace events (Knowledge Base lookups)
+        retrieved_refs = kb_lookup_references(event)
+        if retrieved_refs:
+            new_refs = citation_index.add_trace_references(retrieved_refs)
+            print(f"📚 Found {len(retrieved_refs)} knowledge base references in trace, {len(new_refs)} new")
+            citation_feed.publish(new_refs)
+
+        if connection_id:
+            send_citations(sender, connection_id, citation_feed.ready(), request_trace)
+
+    # Release the tail of the answer that never reached a flush boundary
+    tail = answer.finish()
+    if connection_id:
+        send_parts(sender, connection_id, delivered, segmenter.feed(tail) + segmenter.flush())
+        reset, text = delivered.end_attempt()
+        if reset:
+            send_frame(sender, connection_id, {'type': 'reset'})
+            send_chunk(sender, connection_id, text)
+        # References still being presigned go out before the `complete` frame
+        send_citations(sender, connection_id, citation_feed.flush(), request_trace)
+
+    return answer, citation_index, False
+
+def replay_cached_answer(sender, connection_id, responsetext, request_trace):
+    """Sends a cached answer through the same chunk protocol as a live one."""
+    request_trace.mark('FirstChunkMs')
+    if not connection_id:
+        return
+    segmenter = SentenceSegmenter(min_chars=STREAM_MIN_CHARS, max_delay_ms=STREAM_MAX_DELAY_MS)
+    for part in segmenter.feed(responsetext) + segmenter.flush():
+        send_chunk(sender, connection_id, part)
+
+def spill_response(answer, session_id):
+    """Uploads an answer that outgrew RESPONSE_SPILL_CHARS. Returns its S3 URI, or None."""
+    key = f"responses/{datetime.utcnow():%Y/%m/%d}/{session_id}-{uuid.uuid4().hex[:8]}.txt"
+    try:
+        return answer.upload(s3, RESPONSE_SPILL_BUCKET, key)
+    except Exception as e:
+        print(f"⚠️ Error spilling response to S3: {str(e)}")
+        return None
+
+def tracked_connection(connection_id):
+    """True when the connection registry applies to this connection."""
+    return bool(connections and connection_id and not connection_id.startswith("mock-"))
+
+def watch_connection(sender, connection_id, message_id=None, cancelled=None):
     """
-    Returns role-specific system instructions for the Bedrock Agent.
+    Re-checks the connection registry in the background while an answer is
+    generated; a closed connection is marked gone on the sender and a
+    cancelled message sets `cancelled`, either of which stops the streaming
+    loop at its next event.
     """
-    role_instructions = {
-        'instructor': """You are assisting a certified MHFA Instructor. Focus your responses on:
-- Teaching methodologies and best practices for conducting MHFA courses
-- Course preparation, lesson planning, and classroom management
-- Instructor certification requirements, renewals, and continuing education
-- Accessing instructor-specific resources, manuals, and training materials
-- Professional development and staying current with MHFA updates
-- Handling challenging classroom scenarios and participant questions
-
-Use professional, peer-to-peer language. Provide pedagogical insights and reference instructor resources.""",
-
-        'staff': """You are assisting organizational staff implementing MHFA programs. Focus your responses on:
-- Program implementation strategies and organizational rollout
-- Scheduling, coordinating, and managing MHFA training sessions
-- Tracking employee certifications and program metrics
-- Budget considerations and resource allocation
-- Measuring program effectiveness and ROI
-- Integration with existing workplace wellness initiatives
-- Case studies and organizational best practices
-
-Use administrative, coordination-focused language. Provide strategic guidance for program management.""",
-
-        'learner': """You are assisting a MHFA course participant or learner. Focus your responses on:
-- Basic MHFA concepts, principles, and the ALGEE action plan
-- Course registration, certification process, and requirements
-- Practical application of MHFA skills in daily life
-- Understanding mental health conditions and crisis situations
-- Where to find additional learning resources and support
-- Recertification process and maintaining skills
-- Self-care and personal wellness while helping others
-
-Use clear, educational, supportive language. Make concepts accessible and actionable."""
-    }
-
-    return role_instructions.get(user_role, role_instructions['learner'])
+    if not tracked_connection(connection_id):
+        return nullcontext()
+    return connections.monitor(
+        connection_id, sender.mark_gone, interval=CONNECTION_CHECK_INTERVAL_MS / 1000,
+        message_id=message_id, on_cancelled=(lambda _: cancelled.set()) if cancelled is not None else None,
+    )
+
+def publish_send_metrics(sender, request_trace):
+    """Drains the sender and records its per-send latencies on the request trace."""
+    with request_trace.span('WsDrainMs'):
+        stats = sender.close()
+    for latency_ms in sender.latencies_ms():
+        request_trace.record('WsSendMs', latency_ms)
+    return stats
 
 def lambda_handler(event, context):
+    if is_queue_event(event):
+        return handle_queued_requests(event, context)
+    return handle_request(event, context)
+
+def handle_request(event, context):
+    lease_id = event.get("admission_lease")
+    try:
+        return answer_message(event, context)
+    finally:
+        if lease_id and admission_gate:
+            admission_gate.release(lease_id)
+
+def take_worker_lease(payload, lease_id, queue_trace):
+    """
+    Renews the concurrency slot websocketHandler took when it queued the request,
+    so the lease runs from now, or takes a new one when it expired while queued.
+    A request over the cap gets a `busy` frame and is dropped. Returns False when
+    the request must not be answered.
+    """
+    if not (admission_gate and admission_gate.limit):
+        return True
+    acquired, retry_after, in_flight = admission_gate.acquire(lease_id)
+    if in_flight is not None:
+        queue_trace.record('InFlightGenerations', in_flight, unit='Count')
+    if not acquired:
+        print(f"🚦 Rejected queued request {lease_id} (capacity), retry after {retry_after}s")
+        queue_trace.count('Throttled')
+        send_ws_response(payload.get('connectionId'), Admission(False, 'capacity', retry_after).busy_frame())
+        return False
+    payload['admission_lease'] = lease_id
+    return True
+
+def handle_queued_requests(event, context):
+    """
+    Scheduler worker: answers generation requests from a lane's FIFO queue in
+    order. Errors inside a request are already reported to the client, so only
+    an unexpected exception makes a message fail; that message and every later
+    one in the batch are then returned as failures to keep the session order.
+    """
+    failures = []
+    for message_id, payload, wait_ms in queued_requests(event):
+        if failures:
+            failures.append(message_id)
+            continue
+        if payload is None:
+            print(f"⚠️ Dropping unreadable queue message {message_id}")
+            continue
+
+        queue_trace = RequestTrace(Queue='generation', Lane=payload.get('lane', 'standard'))
+        if wait_ms is not None:
+            queue_trace.record('QueueWaitMs', wait_ms)
+            print(f"⏳ Request waited {wait_ms:.0f} ms in the {payload.get('lane')} lane")
+        queue_trace.properties.update(session_id=payload.get('session_id'), message_id=message_id)
+        if not take_worker_lease(payload, payload.get('admission_lease') or message_id, queue_trace):
+            queue_trace.emit()
+            continue
+        try:
+            handle_request(payload, context)
+        except Exception as e:
+            print(f"Error handling queued request {message_id}: {str(e)}")
+            queue_trace.count('WorkerErrors')
+            failures.append(message_id)
+        queue_trace.emit()
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failures]}
+
+def answer_message(event, context):
+    request_trace = RequestTrace(Transport='websocket', UserRole='guest', CacheHit=False)
+    sender = WebSocketSender(api_gateway, max_queue=WS_SEND_QUEUE_SIZE, workers=WS_SEND_WORKERS)
+    connection_id = event.get("connectionId")
     try:
         query = event.get("querytext", "").strip()
-        connection_id = event.get("connectionId")
         session_id = event.get("session_id", context.aws_request_id)
         user_role = event.get("user_role", "guest")
+        message_id = event.get("message_id")
+        request_trace.set_dimension('UserRole', metric_role(user_role))
+        request_trace.properties.update(session_id=session_id, request_id=context.aws_request_id)
+        if message_id:
+            request_trace.properties['message_id'] = message_id
+        if event.get("lane"):
+            request_trace.properties['lane'] = event["lane"]
 
         print(f"Received Query - Session: {session_id}, Role: {user_role}, Query: {query}")
 
-        max_retries = 2
-        full_response = ""
-
-        # Get role-specific instructions
-        role_instructions = get_role_specific_instructions(user_role)
+        state = connections.state(connection_id, message_id) if tracked_connection(connection_id) else None
+        if state == CLOSED:
+            # The user left before the request got here; nothing would receive the answer
+            print(f"🔌 Connection {connection_id} already closed, skipping request")
+            request_trace.count('ClosedConnectionSkips')
+            request_trace.emit()
+            return {'statusCode': 410, 'body': json.dumps({'error': 'Connection closed'})}
+        if state == CANCELLED:
+            # Cancelled while it waited in the queue
+            print(f"⏹️ Message {message_id} cancelled before generation, skipping request")
+            cancelled_frame = {'type': 'cancelled', 'message_id': message_id}
+            send_ws_response(connection_id, cancelled_frame)
+            request_trace.count('CancelledSkips')
+            request_trace.emit()
+            return {'statusCode': 200, 'body': json.dumps(cancelled_frame)}
 
-        for attempt in range(max_retries):
-            try:
-                response = bedrock_agent.invoke_agent(
-                    agentId=agent_id,
-                    agentAliasId=agent_alias_id,
-                    sessionId=session_id,
-                    inputText=query,
-                    enableTrace=True,  # CRITICAL: Enable trace to get knowledge base citations
-                    sessionState={
-                        'sessionAttributes': {
-                            'user_role': user_role,
-                            'role_instructions': role_instructions
-                        },
-                        'promptSessionAttributes': {
-                            'role_context': role_instructions
-                        }
-                    }
-                )
-
-                full_response = ""
-                citations = []
-
-                print(f"🔄 Starting to stream response for connection: {connection_id}")
-                for event in response['completion']:
-                    if 'chunk' in event:
-                        chunk = event['chunk']
-                        if 'bytes' in chunk:
-                            chunk_text = chunk['bytes'].decode('utf-8')
-                            full_response += chunk_text
-                            print(f"📨 Received chunk from Bedrock ({len(chunk_text)} chars): {chunk_text[:50]}...")
-
-                            # Split large chunks into smaller pieces for smoother streaming
-                            # Split by sentences first, then by words if still too large
-                            if connection_id and chunk_text.strip():
-                                # Split by sentences (period, exclamation, question mark followed by space or newline)
-                                # This regex keeps the punctuation with the sentence
-                                sentence_pattern = r'([.!?]+(?:\s+|$))'
-                                sentences = re.split(sentence_pattern, chunk_text)
-
-                                # Recombine sentences with their punctuation
-                                parts = []
-                                idx = 0
-                                while idx < len(sentences):
-                                    if idx + 1 < len(sentences):
-                                        # Combine sentence with its punctuation
-                                        combined = sentences[idx] + sentences[idx + 1]
-                                        if combined.strip():  # Only add non-empty parts
-                                            parts.append(combined)
-                                        idx += 2
-                                    else:
-                                        if sentences[idx].strip():  # Only add non-empty parts
-                                            parts.append(sentences[idx])
-                                        idx += 1
-
-                                # If we only got one part (no sentence breaks) or parts are still too large, split by words
-                                if not parts or len(parts) == 1 or any(len(p) > 100 for p in parts if p):
-                                    # Split by words for very long chunks or no sentence breaks
-                                    words = [w for w in chunk_text.split(' ') if w.strip()]  # Filter empty words
-                                    if words:
-                                        # Group words into chunks of 8 words for smoother streaming
-                                        word_chunks = []
-                                        chunk_size = 8
-                                        for word_idx in range(0, len(words), chunk_size):
-                                            chunk = ' '.join(words[word_idx:word_idx + chunk_size])
-                                            if word_idx + chunk_size < len(words):
-                                                chunk += ' '
-                                            word_chunks.append(chunk)
-                                        parts = word_chunks if word_chunks else [chunk_text]
-                                    else:
-                                        parts = [chunk_text] if chunk_text.strip() else []
-
-                                # Send each part immediately for visible streaming
-                                for part in parts:
-                                    if part and part.strip():  # Only send non-empty parts
-                                        chunk_payload = {
-                                            'type': 'chunk',
-                                            'chunk': part
-                                        }
-                                        try:
-                                            send_ws_response(connection_id, chunk_payload)
-                                            print(f"📤 Sent streaming part ({len(part)} chars): {part[:30]}...")
-                                        except Exception as chunk_error:
-                                            print(f"⚠️ Error sending chunk: {str(chunk_error)}")
-                                            # Continue streaming even if one chunk fails
-                                            pass
-
-                        # Extract citations if present in chunk attribution
-                        if 'attribution' in chunk and 'citations' in chunk['attribution']:
-                            for citation in chunk['attribution']['citations']:
-                                citation_info = {
-                                    'text': citation.get('generatedResponsePart', {}).get('textResponsePart', {}).get('text', ''),
-                                    'references': []
-                                }
-
-                                # Extract reference sources
-                                for ref in citation.get('retrievedReferences', []):
-                                    location = ref.get('location', {})
-                                    if location.get('type') == 'S3':
-                                        s3_location = location.get('s3Location', {})
-                                        citation_info['references'].append({
-                                            'source': s3_location.get('uri', ''),
-                                            'title': ref.get('metadata', {}).get('x-amz-bedrock-kb-source-uri', '').split('/')[-1]
-                                        })
-
-                                if citation_info['references']:
-                                    citations.append(citation_info)
-
-                    # Extract citations from trace events (Knowledge Base lookups)
-                    if 'trace' in event:
-                        trace = event['trace'].get('trace', {})
-                        if 'orchestrationTrace' in trace:
-                            orch_trace = trace['orchestrationTrace']
-                            if 'observation' in orch_trace:
-                                observation = orch_trace['observation']
-                                if 'knowledgeBaseLookupOutput' in observation:
-                                    kb_output = observation['knowledgeBaseLookupOutput']
-                                    retrieved_refs = kb_output.get('retrievedReferences', [])
-                                    print(f"📚 Found {len(retrieved_refs)} knowledge base references in trace")
-
-                                    if retrieved_refs:
-                                        # Create a citation object with all references
-                                        citation_info = {
-                                            'text': '',  # No specific text for KB references
-                                            'references': []
-                                        }
-
-                                        # Use a set to track unique sources within this citation
-                                        seen_sources = set()
-
-                                        for ref in retrieved_refs:
-                                            location = ref.get('location', {})
-                                            s3_location = location.get('s3Location', {})
-                                            uri = s3_location.get('uri', '')
-
-                                            if uri and uri not in seen_sources:
-                                                # Extract filename from URI
-                                                filename = uri.split('/')[-1] if '/' in uri else uri
-
-                                                citation_info['references'].append({
-                                                    'source': uri,
-                                                    'title': filename
-                                                })
-                                                seen_sources.add(uri)
-                                                print(f"📚 Added citation: {filename}")
-
-                                        # Only add if we have references and avoid duplicates
-                                        if citation_info['references']:
-                                            # Check if we already have these references
-                                            existing_sources = set()
-                                            for existing_citation in citations:
-                                                for ref in existing_citation.get('references', []):
-                                                    existing_sources.add(ref.get('source', ''))
-
-                                            new_refs = [ref for ref in citation_info['references']
-                                                       if ref['source'] not in existing_sources]
-
-                                            if new_refs:
-                                                citation_info['references'] = new_refs
-                                                citations.append(citation_info)
-
-                break
-            except Exception as e:
-                print(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt == max_retries - 1:
-                    raise
-
-        
-        print(full_response)
-
-        payload = {
-            "session_id": session_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "query": query,
-            "response": full_response
-        }
-
-        print(payload)
+        full_response = ""
+        response_chars = 0
+        response_s3_uri = None
+        citation_index = CitationIndex()
+        client_gone = False
+        cancelled = threading.Event()
+
+        # A cached answer skips the agent session, so only turns that cannot depend on
+        # the conversation are served from (and stored in) the cache
+        cache_turn = bool(answer_cache) and (is_quick_action(query) or session_roles.is_new_session(session_id))
+        cached = answer_cache.get(query, user_role) if cache_turn else None
+        request_trace.set_dimension('CacheHit', bool(cached))
+        if cached:
+            print(f"⚡ Answer cache hit ({cached.source}) for role {user_role}")
+            full_response, citation_index = cached.responsetext, cached.citations
+            response_chars = len(full_response)
+            replay_cached_answer(sender, connection_id, full_response, request_trace)
+            session_roles.remember_replay(session_id)
+        else:
+            # Full role instructions only on the session's first turn or after a role change
+            full_context = session_roles.needs_full_context(session_id, user_role)
+            session_state = role_session_state(user_role, full_context)
+            request_trace.properties['role_context'] = 'full' if full_context else 'key'
+            request_trace.count('SessionStateBytes', len(json.dumps(session_state)))
+
+            delivered = DeliveredText()
+            citation_feed = CitationFeed(presigner)
+            with watch_connection(sender, connection_id, message_id, cancelled):
+                for attempt in range(AGENT_MAX_ATTEMPTS):
+                    answer = ResponseAccumulator(spill_chars=RESPONSE_SPILL_CHARS)
+                    try:
+                        answer, citation_index, client_gone = stream_agent_answer(
+                            sender, connection_id, session_id, query, session_state, request_trace, delivered,
+                            cancelled=cancelled, citation_feed=citation_feed, answer=answer,
+                        )
+                        break
+                    except Exception as e:
+                        print(f"Attempt {attempt + 1} failed: {str(e)}")
+                        if cancelled.is_set():
+                            # The user already stopped this answer; end it as cancelled, not as an
+                            # error, with the text this attempt had received
+                            answer.finish()
+                            break
+                        if attempt == AGENT_MAX_ATTEMPTS - 1 or (connection_id and sender.is_gone(connection_id)):
+                            raise
+                        if not wait_for_retry(attempt, context.get_remaining_time_in_millis(),
+                                              reserve_ms=RETRY_RESERVE_MS, base_ms=RETRY_BASE_DELAY_MS,
+                                              max_ms=RETRY_MAX_DELAY_MS):
+                            print("⏱️ Not enough Lambda time left for another attempt")
+                            raise
+                        request_trace.count('Retries')
+
+            session_roles.remember(session_id, user_role)
+
+            if citation_feed.sent:
+                request_trace.count('CitationFrames', citation_feed.sent)
+            if delivered.suppressed_chars:
+                print(f"🔁 Suppressed {delivered.suppressed_chars} already-delivered chars on retry")
+
+            # Materialize the answer once; a spilled answer is only kept in S3
+            full_response = answer.text
+            response_chars = answer.chars
+            if answer.spilled:
+                response_s3_uri = spill_response(answer, session_id)
+
+            # A cancelled answer is partial, so it is never cached
+            if cache_turn and not client_gone and not cancelled.is_set() and full_response is not None:
+                answer_cache.put(query, user_role, full_response, citation_index)
+
+        if answer_cache:
+            print(f"📊 Answer cache stats: {json.dumps(answer_cache.stats())}")
+
+        print(f"📝 Answer: {response_chars} chars" + (f", spilled to {response_s3_uri}" if response_s3_uri else ""))
+
+        record = interaction_record(
+            session_id, query,
+            full_response if full_response is not None else answer.preview,
+            user_role=user_role,
+            response_s3_uri=response_s3_uri,
+            response_chars=response_chars if response_s3_uri else None,
+            cancelled=cancelled.is_set() or None,
+        )
 
+        # A spilled answer was already streamed as chunks; the client keeps that text
         result = {
                 'type': 'complete',
                 'responsetext': full_response,
-                'citations': citations if citations else []
+                'citations': citation_index.as_citations()
                  }
 
-        print(f"✅ Streaming complete, sending final message with {len(citations)} citations")
-        if connection_id:
-            send_ws_response(connection_id, result)
-
-        lambda_client.invoke(
-            FunctionName   = LOG_CLASSIFIER_FN_NAME,
-            InvocationType = 'Event',
-            Payload        = json.dumps(payload).encode('utf-8')
-        )
+        if client_gone:
+            print(f"⚠️ Client disconnected, skipping final message ({response_chars} chars generated)")
+            request_trace.count('AbandonedGenerations')
+            if tracked_connection(connection_id):
+                # Covers a $disconnect that never arrived
+                connections.remove(connection_id)
+        elif cancelled.is_set():
+            # The client keeps the text it already received
+            print(f"⏹️ Generation cancelled after {response_chars} chars, sending cancelled frame")
+            result = {'type': 'cancelled', 'message_id': message_id}
+            send_frame(sender, connection_id, result)
+            request_trace.count('Cancelled')
+            request_trace.mark('CompleteMs')
+        else:
+            print(f"✅ Streaming complete, sending final message with {len(citation_index)} citations")
+            send_frame(sender, connection_id, result)
+            request_trace.mark('CompleteMs')
+
+        print(f"📊 WebSocket send stats: {json.dumps(publish_send_metrics(sender, request_trace))}")
+
+        with request_trace.span('LogDispatchMs'):
+            try:
+                analytics.publish(record)
+            except Exception as log_error:
+                # The answer was delivered; losing its analytics record must not turn into an error frame
+                print(f"⚠️ Logging error: {str(log_error)}")
 
+        request_trace.count('ResponseChars', response_chars)
+        request_trace.emit()
         return {'statusCode': 200, 'body': json.dumps(result)}
 
     except Exception as e:
         print(f"Error: {str(e)}")
         error_msg = {'error': str(e)}
-        if connection_id:
+        # Drain queued frames first so the error arrives after them
+        publish_send_metrics(sender, request_trace)
+        if connection_id and not sender.is_gone(connection_id):
             send_ws_response(connection_id, error_msg)
-        return {'statusCode': 500, 'body': json.dumps(error_msg)}
\ No newline at end of file
+        request_trace.count('Errors')
+        request_trace.emit()
+        return {'statusCode': 500, 'body': json.dumps(error_msg)}
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+from boto3.dynamodb.conditions import Attr
+
+from navigator.aws import lazy_resource, lazy_table
+from navigator.session_logs import (
+    decode_token, encode_token, fetch_rows, latest_feedback, parse_since, query_newest,
+)
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Env & AWS clients
+# ──────────────────────────────────────────────────────────────────────────────
+TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+FEEDBACK_TABLE_NAME = os.environ.get("FEEDBACK_TABLE", "NCMWResponseFeedback")
+# Date-bucketed GSI written by logclassifier (projects location and user_role only; the
+# query / response of a page's rows are fetched by key). Days before DAY_INDEX_SINCE are
+# not in the index and cannot be browsed, and browsing is off while it is unset;
+# DAY_BUCKET_SHARDS must match logclassifier
+DAY_INDEX = os.environ.get("DAY_INDEX", "DayIndex")
+DAY_INDEX_SINCE = parse_since(os.environ.get("DAY_INDEX_SINCE", ""))
+DAY_BUCKET_SHARDS = int(os.environ.get("DAY_BUCKET_SHARDS", "1"))
+# Feedback table GSI on (session_id, timestamp); the sentiment of each conversation
+# and the `sentiment` filter come from it
+FEEDBACK_SESSION_INDEX = os.environ.get("FEEDBACK_SESSION_INDEX", "")
+FEEDBACK_QUERY_WORKERS = int(os.environ.get("FEEDBACK_QUERY_WORKERS", "16"))
+# Page size (default / largest accepted `limit`), Queries per page before a page
+# stops short, and the window browsed when no start_date is given
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "25"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "100"))
+PAGE_QUERIES = int(os.environ.get("PAGE_QUERIES", "16"))
+DEFAULT_WINDOW_DAYS = int(os.environ.get("DEFAULT_WINDOW_DAYS", "90"))
+ddb = lazy_resource("dynamodb")
+table = lazy_table(TABLE_NAME)
+feedback_table = lazy_table(FEEDBACK_TABLE_NAME)
+
+SENTIMENTS = ("positive", "negative", "neutral")
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Helpers
+# ──────────────────────────────────────────────────────────────────────────────
+def log(*msg):
+    print("[CONVERSATIONS]", *msg)
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+        },
+        "body": json.dumps(body),
+    }
+
+
+def bad_request(msg):
+    return respond(400, {"error": msg})
+
+
+def parse_window(params, now):
+    """(start, end) datetimes of the start_date / end_date parameters; ValueError when invalid."""
+    end = now
+    if params.get("end_date"):
+        end = min(datetime.strptime(params["end_date"], "%Y-%m-%d").replace(hour=23, minute=59, second=59), now)
+    if params.get("start_date"):
+        start = datetime.strptime(params["start_date"], "%Y-%m-%d")
+    else:
+        start = datetime(end.year, end.month, end.day) - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if start < DAY_INDEX_SINCE:
+        log("Start clamped to DAY_INDEX_SINCE:", DAY_INDEX_SINCE.date())
+        start = DAY_INDEX_SINCE
+    if start > end:
+        raise ValueError("start_date is after end_date")
+    return start, end
+
+
+class Votes:
+    """Newest vote per session, looked up once per session on the feedback session index."""
+
+    def __init__(self):
+        self.by_session = {}
+        self.queries = 0
+
+    def sentiment(self, session_id):
+        """'positive' / 'negative', 'neutral' without a vote, None when not looked up."""
+        if session_id not in self.by_session:
+            return None
+        return self.by_session[session_id] or "neutral"
+
+    def lookup(self, rows):
+        missing = list(dict.fromkeys(r["session_id"] for r in rows if r["session_id"] not in self.by_session))
+        if missing:
+            found = latest_feedback(feedback_table, missing, FEEDBACK_SESSION_INDEX, FEEDBACK_QUERY_WORKERS)
+            self.queries += len(missing)
+            for session_id in missing:
+                self.by_session[session_id] = found.get(session_id)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Lambda entry-point
+# ──────────────────────────────────────────────────────────────────────────────
+def lambda_handler(event, context):
+    log("=== NEW INVOCATION ============================================")
+    log("Raw queryStringParameters :", event.get("queryStringParameters"))
+
+    if not DAY_INDEX_SINCE:
+        return respond(501, {"error": "Conversation browsing is not enabled (DAY_INDEX_SINCE is not set)"})
+
+    params = event.get("queryStringParameters") or {}
+    try:
+        limit = int(params.get("limit") or PAGE_SIZE)
+    except ValueError:
+        return bad_request("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return bad_request(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    # 1) Window, filters and position: from the cursor when paging, else from the parameters
+    if params.get("cursor"):
+        try:
+            state = decode_token(params["cursor"])
+            start, end = (datetime.fromisoformat(ts) for ts in state["window"])
+            filters = dict(state["filters"])
+            position = state["position"]
+        except (ValueError, KeyError, TypeError) as e:
+            return bad_request(f"Invalid cursor: {e}")
+    else:
+        try:
+            start, end = parse_window(params, datetime.utcnow())
+        except ValueError as e:
+            return bad_request(f"Invalid date range (use YYYY-MM-DD): {e}")
+        filters = {name: params[name] for name in ("location", "role", "sentiment") if params.get(name)}
+        position = None
+        if filters.get("sentiment"):
+            filters["sentiment"] = filters["sentiment"].lower()
+            if filters["sentiment"] not in SENTIMENTS:
+                return bad_request(f'Invalid sentiment "{filters["sentiment"]}". Use: {", ".join(SENTIMENTS)}')
+
+    if filters.get("sentiment") and not FEEDBACK_SESSION_INDEX:
+        return bad_request("The sentiment filter needs the feedback session index (FEEDBACK_SESSION_INDEX)")
+
+    log("Start / End UTC           :", start, "/", end)
+    log("Filters                   :", filters)
+
+    # 2) Location and role are evaluated by DynamoDB; sentiment lives in the feedback
+    #    table, so it is checked per day against the sessions' newest votes
+    query_kwargs = {}
+    conditions = []
+    if filters.get("location"):
+        conditions.append(Attr("location").eq(filters["location"]))
+    if filters.get("role"):
+        conditions.append(Attr("user_role").eq(filters["role"]))
+    if conditions:
+        condition = conditions[0]
+        for extra in conditions[1:]:
+            condition = condition & extra
+        query_kwargs["FilterExpression"] = condition
+
+    votes = Votes()
+    keep = None
+    if filters.get("sentiment"):
+        def keep(rows):
+            votes.lookup(rows)
+            return [r for r in rows if votes.sentiment(r["session_id"]) == filters["sentiment"]]
+
+    # 3) One page, newest first, from a bounded number of Queries
+    started = time.perf_counter()
+    try:
+        rows, next_position, stats = query_newest(
+            table, start, end,
+            position=position,
+            limit=limit,
+            shards=DAY_BUCKET_SHARDS,
+            index_name=DAY_INDEX,
+            max_queries=PAGE_QUERIES,
+            keep=keep,
+            **query_kwargs,
+        )
+    except Exception as e:
+        log(f"Page query failed: {e}")
+        return respond(503, {"error": "Conversations are temporarily unavailable"})
+
+    if FEEDBACK_SESSION_INDEX and not keep:
+        try:
+            votes.lookup(rows)
+        except Exception as e:
+            log(f"Feedback index unavailable, sentiment omitted: {e}")
+
+    # 4) Bodies of the page's rows, by key
+    bodies = fetch_rows(
+        ddb, TABLE_NAME, rows,
+        ProjectionExpression="session_id, #ts, #q, #r",
+        ExpressionAttributeNames={"#ts": "timestamp", "#q": "query", "#r": "response"},
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log(f"Page                      : {len(rows)} rows, {stats['queries']} queries, "
+        f"{stats['scanned']} rows read, {votes.queries} feedback queries, "
+        f"{len(bodies)} bodies, {elapsed_ms:.0f} ms")
+
+    conversations = []
+    for row in rows:
+        body = bodies.get((row["session_id"], row["timestamp"]), {})
+        conversations.append({
+            "session_id": row["session_id"],
+            "timestamp":  row["original_ts"],
+            "query":      body.get("query", ""),
+            "response":   body.get("response", ""),
+            "location":   row.get("location"),
+            "user_role":  row.get("user_role"),
+            "sentiment":  votes.sentiment(row["session_id"]),
+        })
+
+    next_cursor = None
+    if next_position is not None:
+        next_cursor = encode_token({
+            "window": [start.isoformat(), end.isoformat()],
+            "filters": filters,
+            "position": next_position,
+        })
+
+    log("Returning 200")
+    return respond(200, {
+        "start_date":    start.strftime("%Y-%m-%d"),
+        "end_date":      end.strftime("%Y-%m-%d"),
+        "filters":       filters,
+        "conversations": conversations,
+        # More conversations (older, or not yet reached within this page's query budget)
+        # follow while next_cursor is set, even when this page is short or empty
+        "next_cursor":   next_cursor,
+    })
@@ -1,16 +1,21 @@
 import os
 import json
-import boto3
 from datetime import datetime
 from uuid import uuid4
 
+from navigator.aws import lazy_client, lazy_table
+from navigator.session_state import mark_escalated
+
 # lambda function created based on https://docs.aws.amazon.com/bedrock/latest/userguide/agents-lambda.html#agents-lambda-response
-ses = boto3.client("ses")
-dynamodb = boto3.resource("dynamodb")
+ses = lazy_client("ses")
 
 # Get table name from environment
 ESCALATED_TABLE = os.environ.get("ESCALATED_QUERIES_TABLE", "NCMWEscalatedQueries")
-escalated_table = dynamodb.Table(ESCALATED_TABLE)
+escalated_table = lazy_table(ESCALATED_TABLE)
+
+# Escalated sessions get their follow-up questions scheduled on the priority lane
+SESSION_TABLE = os.environ.get("SESSION_TABLE")
+session_table = lazy_table(SESSION_TABLE) if SESSION_TABLE else None
 
 def lambda_handler(event, context):
     print("Event keys:", list(event.keys()))
@@ -79,6 +84,10 @@ def lambda_handler(event, context):
     except Exception as ddb_exc:
         print(f"DynamoDB Error: {ddb_exc}", flush=True)
 
+    # The action group event carries the agent session, which is the chat session
+    if session_table and event.get("sessionId"):
+        mark_escalated(session_table, event["sessionId"])
+
     # Then try to send email (less critical if it fails)
     ses_fail = False
     try:
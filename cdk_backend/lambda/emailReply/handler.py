@@ -1,14 +1,15 @@
 import os
 import json
 import re
-import boto3
 from email import policy
 from email.parser import BytesParser
 from datetime import datetime
 
+from navigator.aws import lazy_client
+
 # AWS clients
-s3              = boto3.client('s3')
-bedrock_agent   = boto3.client('bedrock-agent')
+s3              = lazy_client('s3')
+bedrock_agent   = lazy_client('bedrock-agent')
 
 # Environment variables
 SOURCE_BUCKET   = os.environ['SOURCE_BUCKET_NAME']       # your SES email bucket
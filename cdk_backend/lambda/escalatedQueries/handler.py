@@ -1,15 +1,15 @@
 import os
 import json
 from datetime import datetime, timedelta
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 
+from navigator.aws import lazy_table
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  Env & AWS clients
 # ──────────────────────────────────────────────────────────────────────────────
 TABLE_NAME = os.environ["ESCALATED_QUERIES_TABLE"]
-ddb = boto3.resource("dynamodb")
-table = ddb.Table(TABLE_NAME)
+table = lazy_table(TABLE_NAME)
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  Helpers
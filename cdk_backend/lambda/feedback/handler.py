@@ -1,12 +1,16 @@
 import json
-import boto3
 import os
 from datetime import datetime
 from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
+from navigator.aws import lazy_table
+from navigator.rollups import RollupStore
+
 table_name = os.environ.get('FEEDBACK_TABLE', 'NCMWResponseFeedback')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
+# Daily / hourly vote counters read by the analytics endpoint (unset: off)
+ROLLUP_TABLE = os.environ.get('ROLLUP_TABLE', '')
+rollups = RollupStore(lazy_table(ROLLUP_TABLE)) if ROLLUP_TABLE else None
 
 def lambda_handler(event, context):
     """
@@ -91,6 +95,8 @@ def handle_submit_feedback(event, headers):
                         'timestamp': timestamp
                     }
                 )
+                if rollups:
+                    rollups.record_vote(message_id, None, timestamp)
                 return {
                     'statusCode': 200,
                     'headers': headers,
@@ -114,6 +120,8 @@ def handle_submit_feedback(event, headers):
         }
 
         table.put_item(Item=item)
+        if rollups:
+            rollups.record_vote(message_id, feedback, timestamp)
 
         return {
             'statusCode': 200,
@@ -1,25 +1,69 @@
 import os
 import json
-import boto3
+import time
 from datetime import datetime
 from botocore.exceptions import ClientError
 
+from navigator.answer_cache import AnswerCache
+from navigator.aws import lazy_client, lazy_table
+from navigator.warmup import agent_answer, warm_answer_cache
+
 # Environment variables
 KNOWLEDGE_BASE_ID = os.environ['KNOWLEDGE_BASE_ID']
 DATA_SOURCE_ID = os.environ['DATA_SOURCE_ID']
+ANSWER_CACHE_TABLE = os.environ.get('ANSWER_CACHE_TABLE')
+
+# Ingestion job polling
+INGESTION_POLL_SECONDS = int(os.environ.get('INGESTION_POLL_SECONDS', '15'))
+INGESTION_TERMINAL_STATUSES = {'COMPLETE', 'FAILED', 'STOPPED'}
+# A job is given up (and admins alerted) after INGESTION_MAX_STATUS_ERRORS failed status
+# lookups in a row, or once it has been watched INGESTION_MAX_WAIT_SECONDS across handoffs
+INGESTION_MAX_STATUS_ERRORS = int(os.environ.get('INGESTION_MAX_STATUS_ERRORS', '3'))
+INGESTION_MAX_WAIT_SECONDS = int(os.environ.get('INGESTION_MAX_WAIT_SECONDS', '14400'))
+
+# Answer-cache warm-up of the quick-action queries (skipped when AGENT_ID is not set)
+AGENT_ID = os.environ.get('AGENT_ID')
+AGENT_ALIAS_ID = os.environ.get('AGENT_ALIAS_ID')
+WARMUP_CONCURRENCY = int(os.environ.get('WARMUP_CONCURRENCY', '3'))
+WARMUP_MIN_INTERVAL_MS = int(os.environ.get('WARMUP_MIN_INTERVAL_MS', '500'))
+# Time kept free at the end of an invocation for the handoff and the report
+WARMUP_RESERVE_SECONDS = 30
 
 # AWS Clients
-bedrock_agent = boto3.client('bedrock-agent')
-sns = boto3.client('sns')
+bedrock_agent = lazy_client('bedrock-agent')
+bedrock_agent_runtime = lazy_client('bedrock-agent-runtime')
+sns = lazy_client('sns')
+lambda_client = lazy_client('lambda')
+
+answer_cache = AnswerCache(lazy_table(ANSWER_CACHE_TABLE)) if ANSWER_CACHE_TABLE else None
 
 def lambda_handler(event, context):
     """
     Triggered by S3 events (PUT, DELETE) to sync the Bedrock Knowledge Base.
-    Starts an ingestion job to re-index the knowledge base with updated documents.
+    Starts an ingestion job to re-index the knowledge base with updated documents,
+    then waits for it to finish so cached answers can be invalidated.
+
+    Also accepts {"action": "await_ingestion", "ingestionJobId": "..."} to watch
+    a job started elsewhere (adminFile sync, or a previous kb-sync that ran out of time),
+    and {"action": "warm_cache"} to (re)run the answer-cache warm-up on its own.
     """
 
     print(f"Received event: {json.dumps(event)}")
 
+    if event.get('action') == 'await_ingestion':
+        status = await_ingestion_job(event.get('ingestionJobId'), context, event.get('watch'))
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'ingestionJobId': event.get('ingestionJobId'), 'status': status})
+        }
+
+    if event.get('action') == 'warm_cache':
+        report = warm_quick_actions(context)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'warmup': report})
+        }
+
     # Extract S3 event details
     try:
         records = event.get('Records', [])
@@ -52,11 +96,16 @@ def lambda_handler(event, context):
         # Notify admins (optional)
         notify_admins(file_changes, response)
 
+        job_id = response.get('ingestionJob', {}).get('ingestionJobId')
+        # 'existing-job' means another sync owns the running job and is already watching it
+        status = await_ingestion_job(job_id, context) if job_id != 'existing-job' else 'IN_PROGRESS'
+
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'message': 'Knowledge base sync initiated successfully',
-                'ingestionJobId': response.get('ingestionJob', {}).get('ingestionJobId'),
+                'ingestionJobId': job_id,
+                'ingestionStatus': status,
                 'filesProcessed': len(file_changes),
                 'changes': file_changes
             })
@@ -108,6 +157,121 @@ def start_ingestion_job():
             raise
 
 
+def await_ingestion_job(job_id, context, watch=None):
+    """
+    Polls an ingestion job until it reaches a terminal status, then runs the
+    post-ingestion steps. If this invocation is about to time out, hands the job
+    off to a fresh asynchronous invocation of this function instead, passing
+    `watch` (when the watch started, failed lookups in a row, handoffs so far).
+
+    Gives up, alerting the admins, after INGESTION_MAX_STATUS_ERRORS failed
+    lookups in a row (a job that does not exist, or a persistent API error) or
+    once the job has been watched for INGESTION_MAX_WAIT_SECONDS in total.
+    """
+    if not job_id:
+        return None
+
+    watch = watch or {}
+    started_at = watch.get('startedAt') or time.time()
+    status_errors = int(watch.get('statusErrors', 0))
+    handoffs = int(watch.get('handoffs', 0))
+    status = None
+    while True:
+        job = get_ingestion_job_status(job_id)
+        if job is None:
+            status_errors += 1
+            if status_errors >= INGESTION_MAX_STATUS_ERRORS:
+                stop_watching(job_id, f"its status could not be read {status_errors} times in a row")
+                return 'UNKNOWN'
+        else:
+            status_errors = 0
+            status = job.get('status')
+        if status in INGESTION_TERMINAL_STATUSES:
+            print(f"Ingestion job {job_id} finished with status {status}")
+            on_ingestion_finished(job_id, status, context)
+            return status
+
+        waited = time.time() - started_at
+        if waited >= INGESTION_MAX_WAIT_SECONDS:
+            stop_watching(job_id, f"it was still {status} after {waited / 60:.0f} minutes")
+            return status
+
+        if context.get_remaining_time_in_millis() < (INGESTION_POLL_SECONDS + 30) * 1000:
+            print(f"Ingestion job {job_id} still {status}; handing off to a new invocation "
+                  f"(handoff {handoffs + 1}, watched {waited / 60:.0f} minutes)")
+            lambda_client.invoke(
+                FunctionName=context.invoked_function_arn,
+                InvocationType='Event',
+                Payload=json.dumps({
+                    'action': 'await_ingestion',
+                    'ingestionJobId': job_id,
+                    'watch': {'startedAt': started_at, 'statusErrors': status_errors, 'handoffs': handoffs + 1},
+                })
+            )
+            return status
+
+        time.sleep(INGESTION_POLL_SECONDS)
+
+
+def stop_watching(job_id, reason):
+    """Gives up on an ingestion job; cached answers stay valid until the next sync."""
+    print(f"Giving up on ingestion job {job_id}: {reason}")
+    alert_admins(
+        'Knowledge Base Sync Not Confirmed',
+        f"Stopped watching ingestion job {job_id} because {reason}.\n\n"
+        "Cached chatbot answers were not invalidated. Check the job in the Bedrock console "
+        "and start a new sync if needed."
+    )
+
+
+def on_ingestion_finished(job_id, status, context):
+    """
+    Invalidates cached agent answers once the knowledge base content has changed,
+    then warms the cache again with the quick-action queries.
+    """
+    if status != 'COMPLETE' or not answer_cache:
+        return
+    try:
+        version = answer_cache.invalidate()
+        print(f"Answer cache invalidated after ingestion job {job_id}, kb_version={version}")
+    except Exception as e:
+        print(f"Error invalidating answer cache: {str(e)}")
+        return
+
+    warm_quick_actions(context)
+
+
+def warm_quick_actions(context):
+    """
+    Runs every role's quick-action queries through the agent and stores the answers,
+    so the first click after a sync is served from the cache. Queries that did not
+    fit in this invocation are handed off to a new one.
+    """
+    if not answer_cache or not AGENT_ID or not AGENT_ALIAS_ID:
+        print("Answer cache or agent not configured. Skipping warm-up.")
+        return None
+
+    time_budget = context.get_remaining_time_in_millis() / 1000 - WARMUP_RESERVE_SECONDS
+    report = warm_answer_cache(
+        answer_cache,
+        lambda query, role: agent_answer(bedrock_agent_runtime, AGENT_ID, AGENT_ALIAS_ID, query, role),
+        max_workers=WARMUP_CONCURRENCY,
+        min_interval=WARMUP_MIN_INTERVAL_MS / 1000,
+        time_budget=max(0, time_budget),
+    )
+    print(f"Answer cache warm-up report: {json.dumps(report)}")
+
+    # Only hand off when this run made progress, so a stuck agent cannot loop forever
+    if report['skipped'] and report['warmed']:
+        print(f"{report['skipped']} warm-up queries left; handing off to a new invocation")
+        lambda_client.invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps({'action': 'warm_cache'})
+        )
+    return report
+
+
 def notify_admins(file_changes, ingestion_response):
     """
     Sends SNS notification to admins about knowledge base sync.
@@ -161,6 +325,18 @@ Note: No action required. This is an automated notification.
         # Don't fail the entire function if notification fails
 
 
+def alert_admins(subject, message):
+    """Publishes an alert to the admin SNS topic (skipped when none is configured)."""
+    sns_topic_arn = os.environ.get('ADMIN_NOTIFICATION_TOPIC_ARN')
+    if not sns_topic_arn:
+        print("No SNS topic configured. Skipping admin alert.")
+        return
+    try:
+        sns.publish(TopicArn=sns_topic_arn, Subject=subject, Message=message)
+    except Exception as e:
+        print(f"Error sending admin alert: {str(e)}")
+
+
 def get_ingestion_job_status(job_id):
     """
     Check the status of an ingestion job (optional monitoring function).
@@ -1,80 +1,244 @@
 import os
 import json
+import time
 import uuid
+import base64
+from collections import Counter
 from datetime import datetime
 from decimal import Decimal
-import boto3
+
+from navigator.analytics import normalize_record
+from navigator.aws import lazy_resource, lazy_table
+from navigator.rollups import RollupStore
+from navigator.session_logs import day_bucket
 
 # ─── Configuration ────────────────────────────────────────────────────────────
 DYNAMODB_TABLE = os.environ['DYNAMODB_TABLE']
+# Daily / hourly analytics counters kept up to date as items are written (unset: off)
+ROLLUP_TABLE = os.environ.get('ROLLUP_TABLE', '')
+# Partitions per day in the DayIndex GSI; retrieveSessionLogs must use the same value
+DAY_BUCKET_SHARDS = int(os.environ.get('DAY_BUCKET_SHARDS', '1'))
+
+# BatchWriteItem accepts at most 25 puts; unprocessed items are retried with backoff
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_ATTEMPTS = int(os.environ.get('BATCH_WRITE_ATTEMPTS', '5'))
+BATCH_WRITE_BASE_DELAY = 0.05
+
+# Per-record outcomes of a batch
+WRITTEN = "written"
+FAILED = "failed"
+DROPPED = "dropped"
 
 # ─── AWS Clients ───────────────────────────────────────────────────────────────
-ddb   = boto3.resource('dynamodb')
-table = ddb.Table(DYNAMODB_TABLE)
+ddb   = lazy_resource('dynamodb')
+table = lazy_table(DYNAMODB_TABLE)
+rollups = RollupStore(lazy_table(ROLLUP_TABLE)) if ROLLUP_TABLE else None
 
 
 def lambda_handler(event, context):
     """
     Logs conversation data to DynamoDB.
-    Expects a single-record event with keys:
+
+    Accepts a batch of interaction records in any of these shapes:
+      - SQS, from the analytics queue ({"Records": [...]}, one record per message body)
+      - Kinesis ({"Records": [...]}, one base64-encoded JSON record per entry)
+      - a direct invoke with a list of records, or {"records": [...]}
+    or a single-record event with keys:
       session_id, timestamp, query, response, location, [confidence]
 
+    Batches are written with BatchWriteItem; SQS and Kinesis get partial batch
+    failures back, direct list invokes get one result per record.
+
+    Very long answers are not sent inline: `response` then holds a preview and
+    `response_s3_uri` / `response_chars` point at the full text in S3.
+
     Note: AI sentiment analysis and question classification have been removed.
     The system now relies on manual user feedback (thumbs up/down) for sentiment
     tracking, which provides more accurate user satisfaction data at zero AI cost.
     """
-    print("Received event:", json.dumps(event))
+    source, entries = batch_entries(event)
+    if entries is not None:
+        results = handle_batch(source, entries)
+        if source == "list":
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"results": [{"id": rid, "status": status} for rid, status in results.items()]})
+            }
+        return {"batchItemFailures": [
+            {"itemIdentifier": rid} for rid, status in results.items() if status == FAILED
+        ]}
 
+    item = build_item(normalize_record(event))
+    if item is None:
+        print(f"[lambda_handler] Dropped record for session {event.get('session_id')}: missing query or response")
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing query or response"})
+        }
+    print(f"[lambda_handler] session {item['session_id']}: query {len(item['query'])} chars, "
+          f"response {len(item['response'])} chars")
+
+    # Write to DynamoDB
+    try:
+        # amazonq-ignore-next-line
+        table.put_item(Item=item)
+    except Exception as e:
+        print(f"[lambda_handler] DynamoDB error: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": "Failed to write to DynamoDB"})
+        }
+    if rollups:
+        rollups.record_interactions([item])
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "session_id": item["session_id"],
+            "timestamp":  item["timestamp"]
+        })
+    }
+
+
+def batch_entries(event):
+    """
+    (source, [(record id, loader), ...]) for a batched event, or (None, None)
+    for a single record. Each loader returns the record payload and raises
+    ValueError/TypeError when the entry is unreadable. The ids are what the
+    event source expects back in batchItemFailures (SQS message id, Kinesis
+    sequence number) or the position in a direct list invoke.
+    """
+    if isinstance(event, list):
+        records = event
+    elif isinstance(event, dict) and isinstance(event.get("records"), list):
+        records = event["records"]
+    else:
+        records = event.get("Records") or []
+        source = records[0].get("eventSource") if records else None
+        if source == "aws:sqs":
+            return "sqs", [(r["messageId"], lambda r=r: json.loads(r["body"])) for r in records]
+        if source == "aws:kinesis":
+            return "kinesis", [
+                (r["kinesis"]["sequenceNumber"], lambda r=r: json.loads(base64.b64decode(r["kinesis"]["data"])))
+                for r in records
+            ]
+        return None, None
+    return "list", [(str(i), lambda r=r: json.loads(r) if isinstance(r, str) else r) for i, r in enumerate(records)]
+
+
+def build_item(record):
+    """
+    DynamoDB item for one interaction record, or None when it lacks a query or
+    response. The sort key suffix comes from `record_id` when the producer set
+    one, so a redelivered queue message overwrites instead of duplicating.
+    """
     # 1) Session ID
-    session_id = event.get("session_id") or str(uuid.uuid4())
+    session_id = record.get("session_id") or str(uuid.uuid4())
 
     # 2) Timestamp + unique suffix for SK
-    iso_ts = event.get("timestamp") or datetime.utcnow().isoformat()
-    sort_key = f"{iso_ts}#{uuid.uuid4().hex[:8]}"
+    iso_ts = record.get("timestamp") or datetime.utcnow().isoformat()
+    suffix = (record.get("record_id") or uuid.uuid4().hex)[:8]
+    sort_key = f"{iso_ts}#{suffix}"
 
     # 3) Pull fields
-    question      = event.get("query", "")
-    response_text = event.get("response", "")
-    location      = event.get("location", "")
-    confidence    = event.get("confidence", None)
+    question      = record.get("query", "")
+    response_text = record.get("response", "")
+    location      = record.get("location", "")
+    confidence    = record.get("confidence", None)
+    response_uri  = record.get("response_s3_uri")
 
     if not question or not response_text:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Missing query or response"})
-        }
+        return None
 
     # 4) Build item (sentiment and category fields removed)
     item = {
         "session_id": session_id,   # PK
         "timestamp":  sort_key,      # SK
         "original_ts": iso_ts,
+        "day_bucket":  day_bucket(iso_ts, session_id, DAY_BUCKET_SHARDS),   # DayIndex PK
         "query":       question,
         "response":    response_text,
         "location":    location
     }
+    if record.get("user_role"):
+        item["user_role"] = record["user_role"]
+    if record.get("cancelled"):
+        item["cancelled"] = True
+    if response_uri:
+        item["response_s3_uri"] = response_uri
+        item["response_chars"]  = int(record.get("response_chars") or 0)
     if confidence is not None:
         try:
             item["confidence"] = Decimal(str(confidence))
         # amazonq-ignore-next-line
         except:
             pass
+    return item
 
-    # 5) Write to DynamoDB
-    try:
-        # amazonq-ignore-next-line
-        table.put_item(Item=item)
-    except Exception as e:
-        print(f"[lambda_handler] DynamoDB error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": "Failed to write to DynamoDB"})
-        }
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps({
-            "session_id": session_id,
-            "timestamp":  sort_key
-        })
-    }
+def handle_batch(source, entries):
+    """
+    Writes a batch of records with BatchWriteItem in chunks of 25 and returns
+    {record id: WRITTEN | FAILED | DROPPED}. Malformed records are logged and
+    dropped: redelivering them cannot succeed. A record delivered twice in one
+    batch shares the outcome of its first copy.
+    """
+    started = time.perf_counter()
+    results = {rid: None for rid, _ in entries}   # keeps the event order
+    items = {}           # (session_id, timestamp) -> item
+    ids_by_key = {}      # (session_id, timestamp) -> [record id, ...]
+    for rid, load in entries:
+        try:
+            item = build_item(normalize_record(load()))
+        except (ValueError, TypeError, KeyError) as e:
+            item = None
+            print(f"[handle_batch] Unreadable {source} record {rid}: {e}")
+        if item is None:
+            results[rid] = DROPPED
+            continue
+        # BatchWriteItem rejects duplicate keys within one request
+        key = (item["session_id"], item["timestamp"])
+        items.setdefault(key, item)
+        ids_by_key.setdefault(key, []).append(rid)
+
+    failed_keys = set()
+    keys = list(items)
+    for start in range(0, len(keys), BATCH_WRITE_SIZE):
+        failed_keys.update(batch_write([items[key] for key in keys[start:start + BATCH_WRITE_SIZE]]))
+    for key, rids in ids_by_key.items():
+        for rid in rids:
+            results[rid] = FAILED if key in failed_keys else WRITTEN
+    if rollups:
+        rollups.record_interactions([item for key, item in items.items() if key not in failed_keys])
+
+    counts = Counter(results.values())
+    print(f"[handle_batch] {source}: {len(entries)} records, {len(items)} items, {counts[WRITTEN]} written, "
+          f"{counts[FAILED]} failed, {counts[DROPPED]} dropped in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return results
+
+
+def batch_write(items):
+    """
+    BatchWriteItem for up to 25 items, retrying UnprocessedItems with exponential
+    backoff. Returns the (session_id, timestamp) keys that were still not written.
+    """
+    def key_of(item):
+        return (item["session_id"], item["timestamp"])
+
+    pending = {key_of(item) for item in items}
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+
+    for attempt in range(BATCH_WRITE_ATTEMPTS):
+        try:
+            resp = ddb.meta.client.batch_write_item(RequestItems={DYNAMODB_TABLE: requests})
+        except Exception as e:
+            print(f"[batch_write] DynamoDB error (attempt {attempt + 1}): {e}")
+        else:
+            requests = resp.get("UnprocessedItems", {}).get(DYNAMODB_TABLE, [])
+            pending = {key_of(r["PutRequest"]["Item"]) for r in requests}
+            if not requests:
+                return set()
+        if attempt < BATCH_WRITE_ATTEMPTS - 1:
+            time.sleep(BATCH_WRITE_BASE_DELAY * (2 ** attempt))
+
+    return pending
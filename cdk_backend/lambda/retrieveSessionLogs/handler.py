@@ -1,19 +1,49 @@
 import os
 import json
+import time
 from datetime import datetime, timedelta
-from collections import defaultdict
 
-import boto3
 from boto3.dynamodb.conditions import Attr
 
+from navigator.aws import lazy_resource, lazy_table
+from navigator.rollups import RollupStore, summarize
+from navigator.session_logs import (
+    WindowAggregate, decode_token, encode_token, fetch_rows, latest_feedback, parallel_scan, parse_since,
+    query_newest, query_window, scan_segments,
+)
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  Env & AWS clients
 # ──────────────────────────────────────────────────────────────────────────────
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 FEEDBACK_TABLE_NAME = os.environ.get("FEEDBACK_TABLE", "NCMWResponseFeedback")
-ddb   = boto3.resource("dynamodb")
-table = ddb.Table(TABLE_NAME)
-feedback_table = ddb.Table(FEEDBACK_TABLE_NAME)
+# Counters come from the daily rollups written by logclassifier / feedback when set, for
+# windows from ROLLUP_SINCE on (the first day the rollups are complete for; earlier
+# windows, and every window while it is unset, are counted from the rows)
+ROLLUP_TABLE = os.environ.get("ROLLUP_TABLE", "")
+ROLLUP_SINCE = parse_since(os.environ.get("ROLLUP_SINCE", ""), "ROLLUP_SINCE")
+# Date-bucketed GSI written by logclassifier; unset falls back to a table scan.
+# DAY_INDEX_SINCE is the first day the index is complete for: earlier windows scan,
+# and while it is unset every window does (rows logged before day_bucket existed are
+# not in the index). DAY_BUCKET_SHARDS must match logclassifier
+DAY_INDEX = os.environ.get("DAY_INDEX", "")
+DAY_INDEX_SINCE = parse_since(os.environ.get("DAY_INDEX_SINCE", ""))
+DAY_BUCKET_SHARDS = int(os.environ.get("DAY_BUCKET_SHARDS", "1"))
+DAY_QUERY_WORKERS = int(os.environ.get("DAY_QUERY_WORKERS", "8"))
+# Scan fallback: segments run on SCAN_WORKERS threads and stop SCAN_RESERVE_MS before the
+# Lambda timeout (feedback, bodies and the response still need time); the rest of the
+# window is handed back as a continuation token, which also carries the totals so far
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", "8"))
+SCAN_RESERVE_MS = int(os.environ.get("SCAN_RESERVE_MS", "3000"))
+# Feedback table GSI on (session_id, timestamp); unset, or not yet ACTIVE, scans the table
+FEEDBACK_SESSION_INDEX = os.environ.get("FEEDBACK_SESSION_INDEX", "")
+FEEDBACK_QUERY_WORKERS = int(os.environ.get("FEEDBACK_QUERY_WORKERS", "16"))
+# Newest conversations returned with their query / response text
+CONVERSATIONS_LIMIT = int(os.environ.get("CONVERSATIONS_LIMIT", "50"))
+ddb = lazy_resource("dynamodb")
+table = lazy_table(TABLE_NAME)
+feedback_table = lazy_table(FEEDBACK_TABLE_NAME)
+rollups = RollupStore(lazy_table(ROLLUP_TABLE)) if ROLLUP_TABLE else None
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  Helpers
@@ -44,6 +74,46 @@ def ok(body_dict):
     }
 
 
+def newest_keys(start, end):
+    """Day index rows of the newest CONVERSATIONS_LIMIT conversations in the window, newest first."""
+    rows, position, queries = [], None, 0
+    while len(rows) < CONVERSATIONS_LIMIT:
+        page, position, stats = query_newest(
+            table, start, end,
+            position=position,
+            limit=CONVERSATIONS_LIMIT - len(rows),
+            shards=DAY_BUCKET_SHARDS,
+            index_name=DAY_INDEX,
+        )
+        rows.extend(page)
+        queries += stats["queries"]
+        if position is None:
+            break
+    return rows, queries
+
+
+def scan_latest_feedback():
+    """{session_id: newest vote} over the whole feedback table."""
+    newest = {}
+    kwargs = {
+        "ProjectionExpression": "session_id, #ts, feedback",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    scanned = 0
+    while True:
+        resp = feedback_table.scan(**kwargs)
+        for fb in resp.get("Items", []):
+            session_id, feedback_type = fb.get("session_id"), fb.get("feedback")
+            if session_id and feedback_type and fb.get("timestamp", "") >= newest.get(session_id, ("", None))[0]:
+                newest[session_id] = (fb.get("timestamp", ""), feedback_type)
+        scanned += len(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    log(f"Total feedback items      : {scanned}")
+    return {session_id: feedback_type for session_id, (_, feedback_type) in newest.items()}
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  Lambda entry-point
 # ──────────────────────────────────────────────────────────────────────────────
@@ -51,14 +121,31 @@ def lambda_handler(event, context):
     log("=== NEW INVOCATION ============================================")
     log("Raw queryStringParameters :", event.get("queryStringParameters"))
 
-    # 1) Parse timeframe
+    # 1) Parse timeframe (a continuation token carries the window it was issued for,
+    #    and the aggregate and sentiment counts of the part already read)
     params = event.get("queryStringParameters") or {}
     tf = (params.get("timeframe") or "today").lower()
 
     now = datetime.utcnow()
+    resume = None
+    window = WindowAggregate(top_k=CONVERSATIONS_LIMIT)
+    carried_sentiment = {"positive": 0, "negative": 0, "neutral": 0}
+    if params.get("continuation_token"):
+        try:
+            resume = decode_token(params["continuation_token"])
+            tf = resume["timeframe"]
+            start, end = (datetime.fromisoformat(ts) for ts in resume["window"])
+            resume_segments = {int(seg): key for seg, key in resume["pending"].items()}
+            total_segments = int(resume["segments"])
+            window = WindowAggregate.resume(resume["aggregate"], top_k=CONVERSATIONS_LIMIT)
+            carried_sentiment = {name: int(resume["sentiment"][name]) for name in carried_sentiment}
+        except (ValueError, KeyError, TypeError) as e:
+            return bad_request(f"Invalid continuation_token: {e}")
 
     # Support custom date range
-    if tf == "custom":
+    if resume:
+        pass  # window restored from the token
+    elif tf == "custom":
         start_date_str = params.get("start_date")
         end_date_str = params.get("end_date")
 
@@ -89,128 +176,166 @@ def lambda_handler(event, context):
     log("Timeframe                 :", tf)
     log("Start / End UTC           :", start, "/", end)
 
-    # 2) Build filter & projection
+    # 2) Build filter & key-only projection; bodies are fetched for the newest rows only
     # Note: category, sentiment, and satisfaction_score removed (no longer generated by AI)
     start_iso, end_iso = start.isoformat(), end.isoformat()
     filter_exp = Attr("original_ts").between(start_iso, end_iso)
-    projection = "session_id, #loc, #q, #r, original_ts"
-    expr_names = { "#loc": "location", "#q": "query", "#r": "response" }
-
-    # 3) Scan in pages
-    items = []
-    resp = table.scan(
-        FilterExpression=filter_exp,
-        ProjectionExpression=projection,
-        ExpressionAttributeNames=expr_names,
-    )
-    items.extend(resp.get("Items", []))
-    log("Page 1 items              :", len(resp.get("Items", [])))
-
-    while "LastEvaluatedKey" in resp:
-        resp = table.scan(
+    projection = "session_id, #ts, #loc, original_ts"
+    expr_names = { "#ts": "timestamp", "#loc": "location" }
+
+    # 3) Rows of the window. With rollup totals (counts_complete) only the newest
+    #    CONVERSATIONS_LIMIT keys are needed, which the day index serves newest first;
+    #    otherwise every row is folded into the aggregate: one Query per day of the
+    #    window on the day index, or a scan
+    # A continuation goes on with the scan it was issued for, adding to the carried totals
+    counts_complete = bool(rollups) and bool(ROLLUP_SINCE) and start >= ROLLUP_SINCE and not resume
+    use_index = not resume and DAY_INDEX and DAY_INDEX_SINCE and start >= DAY_INDEX_SINCE
+    newest = None
+    pending = None
+    if counts_complete and use_index:
+        newest, queries = newest_keys(start, end)
+        log(f"Day index queries         : {queries} for the newest {len(newest)} rows")
+    elif use_index:
+        _, stats = query_window(
+            table, start, end,
+            shards=DAY_BUCKET_SHARDS,
+            index_name=DAY_INDEX,
+            workers=DAY_QUERY_WORKERS,
+            aggregate=window,
+            ProjectionExpression=projection,
+            ExpressionAttributeNames=expr_names,
+        )
+        log(f"Day index queries         : {stats['queries']} ({stats['pages']} pages)")
+    else:
+        # Without the index even the newest rows take a scan of the whole window
+        if not resume:
+            total_segments = scan_segments(table)
+            resume_segments = None
+        deadline = None
+        if context is not None:
+            deadline = time.time() + max(context.get_remaining_time_in_millis() - SCAN_RESERVE_MS, 0) / 1000
+        _, pending, stats = parallel_scan(
+            table, window, total_segments,
+            workers=SCAN_WORKERS,
+            deadline=deadline,
+            resume=resume_segments,
             FilterExpression=filter_exp,
             ProjectionExpression=projection,
             ExpressionAttributeNames=expr_names,
-            ExclusiveStartKey=resp["LastEvaluatedKey"],
         )
-        log("…Next page items          :", len(resp.get("Items", [])))
-        items.extend(resp.get("Items", []))
-
-    log("TOTAL items scanned       :", len(items))
+        log(f"Scan segments             : {stats['segments']} of {total_segments} ({stats['pages']} pages), "
+            f"{len(pending)} unfinished")
+    if newest is None:
+        newest = window.newest()
+        log("TOTAL items read          :", window.rows)
+
+    # 4) Newest vote per session: one query per session on the feedback session index,
+    #    or a full feedback-table scan without it. The counts need every session read by
+    #    this invocation (earlier ones counted theirs), plus those of the returned
+    #    conversations; with rollup totals only the latter are looked up
+    vote_sessions = [key["session_id"] for key in newest]
+    if not counts_complete:
+        vote_sessions = list(dict.fromkeys(window.sessions + vote_sessions))
+    feedback_by_session = None
+    if FEEDBACK_SESSION_INDEX:
+        try:
+            feedback_by_session = latest_feedback(
+                feedback_table, vote_sessions, FEEDBACK_SESSION_INDEX, FEEDBACK_QUERY_WORKERS
+            )
+            log(f"Feedback queries          : {len(set(vote_sessions))} sessions")
+        except Exception as e:
+            log(f"Feedback index unavailable, scanning instead: {e}")
+    if feedback_by_session is None:
+        feedback_by_session = scan_latest_feedback()
 
-    # 4) Fetch user feedback from feedback table
-    log("Fetching user feedback...")
-    feedback_resp = feedback_table.scan()
-    feedback_items = feedback_resp.get("Items", [])
+    log(f"Sessions with feedback    : {len(feedback_by_session)}")
 
-    # Continue scanning if there are more feedback items
-    while "LastEvaluatedKey" in feedback_resp:
-        feedback_resp = feedback_table.scan(
-            ExclusiveStartKey=feedback_resp["LastEvaluatedKey"]
-        )
-        feedback_items.extend(feedback_resp.get("Items", []))
-
-    log(f"Total feedback items      : {len(feedback_items)}")
-
-    # Build feedback map: session_id -> list of feedback (positive/negative)
-    # Each session can have multiple messages with feedback
-    feedback_by_session = defaultdict(list)
-    for fb in feedback_items:
-        session_id = fb.get("session_id")
-        feedback_type = fb.get("feedback")
-        if session_id and feedback_type:
-            feedback_by_session[session_id].append(feedback_type)
-
-    log(f"Feedback map size         : {len(feedback_by_session)}")
-    log(f"Total feedback entries    : {sum(len(fb_list) for fb_list in feedback_by_session.values())}")
-
-    # 5) Aggregate using user feedback (thumbs up/down) with neutral for no feedback
-    sessions = set()
-    loc_counts = defaultdict(int)
-    # Count based on user feedback (thumbs up/down) + neutral for no feedback
-    feedback_sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-    conversations = []
+    def session_sentiment(session_id):
+        # If a session has multiple feedback entries, the most recent one counts
+        user_feedback = feedback_by_session.get(session_id) if session_id else None
 
-    for it in items:
-        if sid := it.get("session_id"):
-            sessions.add(sid)
-        if loc := it.get("location"):
-            if isinstance(loc, str) and loc:  # Only count valid location strings
-                loc_counts[loc] += 1
-
-        # Get user feedback for this conversation's session
-        session_id = it.get("session_id")
-        timestamp = it.get("original_ts")
-
-        # Check if there's any feedback for this session
-        # If a session has multiple feedback entries, use the most recent one (last in list)
-        user_feedback = None
-        if session_id and session_id in feedback_by_session:
-            session_feedback_list = feedback_by_session[session_id]
-            if session_feedback_list:
-                # Use the last feedback entry for this session
-                user_feedback = session_feedback_list[-1]
-                log(f"Found feedback for session {session_id}: {user_feedback}")
-
-        # Determine sentiment based on user feedback:
         # - positive: User clicked thumbs up
         # - negative: User clicked thumbs down
         # - neutral: User didn't click either (no feedback)
-        sentiment = user_feedback if user_feedback else "neutral"
-
-        # Count the sentiment
-        if sentiment == "positive":
-            feedback_sentiment_counts["positive"] += 1
-        elif sentiment == "negative":
-            feedback_sentiment_counts["negative"] += 1
+        return user_feedback if user_feedback in ("positive", "negative") else "neutral"
+
+    # 5) Counts: from the daily rollups, or per session (thumbs up/down, neutral for no
+    #    feedback) weighted by its messages in the window
+    if counts_complete:
+        # One small item per day instead of counting the rows. Votes are per message
+        # (sentiment_basis "messages"): neutral is every message without one
+        start_day, end_day = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        summary = summarize(rollups.days(start_day, end_day))
+        # A day's counter is already distinct; longer windows union the days' session markers
+        if start_day == end_day:
+            user_count = summary["sessions"]
         else:
-            feedback_sentiment_counts["neutral"] += 1
-
-        # Build conversation log entry - include ALL conversations
-        conversations.append({
-            "session_id": session_id,
-            "timestamp": timestamp,
-            "query": it.get("query", ""),
-            "response": it.get("response", ""),
-            "sentiment": sentiment  # positive (👍), negative (👎), or neutral (no feedback)
-        })
+            user_count = rollups.distinct_sessions(start_day, end_day)
+        loc_counts = summary["locations"]
+        feedback_sentiment_counts = {
+            "positive": summary["positive"],
+            "negative": summary["negative"],
+            "neutral":  max(summary["messages"] - summary["positive"] - summary["negative"], 0),
+        }
+        log(f"Rollup counts - Messages: {summary['messages']}, Sessions: {user_count}")
+    else:
+        # Estimated from the carried session sketch once the window spans invocations
+        user_count = window.distinct_sessions()
+        loc_counts = window.locations
+        feedback_sentiment_counts = dict(carried_sentiment)
+        for session_id, messages in window.messages_by_session.items():
+            feedback_sentiment_counts[session_sentiment(session_id)] += messages
 
     log(f"Feedback counts - Positive: {feedback_sentiment_counts['positive']}, Negative: {feedback_sentiment_counts['negative']}, Neutral: {feedback_sentiment_counts['neutral']}")
 
-    # Sort conversations by timestamp (most recent first)
-    conversations.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    # 6) Bodies of the latest conversations only (most recent first)
+    bodies = fetch_rows(
+        ddb, TABLE_NAME, newest,
+        ProjectionExpression="session_id, #ts, #q, #r",
+        ExpressionAttributeNames={"#ts": "timestamp", "#q": "query", "#r": "response"},
+    )
+    conversations = []
+    for key in newest:
+        body = bodies.get((key["session_id"], key["timestamp"]), {})
+        conversations.append({
+            "session_id": key["session_id"],
+            "timestamp": key["original_ts"],
+            "query": body.get("query", ""),
+            "response": body.get("response", ""),
+            "sentiment": session_sentiment(key["session_id"])  # positive (👍), negative (👎), or neutral (no feedback)
+        })
+    log(f"Conversation bodies       : {len(bodies)} of {len(newest)}")
+
+    next_token = None
+    if pending:
+        next_token = encode_token({
+            "timeframe": tf,
+            "window": [start_iso, end_iso],
+            "segments": total_segments,
+            "pending": pending,
+            "aggregate": window.carry(),
+            "sentiment": feedback_sentiment_counts,
+        })
 
     result = {
         "timeframe":  tf,
         "start_date": start.strftime("%Y-%m-%d"),
         "end_date":   end.strftime("%Y-%m-%d"),
-        "user_count": len(sessions),
+        "user_count": user_count,
         "locations":  list(loc_counts.keys()),
         "sentiment": feedback_sentiment_counts,  # Use user feedback from thumbs up/down
-        "conversations": conversations[:50]  # Return latest 50 conversations
+        # "sessions": each message counts with its session's newest vote; "messages":
+        # the votes on the messages themselves (rollup counts)
+        "sentiment_basis": "messages" if counts_complete else "sessions",
+        "conversations": conversations,  # Latest CONVERSATIONS_LIMIT conversations
+        # Window not fully read in time: the totals so far; repeat the request with
+        # `continuation_token` to go on. The last response covers the whole window
+        "partial": next_token is not None,
+        "next_token": next_token,
+        "counts_complete": counts_complete,
     }
 
-    log("Distinct sessions         :", len(sessions))
+    log("Distinct sessions         :", user_count)
     log("Distinct locations        :", len(loc_counts))
     log("Returning 200")
     return ok(result)
@@ -1,20 +1,20 @@
-import boto3
 import json
 import time
 from datetime import datetime, timedelta
 import os
 
+from navigator.aws import lazy_client, lazy_table
+
 # Configuration
 GROUP_NAME = os.environ['GROUP_NAME']
 BUCKET = os.environ['BUCKET']
 DYNAMODB_TABLE = os.environ['DYNAMODB_TABLE']
 
 # Initialize clients
-logs_client = boto3.client('logs')
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+logs_client = lazy_client('logs')
+s3_client = lazy_client('s3')
 
-table = dynamodb.Table(DYNAMODB_TABLE)
+table = lazy_table(DYNAMODB_TABLE)
 
 def store_session_logs():
     """Store only session logs with specified fields"""
@@ -0,0 +1,7 @@
+"""
+Learning Navigator shared modules.
+
+Packaged as a Lambda layer (`lambda/shared`) so the chat, streaming and
+analytics handlers can share streaming, caching and storage helpers instead
+of copying them into every function directory.
+"""
@@ -0,0 +1,232 @@
+"""
+Admission control for chat generations at the WebSocket edge.
+
+websocketHandler used to start a chatResponseHandler invocation for every
+`sendMessage`, so one noisy client, or a classroom asking at once, could use
+up the Bedrock agent quota for everybody. Two DynamoDB-backed checks now run
+before a generation is started:
+
+- `TokenBucketLimiter`: a token bucket per key (connection, session), refilled
+  continuously at `rate_per_minute` up to `burst` tokens.
+- `ConcurrencyGate`: at most `limit` generations in flight across all
+  containers. Each admitted request holds a lease that chatResponseHandler
+  releases when it finishes; leases expire on their own, so a crashed or
+  timed-out invocation cannot leak a slot.
+
+Both are read-modify-write with a conditional write (optimistic concurrency),
+so concurrent Lambda containers never over-admit. A rejected request gets a
+retry-after hint in seconds.
+
+In scheduler mode the gate is still checked before a request is queued, so an
+over-limit message is turned away at once. A queued request can wait in its
+session's FIFO queue for a while, so its lease is taken for longer
+(`admit(..., lease_seconds=...)`); the queue worker renews it to the normal
+length when the generation starts, or takes a new one if it expired.
+"""
+
+import random
+import time
+from decimal import Decimal
+
+DEFAULT_BUCKET_TTL_SECONDS = 3600
+# Longer than the chatResponseHandler timeout, so a live generation never loses its lease
+DEFAULT_LEASE_SECONDS = 150
+DEFAULT_CAPACITY_RETRY_AFTER = 5.0
+DEFAULT_MAX_CONFLICTS = 8
+GATE_KEY = 'gate#generations'
+
+
+def is_conditional_failure(exc):
+    code = getattr(exc, 'response', {}).get('Error', {}).get('Code')
+    return code == 'ConditionalCheckFailedException'
+
+
+def _conflict_pause(attempt):
+    # Small jittered pause so racing containers do not collide again in lockstep
+    time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 4))))
+
+
+class TokenBucketLimiter:
+    """
+    Item per key (partition key `bucket_key`): `tokens`, `updated_ms` and
+    `expires_at` (DynamoDB TTL attribute). A missing item is a full bucket.
+    DynamoDB errors fail open: the limiter must not take chat down with it.
+    """
+
+    def __init__(self, table, rate_per_minute, burst, ttl_seconds=DEFAULT_BUCKET_TTL_SECONDS,
+                 max_conflicts=DEFAULT_MAX_CONFLICTS, clock=time.time):
+        self.table = table
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.ttl_seconds = ttl_seconds
+        self.max_conflicts = max_conflicts
+        self._clock = clock
+
+    def acquire(self, key, cost=1):
+        """Takes `cost` tokens from `key`'s bucket. Returns (allowed, retry_after_seconds)."""
+        for attempt in range(self.max_conflicts):
+            now_ms = int(self._clock() * 1000)
+            try:
+                item = self.table.get_item(Key={'bucket_key': key}, ConsistentRead=True).get('Item')
+            except Exception as e:
+                print(f"[admission] get_item error: {e}")
+                return True, 0.0
+
+            tokens = self._refilled(item, now_ms)
+            if tokens < cost:
+                return False, round((cost - tokens) / self.rate_per_second, 1)
+
+            try:
+                self._store(key, item, tokens - cost, now_ms)
+                return True, 0.0
+            except Exception as e:
+                if not is_conditional_failure(e):
+                    print(f"[admission] update_item error: {e}")
+                    return True, 0.0
+            _conflict_pause(attempt)
+        # Constant contention on one key is itself a sign of a flood from that client
+        return False, round(1 / self.rate_per_second, 1)
+
+    def _refilled(self, item, now_ms):
+        if not item:
+            return float(self.burst)
+        elapsed = max(0, now_ms - int(item['updated_ms'])) / 1000
+        return min(float(self.burst), float(item['tokens']) + elapsed * self.rate_per_second)
+
+    def _store(self, key, item, tokens, now_ms):
+        values = {
+            ':tokens': Decimal(str(round(tokens, 3))),
+            ':now': now_ms,
+            ':exp': now_ms // 1000 + self.ttl_seconds,
+        }
+        if item:
+            condition = 'updated_ms = :prev'
+            values[':prev'] = item['updated_ms']
+        else:
+            condition = 'attribute_not_exists(bucket_key)'
+        self.table.update_item(
+            Key={'bucket_key': key},
+            UpdateExpression='SET tokens = :tokens, updated_ms = :now, expires_at = :exp',
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values,
+        )
+
+
+class ConcurrencyGate:
+    """
+    One item (`bucket_key` = `GATE_KEY`) holding `leases`, a map of lease id to
+    expiry (epoch ms), and a `version` counter that every write bumps.
+    `limit` may be None for an instance that only releases leases.
+    """
+
+    def __init__(self, table, limit, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 retry_after=DEFAULT_CAPACITY_RETRY_AFTER, max_conflicts=DEFAULT_MAX_CONFLICTS,
+                 key=GATE_KEY, clock=time.time):
+        self.table = table
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.retry_after = retry_after
+        self.max_conflicts = max_conflicts
+        self.key = key
+        self._clock = clock
+
+    def acquire(self, lease_id, lease_seconds=None):
+        """
+        Returns (acquired, retry_after_seconds, in_flight). A live lease with the
+        same id is renewed (to `lease_seconds`, default the gate's, from now)
+        without a limit check.
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+        for attempt in range(self.max_conflicts):
+            now_ms = int(self._clock() * 1000)
+            try:
+                item = self.table.get_item(Key={'bucket_key': self.key}, ConsistentRead=True).get('Item') or {}
+            except Exception as e:
+                print(f"[admission] gate get_item error: {e}")
+                return True, 0.0, None
+
+            # Expired leases are dropped by rewriting the map without them
+            live = {lid: exp for lid, exp in item.get('leases', {}).items() if int(exp) > now_ms}
+            if lease_id not in live and len(live) >= self.limit:
+                return False, self.retry_after, len(live)
+
+            live[lease_id] = now_ms + lease_seconds * 1000
+            values = {':leases': live, ':one': 1}
+            if 'version' in item:
+                condition = 'version = :v'
+                values[':v'] = item['version']
+            else:
+                condition = 'attribute_not_exists(version)'
+            try:
+                self.table.update_item(
+                    Key={'bucket_key': self.key},
+                    UpdateExpression='SET leases = :leases ADD version :one',
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues=values,
+                )
+                return True, 0.0, len(live)
+            except Exception as e:
+                if not is_conditional_failure(e):
+                    print(f"[admission] gate update_item error: {e}")
+                    return True, 0.0, None
+            _conflict_pause(attempt)
+        return False, 1.0, None
+
+    def release(self, lease_id):
+        """Frees a lease. Bumping `version` makes racing acquires re-read the map."""
+        try:
+            self.table.update_item(
+                Key={'bucket_key': self.key},
+                UpdateExpression='REMOVE leases.#lease ADD version :one',
+                ConditionExpression='attribute_exists(leases)',
+                ExpressionAttributeNames={'#lease': lease_id},
+                ExpressionAttributeValues={':one': 1},
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                print(f"[admission] gate release error: {e}")
+
+
+class AdmissionController:
+    """
+    Runs the checks in order (per-connection bucket, per-session bucket, global
+    gate; cheapest rejection first). `admit` returns an `Admission`.
+    """
+
+    def __init__(self, connection_limiter=None, session_limiter=None, gate=None):
+        self.connection_limiter = connection_limiter
+        self.session_limiter = session_limiter
+        self.gate = gate
+
+    def admit(self, lease_id, connection_id=None, session_id=None, lease_seconds=None):
+        if self.connection_limiter and connection_id:
+            allowed, retry_after = self.connection_limiter.acquire(f"conn#{connection_id}")
+            if not allowed:
+                return Admission(False, 'connection_rate', retry_after)
+        if self.session_limiter and session_id:
+            allowed, retry_after = self.session_limiter.acquire(f"session#{session_id}")
+            if not allowed:
+                return Admission(False, 'session_rate', retry_after)
+        if self.gate:
+            acquired, retry_after, in_flight = self.gate.acquire(lease_id, lease_seconds)
+            if not acquired:
+                return Admission(False, 'capacity', retry_after, in_flight=in_flight)
+            return Admission(True, 'admitted', lease_id=lease_id, in_flight=in_flight)
+        return Admission(True, 'admitted')
+
+
+class Admission:
+    def __init__(self, admitted, reason, retry_after=0.0, lease_id=None, in_flight=None):
+        self.admitted = admitted
+        self.reason = reason
+        self.retry_after = retry_after
+        self.lease_id = lease_id
+        self.in_flight = in_flight
+
+    def busy_frame(self):
+        """The `busy` WebSocket frame for a rejected request."""
+        return {
+            'type': 'busy',
+            'reason': self.reason,
+            'retry_after_ms': int(max(self.retry_after, 0.1) * 1000),
+        }
@@ -0,0 +1,132 @@
+"""
+Interaction analytics records and their delivery to logclassifier.
+
+Every answered question produces one record. Producers used to invoke the
+logclassifier Lambda asynchronously per message, each with its own field
+names. `interaction_record` builds a single versioned shape and
+`AnalyticsPublisher` sends it to the analytics SQS queue, which logclassifier
+consumes in batches (falling back to the direct async invoke when no queue is
+configured). `LocalQueue` implements the few SQS calls involved in memory so
+the batch path can be exercised and measured offline.
+"""
+
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+
+# Field names used by earlier producers -> canonical v1 names
+LEGACY_FIELDS = {'querytext': 'query', 'responsetext': 'response'}
+
+
+def interaction_record(session_id, query, response, user_role=None, timestamp=None, **extra):
+    """
+    A v1 analytics record. `record_id` makes the logged item idempotent when the
+    queue redelivers a message. Extra fields set to None are left out.
+    """
+    record = {
+        'v': SCHEMA_VERSION,
+        'record_id': uuid.uuid4().hex,
+        'session_id': session_id,
+        'timestamp': timestamp or datetime.utcnow().isoformat(),
+        'query': query,
+        'response': response,
+        'user_role': user_role,
+    }
+    record.update({k: v for k, v in extra.items() if v is not None})
+    return {k: v for k, v in record.items() if v is not None}
+
+
+def normalize_record(payload):
+    """Canonical record from any producer shape (v1, or the legacy unversioned payloads)."""
+    record = dict(payload)
+    for old, new in LEGACY_FIELDS.items():
+        if old in record:
+            value = record.pop(old)
+            record.setdefault(new, value)
+    record.setdefault('v', 0)
+    return record
+
+
+class AnalyticsPublisher:
+    """
+    Delivers records to the analytics queue (`queue_url`), or, in single-record
+    mode, as an asynchronous invoke of the logclassifier function.
+    """
+
+    def __init__(self, queue_url=None, sqs_client=None, lambda_client=None, function_name=None):
+        self.queue_url = queue_url
+        self.sqs = sqs_client
+        self.lambda_client = lambda_client
+        self.function_name = function_name
+
+    def publish(self, record):
+        """Returns the transport used ('sqs' or 'lambda')."""
+        body = json.dumps(record, default=str)
+        if self.queue_url:
+            self.sqs.send_message(QueueUrl=self.queue_url, MessageBody=body)
+            return 'sqs'
+        self.lambda_client.invoke(
+            FunctionName=self.function_name,
+            InvocationType='Event',
+            Payload=body.encode('utf-8')
+        )
+        return 'lambda'
+
+
+class LocalQueue:
+    """
+    In-memory stand-in for the analytics SQS queue.
+
+    Supports `send_message` / `send_message_batch` like the SQS client, and
+    `drain(handler)` which delivers Lambda-style SQS events to a handler,
+    re-queues the messages it reports in `batchItemFailures` and gives up on a
+    message after `max_receives` deliveries (the redrive policy).
+    """
+
+    def __init__(self, max_receives=3):
+        self.max_receives = max_receives
+        self._messages = deque()
+        self.dead_letters = []
+
+    def __len__(self):
+        return len(self._messages)
+
+    def send_message(self, QueueUrl=None, MessageBody=None, **kwargs):
+        message_id = uuid.uuid4().hex
+        self._messages.append({'messageId': message_id, 'body': MessageBody, 'receives': 0})
+        return {'MessageId': message_id}
+
+    def send_message_batch(self, QueueUrl=None, Entries=()):
+        return {'Successful': [
+            {'Id': entry['Id'], **self.send_message(QueueUrl, entry['MessageBody'])} for entry in Entries
+        ], 'Failed': []}
+
+    def drain(self, handler, batch_size=10):
+        """Deliver everything to `handler(event, context)`. Returns delivery counters."""
+        stats = {'batches': 0, 'delivered': 0, 'failed': 0, 'dead_lettered': 0}
+        while self._messages:
+            batch = [self._messages.popleft() for _ in range(min(batch_size, len(self._messages)))]
+            for message in batch:
+                message['receives'] += 1
+            event = {'Records': [
+                {'messageId': m['messageId'], 'body': m['body'], 'eventSource': 'aws:sqs',
+                 'attributes': {'ApproximateReceiveCount': str(m['receives'])}}
+                for m in batch
+            ]}
+            result = handler(event, None) or {}
+            failed = {f['itemIdentifier'] for f in result.get('batchItemFailures', [])}
+            stats['batches'] += 1
+            stats['delivered'] += len(batch) - len(failed)
+            stats['failed'] += len(failed)
+            for message in batch:
+                if message['messageId'] not in failed:
+                    continue
+                if message['receives'] >= self.max_receives:
+                    self.dead_letters.append(message)
+                    stats['dead_lettered'] += 1
+                else:
+                    self._messages.append(message)
+        return stats
@@ -0,0 +1,245 @@
+"""
+Role-aware answer cache in front of Bedrock `invoke_agent`.
+
+Most chat traffic repeats the quick-action queries offered per role, and each
+repeat pays for a full agent round trip. `AnswerCache` stores finished answers
+(text plus citations) keyed by normalized query text and the role whose
+instructions the agent gets (`roles.role_key`: 'guest' and unknown roles share
+the learner entries), in an in-process LRU backed by a DynamoDB table with a TTL.
+
+A replayed answer never reaches the agent, so that turn is missing from the
+agent session. Handlers therefore only read and fill the cache on turns whose
+answer cannot depend on the conversation: a session's first turn, and the
+quick-action queries (`is_quick_action`).
+
+Invalidation is by knowledge-base version: every entry records the version it
+was generated under, and `invalidate()` bumps a single counter item when an
+ingestion job finishes, so stale entries stop matching without being deleted.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from navigator.citations import CitationIndex
+from navigator.recommendations import quick_action_queries
+from navigator.roles import role_key
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_LOCAL_ENTRIES = 256
+# How long the knowledge-base version read from DynamoDB is trusted in-process
+VERSION_REFRESH_SECONDS = 30
+
+VERSION_KEY = '__kb_version__'
+
+# Queries shorter than this are usually follow-ups ("yes", "tell me more") whose
+# answer depends on the conversation, not only on the text.
+MIN_QUERY_CHARS = 12
+
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+# The agent's low-confidence path asks for an email and waits for it in the session
+ESCALATION_MARKERS = ('share your email', 'escalate this to an administrator')
+
+
+def normalize_query(text):
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r'\s+', ' ', (text or '').strip().lower())
+    return text.rstrip(' ?!.')
+
+
+def cache_key(query, user_role):
+    # Keyed by the instructions that shaped the answer, so roles that get the same
+    # instructions (guests get the learner ones) share one entry
+    digest = hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()[:32]
+    return f"{role_key(user_role)}#{digest}"
+
+
+# Normalized text of every role's quick-action queries
+QUICK_ACTION_QUERIES = frozenset(normalize_query(query) for _, query in quick_action_queries())
+
+
+def is_quick_action(query):
+    """True for the text of a quick-action query of any role; those stand on their own."""
+    return normalize_query(query) in QUICK_ACTION_QUERIES
+
+
+def is_cacheable_query(query):
+    normalized = normalize_query(query)
+    return len(normalized) >= MIN_QUERY_CHARS and not EMAIL_PATTERN.search(normalized)
+
+
+def is_cacheable_answer(responsetext):
+    lowered = (responsetext or '').lower()
+    return bool(lowered.strip()) and not any(marker in lowered for marker in ESCALATION_MARKERS)
+
+
+class CachedAnswer:
+    __slots__ = ('responsetext', 'citations', 'source')
+
+    def __init__(self, responsetext, citations, source):
+        self.responsetext = responsetext
+        self.citations = citations   # CitationIndex
+        self.source = source         # 'memory' or 'dynamodb'
+
+
+class AnswerCache:
+    """
+    Two-level answer cache: in-process LRU, then DynamoDB.
+
+    Table layout (partition key `cache_key`):
+      - answers: `cache_key`, `query`, `user_role`, `responsetext`, `citations`,
+        `kb_version`, `expires_at` (DynamoDB TTL attribute, epoch seconds)
+      - one `__kb_version__` item holding the current knowledge-base `version`
+    """
+
+    def __init__(self, table, ttl_seconds=DEFAULT_TTL_SECONDS, max_local_entries=DEFAULT_LOCAL_ENTRIES,
+                 clock=time.time):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self._clock = clock
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_read_at = 0.0
+        self.counters = {'hits_memory': 0, 'hits_dynamodb': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    # ── Lookup / store ────────────────────────────────────────────────────
+    def get(self, query, user_role):
+        """Return a `CachedAnswer` or None."""
+        if not is_cacheable_query(query):
+            return None
+        key = cache_key(query, user_role)
+        now = self._clock()
+        version = self.kb_version()
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry['expires_at'] > now and entry['kb_version'] == version:
+                self._local.move_to_end(key)
+                self.counters['hits_memory'] += 1
+                return self._answer(entry, 'memory')
+            if entry:
+                del self._local[key]
+
+        try:
+            item = self.table.get_item(Key={'cache_key': key}).get('Item')
+        except Exception as e:
+            print(f"[answer-cache] get_item error: {e}")
+            self._count('errors')
+            item = None
+
+        if not item or int(item.get('expires_at', 0)) <= now or int(item.get('kb_version', -1)) != version:
+            self._count('misses')
+            return None
+
+        entry = self._entry(item['responsetext'], item.get('citations') or {}, version, int(item['expires_at']))
+        self._remember(key, entry)
+        self._count('hits_dynamodb')
+        return self._answer(entry, 'dynamodb')
+
+    def put(self, query, user_role, responsetext, citation_index):
+        """Store a finished answer. Returns False when the answer is not cacheable."""
+        if not is_cacheable_query(query) or not is_cacheable_answer(responsetext):
+            return False
+        key = cache_key(query, user_role)
+        version = self.kb_version()
+        expires_at = int(self._clock() + self.ttl_seconds)
+        citations = citation_index.to_dict() if citation_index is not None else {}
+
+        self._remember(key, self._entry(responsetext, citations, version, expires_at))
+        try:
+            self.table.put_item(Item={
+                'cache_key': key,
+                'query': normalize_query(query),
+                'user_role': role_key(user_role),
+                'responsetext': responsetext,
+                'citations': citations,
+                'kb_version': version,
+                'expires_at': expires_at,
+            })
+        except Exception as e:
+            print(f"[answer-cache] put_item error: {e}")
+            self._count('errors')
+            return False
+        self._count('stores')
+        return True
+
+    # ── Invalidation ──────────────────────────────────────────────────────
+    def kb_version(self):
+        """Current knowledge-base version (cached in-process for a few seconds)."""
+        now = self._clock()
+        if self._version is not None and now - self._version_read_at < VERSION_REFRESH_SECONDS:
+            return self._version
+        try:
+            item = self.table.get_item(Key={'cache_key': VERSION_KEY}).get('Item') or {}
+            self._version = int(item.get('version', 0))
+        except Exception as e:
+            print(f"[answer-cache] version read error: {e}")
+            self._count('errors')
+            self._version = self._version or 0
+        self._version_read_at = now
+        return self._version
+
+    def invalidate(self):
+        """Bump the knowledge-base version so every existing entry stops matching."""
+        resp = self.table.update_item(
+            Key={'cache_key': VERSION_KEY},
+            UpdateExpression='ADD #v :one',
+            ExpressionAttributeNames={'#v': 'version'},
+            ExpressionAttributeValues={':one': 1},
+            ReturnValues='UPDATED_NEW',
+        )
+        self._version = int(resp['Attributes']['version'])
+        self._version_read_at = self._clock()
+        with self._lock:
+            self._local.clear()
+        return self._version
+
+    # ── Counters ──────────────────────────────────────────────────────────
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['hits'] = stats['hits_memory'] + stats['hits_dynamodb']
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+    # ── Internals ─────────────────────────────────────────────────────────
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    @staticmethod
+    def _entry(responsetext, citations, version, expires_at):
+        return {
+            'responsetext': responsetext,
+            'citations': _from_dynamo(citations),
+            'kb_version': version,
+            'expires_at': expires_at,
+        }
+
+    @staticmethod
+    def _answer(entry, source):
+        return CachedAnswer(entry['responsetext'], CitationIndex.from_dict(entry['citations']), source)
+
+
+def _from_dynamo(value):
+    """Convert boto3 Decimals back to plain ints for JSON payloads."""
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
@@ -0,0 +1,126 @@
+"""
+Lazily created, shared boto3 clients and resources.
+
+Handlers used to build every client they might need at import time, which
+put client construction (endpoint resolution, service model loading) on the
+cold-start path even for invocations that never touch the service.
+`lazy_client` / `lazy_resource` / `lazy_table` return module-level stand-ins
+that build the real object on first use; `client` / `resource` build it now.
+Either way one instance per service and arguments is kept per container, so
+a handler and the navigator helpers share connection pools.
+
+Every client gets `default_config()`: TCP keep-alive, a connection pool sized
+for the WebSocket send workers, and adaptive retries (client-side rate
+limiting on throttles). Pass `config=` to override parts of it. boto3 itself
+is only imported when the first client is built, so requests that never call
+AWS (CORS pre-flights, WebSocket connects) do not pay for it.
+"""
+
+import os
+import threading
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '25'))
+CONNECT_TIMEOUT = int(os.environ.get('AWS_CONNECT_TIMEOUT', '5'))
+RETRY_MODE = os.environ.get('AWS_RETRY_MODE', 'adaptive')
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+
+_session = None
+_config = None
+_instances = {}
+_lock = threading.Lock()
+
+
+def default_config():
+    """botocore `Config` applied to every client."""
+    global _config
+    if _config is None:
+        from botocore.config import Config
+        _config = Config(
+            tcp_keepalive=True,
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=CONNECT_TIMEOUT,
+            retries={'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS},
+        )
+    return _config
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def _instance_key(kind, service, kwargs):
+    return (kind, service) + tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+
+def _build(kind, service, kwargs):
+    key = _instance_key(kind, service, kwargs)
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    # boto3 sessions are not thread-safe while creating clients
+    with _lock:
+        instance = _instances.get(key)
+        if instance is None:
+            options = dict(kwargs)
+            config = options.pop('config', None)
+            options['config'] = default_config().merge(config) if config else default_config()
+            factory = _get_session().client if kind == 'client' else _get_session().resource
+            instance = _instances[key] = factory(service, **options)
+    return instance
+
+
+def client(service, **kwargs):
+    """Shared boto3 client for `service` (kwargs as for `boto3.client`)."""
+    return _build('client', service, kwargs)
+
+
+def resource(service, **kwargs):
+    """Shared boto3 service resource for `service` (kwargs as for `boto3.resource`)."""
+    return _build('resource', service, kwargs)
+
+
+class _Lazy:
+    """Attribute access proxy that creates its target on first use."""
+
+    def __init__(self, factory, description):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_description', description)
+
+    def _resolve(self):
+        target = self._target
+        if target is None:
+            target = self._factory()
+            object.__setattr__(self, '_target', target)
+        return target
+
+    @property
+    def created(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self):
+        state = 'created' if self.created else 'not created'
+        return f"<lazy {self._description} ({state})>"
+
+
+def lazy_client(service, **kwargs):
+    return _Lazy(lambda: client(service, **kwargs), f"{service} client")
+
+
+def lazy_resource(service, **kwargs):
+    return _Lazy(lambda: resource(service, **kwargs), f"{service} resource")
+
+
+def lazy_table(table_name, **kwargs):
+    """DynamoDB `Table` built on first use."""
+    return _Lazy(lambda: resource('dynamodb', **kwargs).Table(table_name), f"table {table_name}")
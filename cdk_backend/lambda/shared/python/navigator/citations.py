@@ -0,0 +1,239 @@
+"""
+Knowledge-base citation collection for agent responses.
+
+Citations reach us twice: as `attribution` on response chunks and as
+`knowledgeBaseLookupOutput` observations in the orchestration trace. The same
+S3 document is usually returned by several lookups, so every reference has to
+be checked against everything collected so far. `CitationIndex` does that with
+a dict keyed by URI (constant time, insertion ordered) and renders the two
+payload shapes the chat (WebSocket) and SSE endpoints send to the client.
+
+`CitationFeed` forwards references while the answer is still streaming: each
+batch of new references becomes a `citations` frame once `Presigner` has
+produced download URLs for it on a background pool, so neither retrieval
+results nor signing wait for the final `complete` frame.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_CONTENT_CHARS = 200
+DEFAULT_URL_TTL_SECONDS = 3600
+# A cached URL is handed out again while at least this much of its lifetime is left
+URL_REFRESH_MARGIN_SECONDS = 600
+DEFAULT_PRESIGN_WORKERS = 2
+DEFAULT_FLUSH_TIMEOUT = 1.0
+
+
+def kb_lookup_references(event):
+    """Return the `retrievedReferences` of a knowledge-base lookup trace event, if any."""
+    trace = event.get('trace', {}).get('trace', {})
+    observation = trace.get('orchestrationTrace', {}).get('observation', {})
+    return observation.get('knowledgeBaseLookupOutput', {}).get('retrievedReferences', [])
+
+
+def _s3_uri(ref):
+    return ref.get('location', {}).get('s3Location', {}).get('uri', '')
+
+
+def _filename(uri):
+    return uri.split('/')[-1] if '/' in uri else uri
+
+
+def split_s3_uri(uri):
+    """(bucket, key) of an `s3://bucket/key` URI, or None."""
+    if not uri.startswith('s3://'):
+        return None
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return (bucket, key) if bucket and key else None
+
+
+class CitationIndex:
+    """
+    Ordered, de-duplicated set of knowledge-base references for one answer.
+
+    Each `add_*` call returns the references that were new, so callers can
+    forward them incrementally. References are grouped the way they arrived
+    (one group per attribution citation or trace lookup) for the chat payload.
+    """
+
+    def __init__(self, content_chars=DEFAULT_CONTENT_CHARS):
+        self.content_chars = content_chars
+        self._refs = {}      # uri -> {'uri', 'title', 'content'}
+        self._groups = []    # [{'text': str, 'uris': [uri, ...]}]
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __contains__(self, uri):
+        return uri in self._refs
+
+    def add_attribution(self, citation):
+        """Add a chunk `attribution.citations[]` entry (S3 references only)."""
+        text = citation.get('generatedResponsePart', {}).get('textResponsePart', {}).get('text', '')
+        refs = []
+        for ref in citation.get('retrievedReferences', []):
+            if ref.get('location', {}).get('type') != 'S3':
+                continue
+            uri = _s3_uri(ref)
+            source_uri = ref.get('metadata', {}).get('x-amz-bedrock-kb-source-uri', '')
+            refs.append((uri, source_uri.split('/')[-1] or _filename(uri), ref))
+        return self._add_group(text, refs)
+
+    def add_trace_references(self, retrieved_refs):
+        """Add the `retrievedReferences` of one knowledge-base lookup observation."""
+        refs = []
+        for ref in retrieved_refs:
+            uri = _s3_uri(ref)
+            refs.append((uri, _filename(uri), ref))
+        return self._add_group('', refs)
+
+    def _add_group(self, text, refs):
+        new_uris = []
+        for uri, title, ref in refs:
+            if not uri or uri in self._refs:
+                continue
+            self._refs[uri] = {
+                'uri': uri,
+                'title': title,
+                'content': ref.get('content', {}).get('text', '')[:self.content_chars],
+            }
+            new_uris.append(uri)
+        if new_uris:
+            self._groups.append({'text': text, 'uris': new_uris})
+        return [self._refs[uri] for uri in new_uris]
+
+    # ── Serialization (answer cache) ──────────────────────────────────────
+    def to_dict(self):
+        return {'refs': list(self._refs.values()), 'groups': self._groups}
+
+    @classmethod
+    def from_dict(cls, data, content_chars=DEFAULT_CONTENT_CHARS):
+        index = cls(content_chars)
+        index._refs = {ref['uri']: dict(ref) for ref in data.get('refs', [])}
+        index._groups = [
+            {'text': group.get('text', ''), 'uris': [u for u in group.get('uris', []) if u in index._refs]}
+            for group in data.get('groups', [])
+        ]
+        return index
+
+    # ── Payload shapes ────────────────────────────────────────────────────
+    def as_citations(self):
+        """Chat (WebSocket) shape: `[{'text', 'references': [{'source', 'title'}]}]`."""
+        return [
+            {
+                'text': group['text'],
+                'references': [
+                    {'source': uri, 'title': self._refs[uri]['title']} for uri in group['uris']
+                ],
+            }
+            for group in self._groups
+        ]
+
+    def as_sources(self):
+        """SSE shape: `[{'uri', 'content'}]`."""
+        return [{'uri': ref['uri'], 'content': ref['content']} for ref in self._refs.values()]
+
+
+class Presigner:
+    """
+    Presigned GET URLs for `s3://` references, generated on a small thread pool
+    and cached per container until they come within URL_REFRESH_MARGIN_SECONDS
+    of expiring.
+    """
+
+    def __init__(self, s3_client, ttl_seconds=DEFAULT_URL_TTL_SECONDS, workers=DEFAULT_PRESIGN_WORKERS,
+                 clock=time.time):
+        self.s3 = s3_client
+        self.ttl_seconds = ttl_seconds
+        self.workers = workers
+        self._clock = clock
+        self._cache = {}     # uri -> (url, expires_at epoch seconds)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def link(self, uri):
+        """{'url', 'url_expires_at' (epoch ms)} for `uri`, or None when it cannot be signed."""
+        now = self._clock()
+        with self._lock:
+            cached = self._cache.get(uri)
+        if not cached or cached[1] - now < URL_REFRESH_MARGIN_SECONDS:
+            location = split_s3_uri(uri)
+            if not location:
+                return None
+            try:
+                url = self.s3.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': location[0], 'Key': location[1]},
+                    ExpiresIn=self.ttl_seconds
+                )
+            except Exception as e:
+                print(f"⚠️ Error presigning {uri}: {str(e)}")
+                return None
+            cached = (url, now + self.ttl_seconds)
+            with self._lock:
+                self._cache[uri] = cached
+        return {'url': cached[0], 'url_expires_at': int(cached[1] * 1000)}
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='presign')
+        return self._pool.submit(fn, *args)
+
+
+class CitationFeed:
+    """
+    Incremental `citations` frames for one answer. `publish` takes the new
+    references returned by `CitationIndex.add_*` (already sent URIs are
+    skipped, so retried attempts do not repeat them) and signs them in the
+    background; `ready()` returns the frames finished so far without waiting
+    and `flush()` waits up to `timeout` seconds for the rest.
+    """
+
+    def __init__(self, presigner=None):
+        self.presigner = presigner
+        self.sent = 0
+        self._uris = set()
+        self._pending = []
+        self._ready = queue.Queue()
+
+    def publish(self, refs):
+        refs = [ref for ref in refs if ref['uri'] not in self._uris]
+        if not refs:
+            return
+        self._uris.update(ref['uri'] for ref in refs)
+        if self.presigner:
+            self._pending.append(self.presigner.submit(self._frame, refs))
+        else:
+            self._frame(refs)
+
+    def ready(self):
+        frames = []
+        while True:
+            try:
+                frames.append(self._ready.get_nowait())
+            except queue.Empty:
+                break
+        self._pending = [f for f in self._pending if not f.done()]
+        self.sent += len(frames)
+        return frames
+
+    def flush(self, timeout=DEFAULT_FLUSH_TIMEOUT):
+        if self._pending:
+            wait(self._pending, timeout=timeout)
+        return self.ready()
+
+    def _frame(self, refs):
+        references = []
+        for ref in refs:
+            reference = {'source': ref['uri'], 'title': ref['title']}
+            link = self.presigner.link(ref['uri']) if self.presigner else None
+            if link:
+                reference.update(link)
+            references.append(reference)
+        frame = {'type': 'citations', 'references': references}
+        self._ready.put(frame)
+        return frame
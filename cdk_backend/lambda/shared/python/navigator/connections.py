@@ -0,0 +1,159 @@
+"""
+Registry of open WebSocket connections.
+
+API Gateway only tells websocketHandler about `$connect` and `$disconnect`;
+chatResponseHandler runs asynchronously and used to find out a client had
+left only when a `post_to_connection` failed, i.e. after Bedrock had already
+produced text for it. `ConnectionRegistry` records each connection (session,
+role, last activity) in DynamoDB so the chat handler can skip a request whose
+connection is already closed, and `ConnectionMonitor` re-checks it in the
+background while an answer streams. The same item holds the ids of messages
+the user cancelled (`cancelMessage` route), which the monitor picks up too.
+
+Rows expire with the API Gateway maximum connection duration (2 hours), so a
+missed `$disconnect` cannot keep a connection alive in the registry.
+"""
+
+import threading
+import time
+
+# API Gateway closes every WebSocket connection after 2 hours
+DEFAULT_TTL_SECONDS = 7200
+DEFAULT_CHECK_INTERVAL = 2.0
+
+OPEN = 'open'
+CLOSED = 'closed'
+CANCELLED = 'cancelled'
+
+
+class ConnectionRegistry:
+    """
+    Table layout (partition key `connection_id`): `session_id`, `user_role`,
+    `connected_at`, `last_activity` (epoch seconds), `expires_at` (DynamoDB
+    TTL attribute) and `cancelled` (string set of message ids). Lookups fail
+    open: when the table cannot be read the connection is assumed to be alive.
+    """
+
+    def __init__(self, table, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def register(self, connection_id):
+        now = int(self._clock())
+        try:
+            self.table.put_item(Item={
+                'connection_id': connection_id,
+                'connected_at': now,
+                'last_activity': now,
+                'expires_at': now + self.ttl_seconds,
+            })
+        except Exception as e:
+            print(f"[connections] put_item error: {e}")
+
+    def touch(self, connection_id, session_id=None, user_role=None):
+        """Records activity on a connection, with the session and role of its latest message."""
+        now = int(self._clock())
+        names, values = ['last_activity = :now'], {':now': now, ':exp': now + self.ttl_seconds}
+        if session_id:
+            names.append('session_id = :sid')
+            values[':sid'] = session_id
+        if user_role:
+            names.append('user_role = :role')
+            values[':role'] = user_role
+        try:
+            # A connection registered before the registry existed gets its row here
+            self.table.update_item(
+                Key={'connection_id': connection_id},
+                UpdateExpression='SET ' + ', '.join(names) + ', expires_at = if_not_exists(expires_at, :exp)',
+                ExpressionAttributeValues=values,
+            )
+        except Exception as e:
+            print(f"[connections] update_item error: {e}")
+
+    def remove(self, connection_id):
+        try:
+            self.table.delete_item(Key={'connection_id': connection_id})
+        except Exception as e:
+            print(f"[connections] delete_item error: {e}")
+
+    def cancel(self, connection_id, message_id):
+        """Marks one message of the connection as cancelled by the user."""
+        now = int(self._clock())
+        try:
+            self.table.update_item(
+                Key={'connection_id': connection_id},
+                UpdateExpression='ADD cancelled :ids '
+                                 'SET last_activity = :now, expires_at = if_not_exists(expires_at, :exp)',
+                ExpressionAttributeValues={':ids': {message_id}, ':now': now, ':exp': now + self.ttl_seconds},
+            )
+        except Exception as e:
+            print(f"[connections] cancel update_item error: {e}")
+
+    def state(self, connection_id, message_id=None):
+        """OPEN, CLOSED (removed or past its TTL) or CANCELLED (`message_id` was cancelled)."""
+        try:
+            item = self.table.get_item(Key={'connection_id': connection_id}).get('Item')
+        except Exception as e:
+            print(f"[connections] get_item error: {e}")
+            return OPEN
+        # TTL deletion lags behind expiry, so check the timestamp as well
+        if not item or int(item.get('expires_at', 0)) <= self._clock():
+            return CLOSED
+        if message_id and message_id in item.get('cancelled', ()):
+            return CANCELLED
+        return OPEN
+
+    def is_alive(self, connection_id):
+        """False once the connection was removed or has outlived its TTL."""
+        return self.state(connection_id) != CLOSED
+
+    def monitor(self, connection_id, on_closed, interval=DEFAULT_CHECK_INTERVAL, message_id=None,
+                on_cancelled=None):
+        return ConnectionMonitor(self, connection_id, on_closed, interval, message_id, on_cancelled)
+
+
+class ConnectionMonitor:
+    """
+    Re-checks one connection every `interval` seconds on a daemon thread and
+    calls `on_closed(connection_id)` once when it is gone, or
+    `on_cancelled(message_id)` once `message_id` was cancelled, so the
+    streaming loop never waits on a registry read. Use as a context manager.
+    """
+
+    def __init__(self, registry, connection_id, on_closed, interval=DEFAULT_CHECK_INTERVAL, message_id=None,
+                 on_cancelled=None):
+        self.registry = registry
+        self.connection_id = connection_id
+        self.on_closed = on_closed
+        self.interval = interval
+        self.message_id = message_id
+        self.on_cancelled = on_cancelled
+        self.checks = 0
+        self.closed = False
+        self.cancelled = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='ws-connection-monitor')
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+    def _run(self):
+        watched_message = self.message_id if self.on_cancelled else None
+        while not self._stop.wait(self.interval):
+            self.checks += 1
+            state = self.registry.state(self.connection_id, watched_message)
+            if state == CLOSED:
+                self.closed = True
+                print(f"🔌 Connection {self.connection_id} closed (registry), stopping work for it")
+                self.on_closed(self.connection_id)
+                return
+            if state == CANCELLED:
+                self.cancelled = True
+                print(f"⏹️ Message {self.message_id} cancelled by the user")
+                self.on_cancelled(self.message_id)
+                return
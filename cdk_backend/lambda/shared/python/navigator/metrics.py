@@ -0,0 +1,123 @@
+"""
+Per-request latency spans published as CloudWatch Embedded Metric Format (EMF).
+
+A `RequestTrace` is started when a request is received. Stages are recorded
+either as marks (milliseconds since receipt, e.g. time to first chunk) or as
+spans (duration of a block, e.g. the `invoke_agent` call or one send). `emit()`
+prints a single EMF JSON line; CloudWatch Logs turns it into metrics with the
+configured dimensions without any API call from the Lambda.
+
+See https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+DEFAULT_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'LearningNavigator/Chat')
+# EMF accepts at most 100 values per metric in one log line; longer series are
+# reduced to evenly spaced quantiles so percentiles stay representative
+MAX_VALUES = 100
+
+
+def model_usage(event):
+    """Token usage (`inputTokens`, `outputTokens`) of a model invocation trace event, or None."""
+    trace = event.get('trace', {}).get('trace', {})
+    for step in ('preProcessingTrace', 'orchestrationTrace', 'postProcessingTrace'):
+        usage = trace.get(step, {}).get('modelInvocationOutput', {}).get('metadata', {}).get('usage')
+        if usage:
+            return usage
+    return None
+
+
+class RequestTrace:
+    """
+    Latency marks, spans and counters for one request.
+
+    `dimensions` become the EMF dimension set (plus a roll-up over the first
+    dimension alone); `properties` are logged alongside for Logs Insights
+    queries but are not metric dimensions.
+    """
+
+    def __init__(self, namespace=DEFAULT_NAMESPACE, clock=time.perf_counter, **dimensions):
+        self.namespace = namespace
+        self.dimensions = {k: _dimension_value(v) for k, v in dimensions.items()}
+        self.properties = {}
+        self._clock = clock
+        self._started = clock()
+        self._values = {}    # metric name -> [values]
+        self._units = {}
+
+    def elapsed_ms(self):
+        return (self._clock() - self._started) * 1000
+
+    def set_dimension(self, name, value):
+        self.dimensions[name] = _dimension_value(value)
+
+    def mark(self, name, first_only=True):
+        """Record the time since receipt under `name` (once, unless first_only=False)."""
+        if first_only and name in self._values:
+            return
+        self._values[name] = [round(self.elapsed_ms(), 1)]
+        self._units[name] = 'Milliseconds'
+
+    def record(self, name, value, unit='Milliseconds'):
+        """Add one value (a duration by default) to the metric `name`."""
+        self._values.setdefault(name, []).append(round(value, 1) if isinstance(value, float) else value)
+        self._units[name] = unit
+
+    def count(self, name, value=1):
+        values = self._values.setdefault(name, [0])
+        values[0] += value
+        self._units[name] = 'Count'
+
+    @contextmanager
+    def span(self, name):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, (self._clock() - started) * 1000)
+
+    def emf(self):
+        """The EMF document for this request."""
+        self.mark('TotalMs')
+        dimension_names = list(self.dimensions)
+        dimension_sets = [dimension_names]
+        if len(dimension_names) > 1:
+            dimension_sets.append(dimension_names[:1])
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': dimension_sets,
+                    'Metrics': [{'Name': name, 'Unit': self._units[name]} for name in self._values],
+                }],
+            },
+        }
+        document.update(self.properties)
+        document.update(self.dimensions)
+        for name, values in self._values.items():
+            document[name] = values[0] if len(values) == 1 else _downsample(values)
+        return document
+
+    def emit(self):
+        """Print the EMF line. Never raises: metrics must not fail a request."""
+        try:
+            print(json.dumps(self.emf(), default=str))
+        except Exception as e:
+            print(f"[metrics] EMF emit error: {e}")
+
+
+def _dimension_value(value):
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def _downsample(values):
+    if len(values) <= MAX_VALUES:
+        return values
+    ordered = sorted(values)
+    step = (len(ordered) - 1) / (MAX_VALUES - 1)
+    return [ordered[round(i * step)] for i in range(MAX_VALUES)]
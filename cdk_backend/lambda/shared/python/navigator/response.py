@@ -0,0 +1,89 @@
+"""
+Incremental accumulation of streamed agent answers.
+
+Bedrock splits the answer into byte chunks without regard for UTF-8 character
+boundaries, so decoding every chunk on its own raises (or mangles the text)
+whenever a multi-byte character straddles two chunks. `ResponseAccumulator`
+decodes with an incremental decoder and appends each decoded part to a single
+string. The accumulator drops its own reference while appending, so CPython
+resizes the string in place instead of copying it, and memory stays at the
+size of the answer. A list of parts joined at the end would hold the parts
+and the joined copy at the same time, about twice that.
+
+With `spill_chars` set, an answer that grows past the cap is moved to a spooled
+temporary file (memory is bounded by the spool size) and uploaded to S3 by
+`upload()`, so callers can pass an S3 reference to logclassifier instead of the
+whole text inline.
+"""
+
+import codecs
+import tempfile
+
+PREVIEW_CHARS = 1000
+# Bytes held in memory by the spool before it rolls over to /tmp
+SPOOL_MEMORY_BYTES = 256 * 1024
+
+
+class ResponseAccumulator:
+    """
+    Collects one streamed answer.
+
+    `feed(data)` returns the newly decoded text (possibly empty when the chunk
+    ends inside a character), `finish()` returns whatever the decoder still
+    held. `text` is the full answer, or None once the answer was spilled.
+    """
+
+    def __init__(self, spill_chars=None):
+        self.spill_chars = spill_chars or None
+        self.chars = 0
+        self.preview = ''
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._text = ''
+        self._spool = None
+
+    @property
+    def spilled(self):
+        return self._spool is not None
+
+    def feed(self, data):
+        return self._append(self._decoder.decode(data))
+
+    def finish(self):
+        return self._append(self._decoder.decode(b'', final=True))
+
+    @property
+    def text(self):
+        return None if self.spilled else self._text
+
+    def _append(self, text):
+        if not text:
+            return text
+        self.chars += len(text)
+        if len(self.preview) < PREVIEW_CHARS:
+            self.preview += text[:PREVIEW_CHARS - len(self.preview)]
+
+        if self._spool is not None:
+            self._spool.write(text.encode('utf-8'))
+        else:
+            # Sole reference while appending: `+=` resizes in place rather than copying
+            answer, self._text = self._text, None
+            answer += text
+            self._text = answer
+            if self.spill_chars and self.chars > self.spill_chars:
+                self._spill()
+        return text
+
+    def _spill(self):
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self._spool.write(self._text.encode('utf-8'))
+        self._text = ''
+
+    def upload(self, s3_client, bucket, key):
+        """Upload a spilled answer to S3 and release the spool. Returns the `s3://` URI."""
+        if not self.spilled:
+            raise ValueError('answer was not spilled')
+        self._spool.seek(0)
+        s3_client.upload_fileobj(self._spool, bucket, key,
+                                 ExtraArgs={'ContentType': 'text/plain; charset=utf-8'})
+        self._spool.close()
+        return f"s3://{bucket}/{key}"
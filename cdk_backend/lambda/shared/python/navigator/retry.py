@@ -0,0 +1,36 @@
+"""
+Retry pacing for agent invocations inside a Lambda invocation.
+
+Retries wait with capped exponential backoff and full jitter, so concurrent
+requests that failed together (typically on throttling) do not retry in lock
+step. A retry is only attempted when, after the wait, the Lambda still has
+enough time left for another generation; otherwise the caller gives up and
+reports the error while it can still reach the client.
+"""
+
+import random
+import time
+
+DEFAULT_BASE_DELAY_MS = 250
+DEFAULT_MAX_DELAY_MS = 4000
+# Time a fresh agent generation needs; below this a retry would be cut off by the timeout
+DEFAULT_RESERVE_MS = 20000
+
+
+def backoff_delay_ms(attempt, base_ms=DEFAULT_BASE_DELAY_MS, max_ms=DEFAULT_MAX_DELAY_MS, rng=random.random):
+    """Full-jitter delay before retry number `attempt` (0-based): uniform in [0, min(max, base * 2**attempt)]."""
+    return rng() * min(max_ms, base_ms * (2 ** attempt))
+
+
+def wait_for_retry(attempt, remaining_ms, reserve_ms=DEFAULT_RESERVE_MS, base_ms=DEFAULT_BASE_DELAY_MS,
+                   max_ms=DEFAULT_MAX_DELAY_MS, sleep=time.sleep):
+    """
+    Sleeps before retry number `attempt` and returns True, or returns False
+    without sleeping when the remaining Lambda time (milliseconds) after the
+    wait would be below `reserve_ms`.
+    """
+    delay_ms = backoff_delay_ms(attempt, base_ms, max_ms)
+    if remaining_ms - delay_ms < reserve_ms:
+        return False
+    sleep(delay_ms / 1000)
+    return True
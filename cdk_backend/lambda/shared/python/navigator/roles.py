@@ -0,0 +1,92 @@
+"""
+Role-specific system instructions for the Bedrock Agent.
+
+Used by every caller of `invoke_agent` (chat WebSocket, SSE streaming and the
+answer-cache warm-up) so cached and live answers are generated with the same
+role context.
+
+The full instructions add several hundred characters to a turn. Bedrock keeps
+`sessionAttributes` for the whole agent session, so `role_session_state` only
+sends the full text on a session's first turn (or after a role change) and a
+short role key otherwise; the agent instruction describes each role key.
+"""
+
+
+ROLE_INSTRUCTIONS = {
+    'instructor': """You are assisting a certified MHFA Instructor. Focus your responses on:
+- Teaching methodologies and best practices for conducting MHFA courses
+- Course preparation, lesson planning, and classroom management
+- Instructor certification requirements, renewals, and continuing education
+- Accessing instructor-specific resources, manuals, and training materials
+- Professional development and staying current with MHFA updates
+- Handling challenging classroom scenarios and participant questions
+
+Use professional, peer-to-peer language. Provide pedagogical insights and reference instructor resources.""",
+
+    'staff': """You are assisting organizational staff implementing MHFA programs. Focus your responses on:
+- Program implementation strategies and organizational rollout
+- Scheduling, coordinating, and managing MHFA training sessions
+- Tracking employee certifications and program metrics
+- Budget considerations and resource allocation
+- Measuring program effectiveness and ROI
+- Integration with existing workplace wellness initiatives
+- Case studies and organizational best practices
+
+Use administrative, coordination-focused language. Provide strategic guidance for program management.""",
+
+    'learner': """You are assisting a MHFA course participant or learner. Focus your responses on:
+- Basic MHFA concepts, principles, and the ALGEE action plan
+- Course registration, certification process, and requirements
+- Practical application of MHFA skills in daily life
+- Understanding mental health conditions and crisis situations
+- Where to find additional learning resources and support
+- Recertification process and maintaining skills
+- Self-care and personal wellness while helping others
+
+Use clear, educational, supportive language. Make concepts accessible and actionable."""
+}
+
+DEFAULT_ROLE = 'learner'
+
+# Roles the frontend sends; anything else is reported as OTHER_ROLE in metrics, where
+# every distinct dimension value becomes its own CloudWatch metric
+KNOWN_ROLES = frozenset(ROLE_INSTRUCTIONS) | {'guest'}
+OTHER_ROLE = 'other'
+
+
+def role_key(user_role):
+    """The role whose instructions apply (unknown roles, e.g. 'guest', get the learner ones)."""
+    return user_role if user_role in ROLE_INSTRUCTIONS else DEFAULT_ROLE
+
+
+def metric_role(user_role):
+    """`user_role` as a metric dimension value: a known role, or 'other'."""
+    return user_role if user_role in KNOWN_ROLES else OTHER_ROLE
+
+
+def get_role_specific_instructions(user_role):
+    """
+    Returns role-specific system instructions for the Bedrock Agent.
+    """
+    return ROLE_INSTRUCTIONS[role_key(user_role)]
+
+
+def role_session_state(user_role, full_context=True):
+    """
+    `sessionState` for `invoke_agent`. With full_context the role instructions
+    are sent in `sessionAttributes` (kept by Bedrock for the session) and in
+    `promptSessionAttributes` (this turn's prompt); without it only the role key
+    goes into the prompt.
+    """
+    if not full_context:
+        return {'promptSessionAttributes': {'role_context': role_key(user_role)}}
+    role_instructions = get_role_specific_instructions(user_role)
+    return {
+        'sessionAttributes': {
+            'user_role': user_role,
+            'role_instructions': role_instructions
+        },
+        'promptSessionAttributes': {
+            'role_context': role_instructions
+        }
+    }
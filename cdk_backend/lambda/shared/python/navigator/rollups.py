@@ -0,0 +1,273 @@
+"""
+Write-time analytics rollups.
+
+The analytics endpoint used to scan every conversation row and every feedback
+row to produce a handful of counters. `RollupStore` keeps those counters up
+to date as the rows are written instead: logclassifier adds each batch of
+interactions and the feedback handler adds each vote to one item per day and
+one per hour with atomic `UpdateItem ADD`, so a yearly view reads ~365 small
+items.
+
+Table layout (partition key `rollup`, sort key `bucket`):
+
+    day#2026                 / 2026-10-18   daily counters (one partition per year)
+    hour#2026-10-18          / 14           hourly counters (one partition per day)
+    sessions#2026-10-18      / <sid>        sessions active that day (kept)
+    hour-sessions#2026-10-18 / 14#<sid>     first-seen markers of an hour (TTL `expires_at`)
+    vote#<message_id>        / vote         current vote of a message
+
+Counters are `messages`, `sessions` (distinct sessions in the bucket),
+`positive`, `negative`, `location#<name>` and `role#<name>`. Interactions are
+counted at least once: a record redelivered after it was written counts again.
+
+The counters do not mean quite what the row-based analytics did:
+
+- `sessions` is distinct per bucket, so summing days counts a session once per
+  day it was active. `distinct_sessions` unions the day markers instead.
+- Votes are per message, counted on the day the vote was cast (a changed or
+  withdrawn vote moves), not the newest vote of each session applied to all
+  of its messages.
+"""
+
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+DEFAULT_MARKER_TTL_SECONDS = 3 * 86400
+DEFAULT_SESSION_WORKERS = 8
+# First-seen markers this container already wrote, so a busy session does not re-check every message
+MAX_SEEN_MARKERS = 20000
+
+MESSAGES = 'messages'
+SESSIONS = 'sessions'
+VOTES = ('positive', 'negative')
+LOCATION_PREFIX = 'location#'
+ROLE_PREFIX = 'role#'
+
+
+def day_key(day):
+    return {'rollup': f'day#{day[:4]}', 'bucket': day}
+
+
+def hour_key(day, hour):
+    return {'rollup': f'hour#{day}', 'bucket': hour}
+
+
+def _pair(key):
+    return key['rollup'], key['bucket']
+
+
+def interaction_deltas(item):
+    """Counter deltas one logged conversation item adds to its day and hour."""
+    deltas = Counter({MESSAGES: 1})
+    if item.get('location'):
+        deltas[LOCATION_PREFIX + item['location']] += 1
+    if item.get('user_role'):
+        deltas[ROLE_PREFIX + item['user_role']] += 1
+    return deltas
+
+
+def buckets_of(timestamp=None):
+    """('YYYY-MM-DD', 'HH') of an ISO timestamp (now when missing or unreadable)."""
+    try:
+        ts = datetime.fromisoformat(timestamp.split('#')[0])
+    except (AttributeError, ValueError):
+        ts = datetime.utcnow()
+    return ts.strftime('%Y-%m-%d'), ts.strftime('%H')
+
+
+class RollupStore:
+    """
+    Rollup counters in one DynamoDB table. Writes never raise: a rollup that
+    could not be updated is logged and the caller's own write stands.
+    """
+
+    def __init__(self, table, marker_ttl_seconds=DEFAULT_MARKER_TTL_SECONDS, clock=time.time):
+        self.table = table
+        self.marker_ttl_seconds = marker_ttl_seconds
+        self._clock = clock
+        self._seen = set()
+
+    # ── Writes ────────────────────────────────────────────────────────────
+    def record_interactions(self, items):
+        """
+        Adds logged conversation items (`session_id`, `original_ts`,
+        `location`, `user_role`) to their day and hour counters. A batch is
+        folded into one update per bucket before anything is written.
+        """
+        counters = defaultdict(Counter)   # (rollup, bucket) -> counter deltas
+        sessions = set()                  # (day, hour, session_id)
+        for item in items:
+            day, hour = buckets_of(item.get('original_ts'))
+            deltas = interaction_deltas(item)
+            for key in (day_key(day), hour_key(day, hour)):
+                counters[_pair(key)].update(deltas)
+            if item.get('session_id'):
+                sessions.add((day, hour, item['session_id']))
+
+        for day, hour, session_id in sessions:
+            if self._first_seen(f'sessions#{day}', session_id):
+                counters[_pair(day_key(day))][SESSIONS] += 1
+            if self._first_seen(f'hour-sessions#{day}', f'{hour}#{session_id}', self.marker_ttl_seconds):
+                counters[_pair(hour_key(day, hour))][SESSIONS] += 1
+
+        for (rollup, bucket), deltas in counters.items():
+            self._add({'rollup': rollup, 'bucket': bucket}, deltas)
+        return len(counters)
+
+    def record_vote(self, message_id, feedback, timestamp=None):
+        """
+        Moves a message's vote to `feedback` ('positive', 'negative' or None
+        to withdraw it). The previous vote is taken back from the buckets it
+        was counted in, so changing a vote does not count it twice.
+        """
+        day, hour = buckets_of(timestamp)
+        key = {'rollup': f'vote#{message_id}', 'bucket': 'vote'}
+        try:
+            if feedback in VOTES:
+                old = self.table.put_item(
+                    Item={**key, 'feedback': feedback, 'day': day, 'hour': hour},
+                    ReturnValues='ALL_OLD',
+                ).get('Attributes')
+            else:
+                old = self.table.delete_item(Key=key, ReturnValues='ALL_OLD').get('Attributes')
+        except Exception as e:
+            print(f"[rollups] vote marker error for {message_id}: {e}")
+            return
+        old = old or {}
+        if old.get('feedback') == feedback and old.get('day') == day and old.get('hour') == hour:
+            return
+        if old.get('feedback') in VOTES:
+            deltas = Counter({old['feedback']: -1})
+            self._add(day_key(old['day']), deltas)
+            self._add(hour_key(old['day'], old['hour']), deltas)
+        if feedback in VOTES:
+            deltas = Counter({feedback: 1})
+            self._add(day_key(day), deltas)
+            self._add(hour_key(day, hour), deltas)
+
+    def _first_seen(self, partition, marker, ttl_seconds=None):
+        """True the first time `marker` is recorded in `partition` (conditional put of a marker item)."""
+        if (partition, marker) in self._seen:
+            return False
+        item = {'rollup': partition, 'bucket': marker}
+        if ttl_seconds:
+            item['expires_at'] = int(self._clock()) + ttl_seconds
+        try:
+            self.table.put_item(
+                Item=item,
+                ConditionExpression='attribute_not_exists(#r)',
+                ExpressionAttributeNames={'#r': 'rollup'},
+            )
+            new = True
+        except Exception as e:
+            if 'ConditionalCheckFailed' not in str(e):
+                print(f"[rollups] session marker error: {e}")
+            new = False
+        if len(self._seen) >= MAX_SEEN_MARKERS:
+            self._seen.clear()
+        self._seen.add((partition, marker))
+        return new
+
+    def _add(self, key, deltas):
+        deltas = {name: n for name, n in deltas.items() if n}
+        if not deltas:
+            return
+        names = {f'#c{i}': name for i, name in enumerate(deltas)}
+        values = {f':v{i}': n for i, n in enumerate(deltas.values())}
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression='ADD ' + ', '.join(f'#c{i} :v{i}' for i in range(len(deltas))),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except Exception as e:
+            print(f"[rollups] update_item error for {key['rollup']}/{key['bucket']}: {e}")
+
+    # ── Reads ─────────────────────────────────────────────────────────────
+    def days(self, start_day, end_day):
+        """Daily rollup items between two 'YYYY-MM-DD' days (inclusive), oldest first."""
+        from boto3.dynamodb.conditions import Key
+
+        items = []
+        for year in range(int(start_day[:4]), int(end_day[:4]) + 1):
+            condition = Key('rollup').eq(f'day#{year}') & Key('bucket').between(start_day, end_day)
+            kwargs = {'KeyConditionExpression': condition}
+            while True:
+                resp = self.table.query(**kwargs)
+                items.extend(resp.get('Items', []))
+                if 'LastEvaluatedKey' not in resp:
+                    break
+                kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+        return items
+
+    def hours(self, day):
+        """Hourly rollup items of one day, in hour order."""
+        from boto3.dynamodb.conditions import Key
+
+        resp = self.table.query(KeyConditionExpression=Key('rollup').eq(f'hour#{day}'))
+        return resp.get('Items', [])
+
+    def distinct_sessions(self, start_day, end_day, workers=DEFAULT_SESSION_WORKERS):
+        """
+        Sessions active between two 'YYYY-MM-DD' days (inclusive), each counted
+        once however many days it was active: the union of the days' session
+        markers, one paginated key-only Query per day on a thread pool. The
+        workers share the Table's client (thread-safe, unlike the resource).
+        """
+        client, table_name = self.table.meta.client, self.table.name
+
+        def day_sessions(day):
+            kwargs = {
+                'TableName': table_name,
+                'KeyConditionExpression': '#r = :partition',
+                'ProjectionExpression': '#b',
+                'ExpressionAttributeNames': {'#r': 'rollup', '#b': 'bucket'},
+                'ExpressionAttributeValues': {':partition': f'sessions#{day}'},
+            }
+            found = []
+            while True:
+                resp = client.query(**kwargs)
+                found.extend(item['bucket'] for item in resp.get('Items', []))
+                if 'LastEvaluatedKey' not in resp:
+                    return found
+                kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+        first, last = date.fromisoformat(start_day), date.fromisoformat(end_day)
+        days = [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+        if not days:
+            return 0
+        sessions = set()
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(days)))) as pool:
+            for found in pool.map(day_sessions, days):
+                sessions.update(found)
+        return len(sessions)
+
+
+def summarize(rollup_items):
+    """
+    Totals of a list of rollup items: messages, sessions (distinct per bucket,
+    summed, so a session active in several buckets counts once per bucket; see
+    `RollupStore.distinct_sessions`), per-message positive and negative votes,
+    and per-location / per-role counts.
+    """
+    totals = Counter()
+    locations, roles = Counter(), Counter()
+    for item in rollup_items:
+        for name, value in item.items():
+            if name.startswith(LOCATION_PREFIX):
+                locations[name[len(LOCATION_PREFIX):]] += int(value)
+            elif name.startswith(ROLE_PREFIX):
+                roles[name[len(ROLE_PREFIX):]] += int(value)
+            elif name in (MESSAGES, SESSIONS) + VOTES:
+                totals[name] += int(value)
+    return {
+        MESSAGES: totals[MESSAGES],
+        SESSIONS: totals[SESSIONS],
+        'positive': totals['positive'],
+        'negative': totals['negative'],
+        'locations': dict(locations),
+        'roles': dict(roles),
+    }
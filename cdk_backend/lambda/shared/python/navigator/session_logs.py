@@ -0,0 +1,549 @@
+"""
+Date-bucketed reads of the session log table.
+
+The analytics endpoint used to `scan` the whole table with a filter on
+`original_ts`, so even a "today" request paid for every row ever written.
+logclassifier now stamps each row with `day_bucket` (the UTC day of
+`original_ts`, optionally suffixed with `#<shard>`), and the `DayIndex` GSI
+(`day_bucket`, `original_ts`) lets `query_window` read a time window with one
+`Query` per day and shard, run concurrently. Cost follows the window, not the
+table.
+
+With DAY_BUCKET_SHARDS > 1 a day's writes are spread over that many index
+partitions by session id. Writers and readers must use the same shard count;
+rows written under a different count are not found by the index. Rows
+logged before `day_bucket` existed are not in the index either, so the index
+is only used from DAY_INDEX_SINCE on (earlier windows are scanned) and not at
+all while it is unset; scripts/backfill-day-buckets.py stamps older rows.
+
+Windows the index cannot serve fall back to `parallel_scan`, a segmented scan
+on a thread pool sized from the table, which stops at a deadline and reports
+the unfinished segments so the caller can hand out a continuation token.
+The token carries the aggregate so far (`WindowAggregate.carry`), so each
+continuation adds to it and the last one answers for the whole window; the
+distinct sessions travel as a `SessionSketch` rather than as ids.
+Worker threads never share the `Table` resource (boto3 resources are not
+thread-safe); they call its client, which is.
+
+Either way the endpoint reads a narrow projection first and folds it into a
+`WindowAggregate` (counters plus the newest keys in a bounded heap); only the
+rows it actually returns are fetched in full, with `fetch_rows`. Votes are
+looked up only for the sessions in the window, with `latest_feedback`. Reads
+are billed on the items evaluated, not the projected attributes: on a scan the
+narrow projection saves transfer and memory only, while the day index, which
+does not hold the bodies, is billed on its small items.
+
+The conversations endpoint pages through a window newest first with
+`query_newest`: each page is a bounded number of `Limit`ed Queries, resumed
+from the position (per-bucket `ExclusiveStartKey`s) the previous page ended at.
+"""
+
+import base64
+import hashlib
+import heapq
+import json
+import math
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+DAY_INDEX = 'DayIndex'
+DEFAULT_SHARDS = 1
+DEFAULT_QUERY_WORKERS = 8
+DEFAULT_TOP_K = 50
+
+# Conversation browsing: rows per page, and Queries one page may issue before it stops short
+DEFAULT_PAGE_SIZE = 25
+DEFAULT_PAGE_QUERIES = 16
+
+# Parallel scan: one segment per SCAN_SEGMENT_BYTES of table (DescribeTable size, ~6h stale)
+DEFAULT_SCAN_WORKERS = 8
+SCAN_SEGMENT_BYTES = 64 * 2**20
+MAX_SCAN_SEGMENTS = 64
+
+# Feedback table GSI (session_id, timestamp) queried once per session in a window
+FEEDBACK_SESSION_INDEX = 'SessionIndex'
+DEFAULT_FEEDBACK_WORKERS = 16
+
+# Distinct sessions carried by a continuation token: 2**11 one-byte registers, ~2.3% error
+SKETCH_PRECISION = 11
+
+# BatchGetItem accepts at most 100 keys; unprocessed keys are retried with backoff
+BATCH_GET_SIZE = 100
+BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BASE_DELAY = 0.05
+
+
+def _table_client(table):
+    """
+    (client, table name) of a `Table`, for calls from worker threads. The
+    Table's own client takes the same high-level arguments (Python values,
+    condition objects) and returns deserialized items, and is thread-safe.
+    """
+    return table.meta.client, table.name
+
+
+def day_bucket(iso_ts, session_id='', shards=DEFAULT_SHARDS):
+    """`day_bucket` value for a row: 'YYYY-MM-DD', or 'YYYY-MM-DD#<shard>' when sharded."""
+    day = iso_ts[:10]
+    if shards <= 1:
+        return day
+    return f"{day}#{zlib.crc32(session_id.encode('utf-8')) % shards}"
+
+
+def day_buckets(start, end, shards=DEFAULT_SHARDS):
+    """Every bucket covering the days from `start` to `end` (datetimes, inclusive)."""
+    buckets = []
+    day = start.date()
+    while day <= end.date():
+        iso = day.isoformat()
+        buckets.extend([iso] if shards <= 1 else [f"{iso}#{shard}" for shard in range(shards)])
+        day += timedelta(days=1)
+    return buckets
+
+
+def query_window(table, start, end, shards=DEFAULT_SHARDS, index_name=DAY_INDEX,
+                 workers=DEFAULT_QUERY_WORKERS, aggregate=None, **query_kwargs):
+    """
+    Rows with `original_ts` between `start` and `end` (datetimes) from the day
+    index, one paginated `Query` per bucket on a thread pool. Extra keyword
+    arguments (ProjectionExpression, FilterExpression, ...) are passed to
+    every Query. Returns (items, stats) with the number of queries, pages and
+    rows the index read (`ScannedCount`).
+
+    With `aggregate` (a `WindowAggregate`) rows are folded into it page by
+    page instead of collected, each bucket into its own copy merged at the
+    end, and (aggregate, stats) is returned.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+    client, table_name = _table_client(table)
+
+    def query_bucket(bucket):
+        kwargs = dict(
+            query_kwargs,
+            TableName=table_name,
+            IndexName=index_name,
+            KeyConditionExpression=Key('day_bucket').eq(bucket) & Key('original_ts').between(start_iso, end_iso),
+        )
+        sink = aggregate.empty() if aggregate is not None else []
+        pages, scanned = 0, 0
+        while True:
+            resp = client.query(**kwargs)
+            if aggregate is not None:
+                sink.add(resp.get('Items', []))
+            else:
+                sink.extend(resp.get('Items', []))
+            pages += 1
+            scanned += resp.get('ScannedCount', 0)
+            if 'LastEvaluatedKey' not in resp:
+                return sink, pages, scanned
+            kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+    buckets = day_buckets(start, end, shards)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(buckets)))) as pool:
+        results = list(pool.map(query_bucket, buckets))
+
+    stats = {
+        'queries': len(buckets),
+        'pages': sum(pages for _, pages, _ in results),
+        'scanned': sum(scanned for _, _, scanned in results),
+    }
+    if aggregate is not None:
+        for sink, _, _ in results:
+            aggregate.merge(sink)
+        return aggregate, stats
+    return [item for sink, _, _ in results for item in sink], stats
+
+
+def index_key(item):
+    """ExclusiveStartKey that resumes a day index query right after `item`."""
+    return {name: item[name] for name in ('day_bucket', 'original_ts', 'session_id', 'timestamp')}
+
+
+def query_newest(table, start, end, position=None, limit=DEFAULT_PAGE_SIZE, shards=DEFAULT_SHARDS,
+                 index_name=DAY_INDEX, max_queries=DEFAULT_PAGE_QUERIES, keep=None, **query_kwargs):
+    """
+    One page of day index rows with `original_ts` between `start` and `end`
+    (datetimes), newest first. Days are read from `end` backwards with
+    `ScanIndexForward=False` and `Limit` set to the rows still missing; a
+    day's shards are merged by `original_ts`. Extra keyword arguments
+    (FilterExpression, ...) are passed to every Query; `keep`, when given,
+    takes a day's candidate rows and returns the ones to keep, for filters
+    DynamoDB cannot evaluate.
+
+    The page ends when it holds `limit` rows, the window is exhausted, or the
+    next day's queries would exceed `max_queries`, so a page can hold fewer
+    rows than `limit` while more follow. Returns (rows, position, stats):
+    `position` ({'day', 'after', 'done'}, JSON-serializable) resumes the next
+    page and is None at the end of the window.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    def buckets_of(day):
+        midnight = datetime(day.year, day.month, day.day)
+        return day_buckets(midnight, midnight, shards)
+
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+    position = position or {}
+    day = date.fromisoformat(position['day']) if position.get('day') else end.date()
+    after = dict(position.get('after') or {})   # bucket -> ExclusiveStartKey
+    done = set(position.get('done') or [])      # buckets of `day` already exhausted
+    rows, stats = [], {'queries': 0, 'scanned': 0}
+
+    while day >= start.date() and len(rows) < limit:
+        buckets = [b for b in buckets_of(day) if b not in done]
+        if stats['queries'] and stats['queries'] + len(buckets) > max_queries:
+            break
+        candidates, last_keys = [], {}
+        for bucket in buckets:
+            kwargs = dict(
+                query_kwargs,
+                IndexName=index_name,
+                KeyConditionExpression=Key('day_bucket').eq(bucket) & Key('original_ts').between(start_iso, end_iso),
+                ScanIndexForward=False,
+                Limit=limit - len(rows),
+            )
+            if after.get(bucket):
+                kwargs['ExclusiveStartKey'] = after[bucket]
+            resp = table.query(**kwargs)
+            stats['queries'] += 1
+            stats['scanned'] += resp.get('ScannedCount', 0)
+            candidates.extend(resp.get('Items', []))
+            last_keys[bucket] = resp.get('LastEvaluatedKey')
+
+        # Stable sort: rows of one bucket keep DynamoDB's order, which the resume keys follow.
+        # A bucket with more to read only has rows at or before its LastEvaluatedKey left, so
+        # rows older than the newest such key wait until those buckets are read further
+        candidates.sort(key=lambda it: it['original_ts'], reverse=True)
+        horizon = max((key['original_ts'] for key in last_keys.values() if key), default='')
+        kept = {id(it) for it in (keep(candidates) if keep else candidates)}
+        consumed = Counter()
+        for item in candidates:
+            if len(rows) == limit or item['original_ts'] < horizon:
+                break
+            consumed[item['day_bucket']] += 1
+            after[item['day_bucket']] = index_key(item)
+            if id(item) in kept:
+                rows.append(item)
+
+        # A bucket whose returned rows were all consumed resumes where DynamoDB stopped
+        # (past rows its filter dropped) or is done; otherwise right after its last consumed row
+        returned = Counter(item['day_bucket'] for item in candidates)
+        for bucket, last_key in last_keys.items():
+            if consumed[bucket] == returned[bucket]:
+                if last_key:
+                    after[bucket] = last_key
+                else:
+                    after.pop(bucket, None)
+                    done.add(bucket)
+        if len(done) == len(buckets_of(day)):
+            day -= timedelta(days=1)
+            after, done = {}, set()
+
+    if day < start.date():
+        return rows, None, stats
+    return rows, {'day': day.isoformat(), 'after': after, 'done': sorted(done)}, stats
+
+
+def scan_pages(table, **scan_kwargs):
+    """`Items` of every page of a paginated scan, one list per page."""
+    kwargs = dict(scan_kwargs)
+    while True:
+        resp = table.scan(**kwargs)
+        yield resp.get('Items', [])
+        if 'LastEvaluatedKey' not in resp:
+            return
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+
+def scan_segments(table, segment_bytes=SCAN_SEGMENT_BYTES, max_segments=MAX_SCAN_SEGMENTS):
+    """TotalSegments for a parallel scan of `table`: one per `segment_bytes`, at least 1."""
+    try:
+        size = table.table_size_bytes or 0
+    except Exception as e:
+        print(f"[session_logs] describe_table error: {e}")
+        return 1
+    return max(1, min(max_segments, math.ceil(size / segment_bytes)))
+
+
+def parallel_scan(table, aggregate, total_segments, workers=DEFAULT_SCAN_WORKERS, deadline=None,
+                  resume=None, clock=time.time, **scan_kwargs):
+    """
+    Folds a `Segment`/`TotalSegments` scan into `aggregate` (a
+    `WindowAggregate`), each segment into its own copy merged at the end.
+    `resume` ({segment: ExclusiveStartKey or None}) limits the scan to those
+    segments and where they stopped. No new page is requested once `clock()`
+    passes `deadline`.
+
+    Returns (aggregate, pending, stats): `pending` maps every unfinished
+    segment to the key to resume it from (None when it never started) and is
+    empty when the scan completed.
+    """
+    segments = resume if resume is not None else {segment: None for segment in range(total_segments)}
+    client, table_name = _table_client(table)
+
+    def scan_segment(segment, start_key):
+        sink = aggregate.empty()
+        kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total_segments)
+        pages, scanned = 0, 0
+        while True:
+            if deadline is not None and clock() >= deadline:
+                return sink, start_key, pages, scanned, False
+            if start_key:
+                kwargs['ExclusiveStartKey'] = start_key
+            resp = client.scan(**kwargs)
+            sink.add(resp.get('Items', []))
+            pages += 1
+            scanned += resp.get('ScannedCount', 0)
+            start_key = resp.get('LastEvaluatedKey')
+            if not start_key:
+                return sink, None, pages, scanned, True
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(segments)))) as pool:
+        futures = {segment: pool.submit(scan_segment, segment, key) for segment, key in segments.items()}
+        results = {segment: future.result() for segment, future in futures.items()}
+
+    pending = {}
+    for segment, (sink, start_key, _, _, done) in results.items():
+        aggregate.merge(sink)
+        if not done:
+            pending[segment] = start_key
+    stats = {
+        'segments': len(segments),
+        'pages': sum(r[2] for r in results.values()),
+        'scanned': sum(r[3] for r in results.values()),
+    }
+    return aggregate, pending, stats
+
+
+def encode_token(state):
+    """Opaque, URL-safe continuation token for a JSON-serializable state."""
+    raw = zlib.compress(json.dumps(state, separators=(',', ':'), default=str).encode('utf-8'))
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """State of a token from `encode_token`; ValueError when it is not one."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        state = json.loads(zlib.decompress(raw))
+    except Exception as e:
+        raise ValueError(f"invalid continuation token: {e}") from None
+    if not isinstance(state, dict):
+        raise ValueError("invalid continuation token")
+    return state
+
+
+class SessionSketch:
+    """
+    HyperLogLog estimate of a number of distinct session ids, in
+    2**precision one-byte registers (relative error about
+    1.04 / sqrt(2**precision)). Small counts use linear counting, which is
+    close to exact. Sketches of the same precision merge.
+    """
+
+    def __init__(self, precision=SKETCH_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def update(self, session_ids):
+        width = 64 - self.precision
+        for session_id in session_ids:
+            h = int.from_bytes(hashlib.blake2b(session_id.encode('utf-8'), digest_size=8).digest(), 'big')
+            index, rank = h >> width, width - (h & ((1 << width) - 1)).bit_length() + 1
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+        return self
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        zeros = self.registers.count(0)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def encode(self):
+        return base64.b64encode(bytes(self.registers)).decode('ascii')
+
+    @classmethod
+    def decode(cls, text):
+        registers = base64.b64decode(text)
+        return cls(precision=len(registers).bit_length() - 1, registers=registers)
+
+
+class WindowAggregate:
+    """
+    What the analytics endpoint needs from a window of session log rows,
+    built from narrow key-only rows (`session_id`, `timestamp`, `location`,
+    `original_ts`): distinct sessions, per-location counts, messages per
+    session (sentiment is per session) and the `top_k` newest row keys, kept
+    in a bounded min-heap. Aggregates of disjoint parts of a window merge.
+
+    `carry()` / `resume()` pass it between invocations in a continuation
+    token; the resumed aggregate keeps the earlier parts' sessions in a
+    `SessionSketch` (`distinct_sessions` becomes an estimate) and starts
+    `messages_by_session` empty, so a caller weighting sessions by their
+    messages carries its own totals alongside.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.rows = 0
+        self.messages_by_session = Counter()   # session_id (None when missing) -> rows
+        self.locations = Counter()
+        self._newest = []                      # min-heap of (original_ts, session_id, timestamp)
+        self.sketch = None                     # SessionSketch of earlier parts, once resumed
+
+    def empty(self):
+        return WindowAggregate(self.top_k)
+
+    def add(self, items):
+        for item in items:
+            self.rows += 1
+            session_id = item.get('session_id')
+            self.messages_by_session[session_id] += 1
+            location = item.get('location')
+            if isinstance(location, str) and location:
+                self.locations[location] += 1
+            if session_id and self.top_k:
+                self._push((item.get('original_ts', ''), session_id, item.get('timestamp', '')))
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.messages_by_session.update(other.messages_by_session)
+        self.locations.update(other.locations)
+        for entry in other._newest:
+            self._push(entry)
+        return self
+
+    def _push(self, entry):
+        if len(self._newest) < self.top_k:
+            heapq.heappush(self._newest, entry)
+        elif entry > self._newest[0]:
+            heapq.heapreplace(self._newest, entry)
+
+    @property
+    def sessions(self):
+        return [sid for sid in self.messages_by_session if sid]
+
+    def distinct_sessions(self):
+        if self.sketch is None:
+            return len(self.sessions)
+        return self._sketch().estimate()
+
+    def _sketch(self):
+        sketch = SessionSketch()
+        if self.sketch is not None:
+            sketch.merge(self.sketch)
+        return sketch.update(self.sessions)
+
+    def carry(self):
+        """JSON-serializable state for a continuation token; see `resume`."""
+        return {
+            'rows': self.rows,
+            'locations': dict(self.locations),
+            'newest': self._newest,
+            'sessions': self._sketch().encode(),
+        }
+
+    @classmethod
+    def resume(cls, state, top_k=DEFAULT_TOP_K):
+        """Aggregate continuing from `carry()`; ValueError/KeyError/TypeError on a malformed state."""
+        aggregate = cls(top_k)
+        aggregate.rows = int(state['rows'])
+        aggregate.locations.update({str(k): int(v) for k, v in state['locations'].items()})
+        for original_ts, session_id, timestamp in state['newest']:
+            aggregate._push((str(original_ts), str(session_id), str(timestamp)))
+        try:
+            aggregate.sketch = SessionSketch.decode(state['sessions'])
+        except Exception as e:
+            raise ValueError(f"invalid session sketch: {e}") from None
+        return aggregate
+
+    def newest(self):
+        """Keys of the `top_k` newest rows, newest first: [{'session_id', 'timestamp', 'original_ts'}]."""
+        return [
+            {'session_id': session_id, 'timestamp': timestamp, 'original_ts': original_ts}
+            for original_ts, session_id, timestamp in sorted(self._newest, reverse=True)
+        ]
+
+
+def fetch_rows(ddb, table_name, keys, attempts=BATCH_GET_ATTEMPTS, **get_kwargs):
+    """
+    Full rows for `keys` ([{'session_id', 'timestamp'}]) with BatchGetItem
+    (100 keys per request), retrying UnprocessedKeys with backoff. Extra
+    keyword arguments (ProjectionExpression, ...) go into the request. Returns
+    {(session_id, timestamp): item}; rows that could not be read are missing.
+    """
+    rows = {}
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table_name: dict(get_kwargs, Keys=[
+            {'session_id': k['session_id'], 'timestamp': k['timestamp']} for k in keys[start:start + BATCH_GET_SIZE]
+        ])}
+        for attempt in range(attempts):
+            try:
+                resp = ddb.batch_get_item(RequestItems=request)
+            except Exception as e:
+                print(f"[session_logs] batch_get_item error (attempt {attempt + 1}): {e}")
+            else:
+                for item in resp.get('Responses', {}).get(table_name, []):
+                    rows[(item['session_id'], item['timestamp'])] = item
+                request = resp.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+            if attempt < attempts - 1:
+                time.sleep(BATCH_GET_BASE_DELAY * (2 ** attempt))
+    return rows
+
+
+def latest_feedback(feedback_table, session_ids, index_name=FEEDBACK_SESSION_INDEX,
+                    workers=DEFAULT_FEEDBACK_WORKERS):
+    """
+    {session_id: newest vote ('positive' / 'negative')} for the given sessions,
+    one `Limit=1` newest-first Query per distinct session on the feedback
+    table's session index, run concurrently. Sessions without a vote are left
+    out. Raises when the index cannot be queried (missing or still building),
+    so callers can fall back to a scan.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    client, table_name = _table_client(feedback_table)
+
+    def newest(session_id):
+        resp = client.query(
+            TableName=table_name,
+            IndexName=index_name,
+            KeyConditionExpression=Key('session_id').eq(session_id),
+            ProjectionExpression='feedback',
+            ScanIndexForward=False,
+            Limit=1,
+        )
+        items = resp.get('Items', [])
+        return session_id, items[0].get('feedback') if items else None
+
+    unique = list(dict.fromkeys(sid for sid in session_ids if sid))
+    if not unique:
+        return {}
+    # The first query alone, so a missing index fails once rather than once per worker
+    results = [newest(unique[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique)))) as pool:
+        results.extend(pool.map(newest, unique[1:]))
+    return {sid: vote for sid, vote in results if vote}
+
+
+def parse_since(value, name='DAY_INDEX_SINCE'):
+    """Datetime of a 'YYYY-MM-DD' cutoff setting (`name`), or None when unset or invalid."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        print(f"[session_logs] Ignoring invalid {name} {value!r}")
+        return None
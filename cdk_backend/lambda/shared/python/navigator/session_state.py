@@ -0,0 +1,127 @@
+"""
+Per-session metadata for agent turns.
+
+`SessionRoleStore` remembers which role's full instructions have already been
+sent in an agent session, so later turns can send only the role key (see
+`navigator.roles.role_session_state`). Entries live in an in-process LRU and,
+when a table is configured, in DynamoDB so every Lambda container sees them.
+
+Entries expire a little before the agent's idle session timeout: once Bedrock
+has dropped the session (and its `sessionAttributes`) the next turn must send
+the full role context again.
+
+The same table records sessions the agent escalated to an admin
+(`mark_escalated`), under a separate `escalated#<session_id>` key with its
+own, longer expiry; the scheduler gives their follow-ups priority.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Bedrock Agent sessions expire after 10 idle minutes by default
+DEFAULT_TTL_SECONDS = 540
+DEFAULT_LOCAL_ENTRIES = 1024
+ESCALATION_TTL_SECONDS = 24 * 3600
+
+
+class SessionRoleStore:
+    """
+    Table layout (partition key `session_id`): `user_role`, `turns`,
+    `expires_at` (DynamoDB TTL attribute, epoch seconds, refreshed every turn).
+    """
+
+    def __init__(self, table=None, ttl_seconds=DEFAULT_TTL_SECONDS, max_local_entries=DEFAULT_LOCAL_ENTRIES,
+                 clock=time.time):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self._clock = clock
+        self._local = OrderedDict()   # session_id -> (user_role, expires_at)
+        self._lock = threading.Lock()
+
+    def needs_full_context(self, session_id, user_role):
+        """True on a session's first turn, after a role change, or once the session went idle."""
+        return self._stored_role(session_id) != user_role
+
+    def is_new_session(self, session_id):
+        """
+        True when the agent has no conversation to continue: the session's first
+        turn, or the session went idle. False when that cannot be read.
+        """
+        return self._stored_role(session_id, on_error='') is None
+
+    def remember(self, session_id, user_role):
+        """Record that `user_role`'s context is in the agent session; extends the expiry."""
+        expires_at = int(self._clock() + self.ttl_seconds)
+        self._remember_local(session_id, user_role, expires_at)
+        if self.table is None:
+            return
+        try:
+            self.table.update_item(
+                Key={'session_id': session_id},
+                UpdateExpression='SET user_role = :role, expires_at = :exp ADD turns :one',
+                ExpressionAttributeValues={':role': user_role, ':exp': expires_at, ':one': 1},
+            )
+        except Exception as e:
+            print(f"[session-state] update_item error: {e}")
+
+    def remember_replay(self, session_id):
+        """
+        Record a turn answered without the agent (from the answer cache): later
+        turns are no longer first turns, but the agent still has no context.
+        """
+        self.remember(session_id, '')
+
+    def _stored_role(self, session_id, on_error=None):
+        now = self._clock()
+        with self._lock:
+            entry = self._local.get(session_id)
+            if entry and entry[1] > now:
+                self._local.move_to_end(session_id)
+                return entry[0]
+        if self.table is None:
+            return None
+        try:
+            item = self.table.get_item(Key={'session_id': session_id}).get('Item')
+        except Exception as e:
+            # Unknown state: sending the full context is always correct
+            print(f"[session-state] get_item error: {e}")
+            return on_error
+        if not item or int(item.get('expires_at', 0)) <= now:
+            return None
+        self._remember_local(session_id, item.get('user_role'), int(item['expires_at']))
+        return item.get('user_role')
+
+    def _remember_local(self, session_id, user_role, expires_at):
+        with self._lock:
+            self._local[session_id] = (user_role, expires_at)
+            self._local.move_to_end(session_id)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+
+def _escalation_key(session_id):
+    return f"escalated#{session_id}"
+
+
+def mark_escalated(table, session_id, ttl_seconds=ESCALATION_TTL_SECONDS, clock=time.time):
+    """Records that `session_id` was escalated to an admin."""
+    try:
+        table.put_item(Item={
+            'session_id': _escalation_key(session_id),
+            'escalated_at': int(clock()),
+            'expires_at': int(clock() + ttl_seconds),
+        })
+    except Exception as e:
+        print(f"[session-state] escalation put_item error: {e}")
+
+
+def is_escalated(table, session_id, clock=time.time):
+    """True while an escalation of `session_id` is recorded (False when it cannot be read)."""
+    try:
+        item = table.get_item(Key={'session_id': _escalation_key(session_id)}).get('Item')
+    except Exception as e:
+        print(f"[session-state] escalation get_item error: {e}")
+        return False
+    return bool(item) and int(item.get('expires_at', 0)) > clock()
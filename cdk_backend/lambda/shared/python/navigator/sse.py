@@ -0,0 +1,369 @@
+"""
+Response streaming for the SSE transport (streamingHandler).
+
+The Python Lambda runtime has no response streaming API (`awslambda.stream_response`
+only exists in Node.js), so streamingHandler could not run anywhere. It now
+returns a `StreamingResponse` (status, headers and an iterable of body parts)
+and `serve` writes it out over HTTP/1.1 with chunked transfer encoding,
+flushing each part as soon as it is produced.
+
+The same server runs in Lambda behind the Lambda Web Adapter: the function
+has a Function URL with `InvokeMode: RESPONSE_STREAM`, the adapter forwards
+each request to `PORT` and streams the chunked body back to the caller.
+Locally it serves development and benchmarks. Requests are converted into a
+Function URL event (payload format 2.0) either way, so the handler sees one
+event shape.
+
+Streams are resumable. `SessionStream` runs a generation on its own thread,
+numbers its events (the SSE `id:` field) and keeps the most recent ones in a
+bounded ring buffer; `StreamRegistry` holds the current stream of each
+session. A client that reconnects with `Last-Event-ID` is sent the buffered
+events after that id and then follows the live stream, instead of asking the
+question again. Subscribers waiting for events get a heartbeat comment so
+proxies neither buffer nor close an idle response. The registry is in-process:
+behind the Lambda Web Adapter a reconnect is resumed when it reaches the same
+execution environment, otherwise the client has to ask again.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_PORT = 8080
+DEFAULT_TIMEOUT_SECONDS = 120
+READINESS_PATH = '/health'
+
+DEFAULT_REPLAY_EVENTS = 512
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+# A generation nobody is reading is abandoned after this long (time to reconnect)
+DEFAULT_RESUME_GRACE_SECONDS = 10.0
+# A finished stream stays resumable this long, for clients that missed its last events
+DEFAULT_RETAIN_SECONDS = 60.0
+DEFAULT_MAX_STREAMS = 256
+DEFAULT_RETRY_MS = 2000
+
+HEARTBEAT = ': heartbeat\n\n'
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+}
+
+
+def format_event(frame, event_id=None):
+    """One SSE event carrying `frame` as JSON, with an `id:` field when given."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}data: {json.dumps(frame)}\n\n"
+
+
+def last_event_id(event):
+    """The `Last-Event-ID` a reconnecting client sent, or None."""
+    value = (event.get('headers') or {}).get('last-event-id')
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def request_params(event):
+    """Query string parameters overlaid with the JSON body (EventSource can only send GET)."""
+    params = dict(parse_qsl(event.get('rawQueryString') or ''))
+    params.update(json.loads(event.get('body') or '{}'))
+    return params
+
+
+class SessionStream:
+    """
+    One generation for one session. A producer thread pulls frames from
+    `frames` (a generator), numbers them from 1 and keeps the last
+    `max_events` formatted events; `subscribe` generators read them. When no
+    subscriber has been attached for `grace_seconds` the generator is closed,
+    which stops the generation.
+    """
+
+    def __init__(self, session_id, frames, max_events=DEFAULT_REPLAY_EVENTS,
+                 grace_seconds=DEFAULT_RESUME_GRACE_SECONDS, clock=time.monotonic):
+        self.session_id = session_id
+        self.done = False
+        self.finished_at = None
+        self._frames = frames
+        self._events = deque(maxlen=max_events)
+        self._next_id = 1
+        self._grace_seconds = grace_seconds
+        self._clock = clock
+        self._subscribers = 0
+        self._detached_at = clock()
+        self._cancelled = False
+        self._cond = threading.Condition()
+        threading.Thread(target=self._produce, daemon=True, name=f'sse-stream-{session_id}').start()
+
+    def cancel(self):
+        """Stops the generation at its next event (a new question replaced it)."""
+        with self._cond:
+            self._cancelled = True
+
+    def _produce(self):
+        try:
+            for frame in self._frames:
+                with self._cond:
+                    self._events.append((self._next_id, format_event(frame, self._next_id)))
+                    self._next_id += 1
+                    self._cond.notify_all()
+                    unread = self._subscribers == 0 and self._clock() - self._detached_at > self._grace_seconds
+                    if self._cancelled or unread:
+                        print(f"🛑 Stopping SSE generation for session {self.session_id} "
+                              f"({'replaced' if self._cancelled else 'no client'})")
+                        break
+        except Exception as e:
+            print(f"❌ SSE producer error: {str(e)}")
+        finally:
+            # Closing a suspended generator runs its GeneratorExit handling (abandon)
+            close = getattr(self._frames, 'close', None)
+            if close:
+                close()
+            with self._cond:
+                self.done = True
+                self.finished_at = self._clock()
+                self._cond.notify_all()
+
+    def subscribe(self, after_id=0, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS, retry_ms=DEFAULT_RETRY_MS):
+        """
+        Generator of SSE text: the buffered events with an id above `after_id`,
+        then live events until the generation ends, with a heartbeat comment
+        after each `heartbeat_seconds` without one. Events that already left
+        the ring buffer cannot be replayed; the client gets an `error` event.
+        """
+        with self._cond:
+            self._subscribers += 1
+        try:
+            if retry_ms:
+                yield f"retry: {retry_ms}\n\n"
+            last = after_id
+            while True:
+                with self._cond:
+                    if self._next_id - 1 <= last and not self.done:
+                        self._cond.wait(heartbeat_seconds)
+                    oldest = self._events[0][0] if self._events else self._next_id
+                    pending = [e for e in self._events if e[0] > last]
+                    finished = self.done
+                if last + 1 < oldest:
+                    print(f"⚠️ Events {last + 1}-{oldest - 1} of session {self.session_id} are no longer buffered")
+                    yield format_event({'type': 'error', 'message': 'The stream can no longer be resumed'})
+                    return
+                if pending:
+                    last = pending[-1][0]
+                    yield ''.join(text for _, text in pending)
+                elif finished:
+                    return
+                else:
+                    yield HEARTBEAT
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                self._detached_at = self._clock()
+
+
+class StreamRegistry:
+    """
+    The current `SessionStream` of each session, in this process. Holds at
+    most `max_streams` (least recently started dropped first); finished
+    streams are dropped `retain_seconds` after they end.
+    """
+
+    def __init__(self, max_streams=DEFAULT_MAX_STREAMS, retain_seconds=DEFAULT_RETAIN_SECONDS,
+                 max_events=DEFAULT_REPLAY_EVENTS, grace_seconds=DEFAULT_RESUME_GRACE_SECONDS,
+                 clock=time.monotonic):
+        self.max_streams = max_streams
+        self.retain_seconds = retain_seconds
+        self.max_events = max_events
+        self.grace_seconds = grace_seconds
+        self._clock = clock
+        self._streams = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, session_id, frames):
+        """Starts streaming `frames` for the session, replacing its previous stream."""
+        stream = SessionStream(session_id, frames, self.max_events, self.grace_seconds, self._clock)
+        with self._lock:
+            previous = self._streams.pop(session_id, None)
+            self._streams[session_id] = stream
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        if previous and not previous.done:
+            previous.cancel()
+        return stream
+
+    def get(self, session_id):
+        """The session's stream if it can still be resumed, else None."""
+        now = self._clock()
+        with self._lock:
+            for sid in [sid for sid, s in self._streams.items()
+                        if s.done and now - s.finished_at > self.retain_seconds]:
+                del self._streams[sid]
+            return self._streams.get(session_id)
+
+
+class StreamingResponse:
+    """What a handler returns to stream its body; `body` yields str or bytes parts."""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class InvocationContext:
+    """
+    Stand-in for the Lambda context object. Behind the Lambda Web Adapter the
+    request id and deadline come from the `x-amzn-lambda-context` header.
+    """
+
+    def __init__(self, request_id=None, deadline_ms=None, function_name='streamingHandler'):
+        self.aws_request_id = request_id or str(uuid.uuid4())
+        self.function_name = function_name
+        self._deadline_ms = deadline_ms or (time.time() + DEFAULT_TIMEOUT_SECONDS) * 1000
+
+    @classmethod
+    def from_headers(cls, headers):
+        try:
+            lambda_context = json.loads(headers.get('x-amzn-lambda-context') or '{}')
+        except ValueError:
+            lambda_context = {}
+        return cls(lambda_context.get('request_id'), lambda_context.get('deadline'),
+                   lambda_context.get('invoked_function_arn', 'streamingHandler'))
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int(self._deadline_ms - time.time() * 1000))
+
+
+def function_url_event(method, target, headers, body):
+    """A Lambda Function URL event (payload format 2.0) for one HTTP request."""
+    url = urlsplit(target)
+    return {
+        'version': '2.0',
+        'rawPath': url.path,
+        'rawQueryString': url.query,
+        'headers': {k.lower(): v for k, v in headers.items()},
+        'requestContext': {
+            'http': {'method': method, 'path': url.path},
+            'timeEpoch': int(time.time() * 1000),
+        },
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+class _StreamingRequestHandler(BaseHTTPRequestHandler):
+    # Chunked transfer encoding needs HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+    lambda_handler = None
+    readiness_path = READINESS_PATH
+
+    def setup(self):
+        super().setup()
+        # Small SSE events must not wait for Nagle's algorithm
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path == self.readiness_path:
+            self._write_buffered({'statusCode': 200, 'body': 'ok'})
+        else:
+            self._invoke('GET')
+
+    def do_POST(self):
+        self._invoke('POST')
+
+    def do_OPTIONS(self):
+        self._write_buffered({'statusCode': 204, 'headers': CORS_HEADERS, 'body': ''})
+
+    def _invoke(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else None
+        event = function_url_event(method, self.path, dict(self.headers), body)
+        try:
+            result = self.lambda_handler(event, InvocationContext.from_headers(event['headers']))
+        except Exception as e:
+            print(f"❌ Handler error: {str(e)}")
+            result = {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+        if isinstance(result, StreamingResponse):
+            self._write_stream(result)
+        else:
+            self._write_buffered(result)
+
+    def _write_buffered(self, result):
+        data = (result.get('body') or '').encode('utf-8')
+        self.send_response(result.get('statusCode', 200))
+        for name, value in (result.get('headers') or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_stream(self, result):
+        self.send_response(result.status_code)
+        for name, value in result.headers.items():
+            if name.lower() not in ('connection', 'content-length'):
+                self.send_header(name, value)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        body = iter(result.body)
+        try:
+            for part in body:
+                data = part.encode('utf-8') if isinstance(part, str) else part
+                if data:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client left: closing the generator lets the handler stop generating
+            print("🔌 SSE client disconnected, closing response stream")
+            self.close_connection = True
+        finally:
+            close = getattr(body, 'close', None)
+            if close:
+                close()
+
+
+class StreamingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def serve(lambda_handler, host='0.0.0.0', port=DEFAULT_PORT, readiness_path=READINESS_PATH):
+    """
+    Binds a threaded HTTP server for `lambda_handler` (port 0 picks a free
+    port; see `server_address`). Call `serve_forever()` on the result, or use
+    `start_background` for tests and benchmarks.
+    """
+    handler_class = type('LambdaStreamingRequestHandler', (_StreamingRequestHandler,), {
+        'lambda_handler': staticmethod(lambda_handler),
+        'readiness_path': readiness_path,
+    })
+    return StreamingServer((host, port), handler_class)
+
+
+def start_background(lambda_handler, host='127.0.0.1', port=0):
+    """Runs `serve` on a daemon thread. Returns the server; `shutdown()` stops it."""
+    server = serve(lambda_handler, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True, name='sse-server').start()
+    return server
+
+
+def run(lambda_handler):
+    """Entry point: serves on `PORT` (set by the Lambda Web Adapter) until killed."""
+    port = int(os.environ.get('PORT', DEFAULT_PORT))
+    readiness_path = os.environ.get('AWS_LWA_READINESS_CHECK_PATH', READINESS_PATH)
+    server = serve(lambda_handler, port=port, readiness_path=readiness_path)
+    print(f"🚀 SSE server listening on port {port}")
+    server.serve_forever()
@@ -0,0 +1,193 @@
+"""
+Streaming helpers for relaying Bedrock Agent output to clients.
+
+Bedrock returns the answer as a series of arbitrarily sized chunks that do not
+respect sentence boundaries. Sending each chunk (or each regex split of it) as
+its own WebSocket frame produces fragmented text and one API Gateway management
+call per fragment. `SentenceSegmenter` keeps the partial sentence across chunks
+and only releases text once a size or time budget is reached.
+"""
+
+import re
+import time
+
+# Sentence end: terminal punctuation (optionally followed by closing quotes or
+# brackets) and whitespace, or a line break. Punctuation at the very end of the
+# buffer is not a boundary yet because the next chunk may continue it ("3." -> "3.5").
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+
+# Flush budget, tuned with benchmarks/segmenter_bench.py. Frames per answer are bounded
+# below by its sentence count, so a longer minimum (a few sentences per frame) matters
+# for large chunks and the time budget for token-sized ones; 250 ms keeps the mean wait
+# of a character under 200 ms
+DEFAULT_MIN_CHARS = 120
+DEFAULT_MAX_DELAY_MS = 250
+DEFAULT_MAX_CHARS = 400
+
+
+class SentenceSegmenter:
+    """
+    Re-segments a stream of text chunks into sentence-aligned parts.
+
+    `feed()` buffers incoming text and returns the parts that are ready to be
+    sent. A part is released when:
+      - the buffered text up to the last sentence boundary is at least
+        `min_chars` long, or
+      - the oldest buffered text has waited `max_delay_ms` (released up to the
+        last sentence boundary, or the last word boundary if there is none), or
+      - the buffer grows past `max_chars` without a sentence boundary.
+
+    `flush()` returns whatever is left at the end of the stream. Concatenating
+    every returned part always reproduces the input exactly.
+    """
+
+    def __init__(self, min_chars=DEFAULT_MIN_CHARS, max_delay_ms=DEFAULT_MAX_DELAY_MS,
+                 max_chars=DEFAULT_MAX_CHARS, clock=time.monotonic):
+        self.min_chars = min_chars
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_chars = max(max_chars, min_chars)
+        self._clock = clock
+        self._buffer = ""
+        self._pending_since = None
+        self._scanned = 0
+        self._boundary = 0
+
+    @property
+    def pending(self):
+        """Text received but not yet released."""
+        return self._buffer
+
+    def feed(self, text):
+        """Add a chunk of text and return the list of parts ready to send."""
+        if not text:
+            return self.poll()
+
+        if not self._buffer:
+            self._pending_since = self._clock()
+        self._buffer += text
+        return self._release()
+
+    def poll(self):
+        """Release buffered text whose time budget has expired."""
+        if not self._buffer:
+            return []
+        return self._release()
+
+    def flush(self):
+        """Release everything that is still buffered."""
+        if not self._buffer:
+            return []
+        part = self._buffer
+        self._reset("")
+        return [part]
+
+    def _release(self):
+        parts = []
+
+        # Oversized buffer without a sentence end: cut at word boundaries.
+        while len(self._buffer) > self.max_chars and self._last_sentence_end() == 0:
+            cut = self._last_word_end(self.max_chars) or self.max_chars
+            parts.append(self._take(cut))
+
+        sentence_end = self._last_sentence_end()
+        if sentence_end >= self.min_chars:
+            parts.append(self._take(sentence_end))
+        elif self._expired():
+            cut = sentence_end or self._last_word_end(len(self._buffer))
+            if cut:
+                parts.append(self._take(cut))
+
+        return parts
+
+    def _take(self, end):
+        part, rest = self._buffer[:end], self._buffer[end:]
+        self._scanned = max(0, self._scanned - end)
+        self._boundary = max(0, self._boundary - end)
+        self._reset(rest)
+        return part
+
+    def _reset(self, rest):
+        self._buffer = rest
+        self._pending_since = self._clock() if rest else None
+
+    def _expired(self):
+        return (self._pending_since is not None
+                and self._clock() - self._pending_since >= self.max_delay)
+
+    def _last_sentence_end(self):
+        # Only newly appended text can hold a new boundary; back up a few characters
+        # so punctuation and whitespace split across chunks still match.
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer, max(0, self._scanned - 8)):
+            self._boundary = max(self._boundary, match.end())
+        self._scanned = len(self._buffer)
+        return self._boundary
+
+    def _last_word_end(self, limit):
+        idx = self._buffer.rfind(" ", 0, limit)
+        return idx + 1 if idx > 0 else 0
+
+
+class DeliveredText:
+    """
+    Text already sent to the client, kept across retries of one request.
+
+    After `begin_attempt()`, `accept(part)` compares the new attempt's output
+    with what the client already shows. Matching text is suppressed; once the
+    attempt runs past the delivered text only the new suffix is returned. If the
+    attempt diverges (or `end_attempt()` finds it ended early), reset=True is
+    returned with the attempt's whole output so far, which the caller sends
+    after a `reset` frame.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._prior = ''
+        self._pos = 0
+        self._replaying = False
+        self.suppressed_chars = 0
+
+    @property
+    def text(self):
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def begin_attempt(self):
+        self._prior = self.text
+        self._pos = 0
+        self._replaying = bool(self._prior)
+
+    def end_attempt(self):
+        """
+        Called when the attempt finished. If it stopped short of the delivered
+        text, returns (True, output) so the client can be reset to it.
+        """
+        if self._replaying and self._pos < len(self._prior):
+            text = self._prior[:self._pos]
+            self._parts = [text]
+            self._replaying = False
+            return True, text
+        self._replaying = False
+        return False, ''
+
+    def accept(self, part):
+        """Returns (reset, text_to_send) for one part of the current attempt."""
+        if not self._replaying:
+            self._parts.append(part)
+            return False, part
+
+        expected = self._prior[self._pos:self._pos + len(part)]
+        if part.startswith(expected):
+            self._pos += len(expected)
+            self.suppressed_chars += len(expected)
+            rest = part[len(expected):]
+            if self._pos >= len(self._prior):
+                self._replaying = False
+                self._parts.append(rest)
+            return False, rest
+
+        # Diverged: the client has to drop its text and take this attempt's output
+        text = self._prior[:self._pos] + part
+        self._parts = [text]
+        self._replaying = False
+        return True, text
@@ -0,0 +1,163 @@
+"""
+Answer-cache warm-up for the recommended quick-action queries.
+
+After an ingestion job the answer cache is invalidated, so the first user who
+clicks a quick action pays for a full agent round trip. `warm_answer_cache`
+runs every role's quick-action queries through the agent ahead of time, on a
+small thread pool, and stores the answers. Request starts are spaced by an
+`AdaptivePacer` that backs off when Bedrock throttles and recovers gradually,
+so the warm-up does not starve live chat traffic of agent quota.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from navigator.answer_cache import cache_key
+from navigator.citations import CitationIndex, kb_lookup_references
+from navigator.recommendations import quick_action_queries
+from navigator.response import ResponseAccumulator
+from navigator.roles import role_session_state
+
+DEFAULT_WORKERS = 3
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_MAX_INTERVAL = 30.0
+DEFAULT_MAX_ATTEMPTS = 4
+
+# Error codes Bedrock uses for rate limiting (the event stream reports them in lower camel case)
+THROTTLE_CODES = {'throttlingexception', 'toomanyrequestsexception', 'servicequotaexceededexception'}
+
+
+def is_throttle_error(exc):
+    code = getattr(exc, 'response', {}).get('Error', {}).get('Code', '') or type(exc).__name__
+    return code.lower() in THROTTLE_CODES
+
+
+def agent_answer(bedrock_agent, agent_id, agent_alias_id, query, user_role):
+    """
+    Runs one query through the agent in a throwaway session, with the same role
+    context as live chat. Returns (responsetext, citation_index).
+    """
+    response = bedrock_agent.invoke_agent(
+        agentId=agent_id,
+        agentAliasId=agent_alias_id,
+        sessionId=f"warmup-{uuid.uuid4().hex}",
+        inputText=query,
+        enableTrace=True,
+        sessionState=role_session_state(user_role)
+    )
+
+    answer = ResponseAccumulator()
+    citation_index = CitationIndex()
+    for event in response['completion']:
+        chunk = event.get('chunk')
+        if chunk:
+            if 'bytes' in chunk:
+                answer.feed(chunk['bytes'])
+            for citation in chunk.get('attribution', {}).get('citations', []):
+                citation_index.add_attribution(citation)
+        retrieved_refs = kb_lookup_references(event)
+        if retrieved_refs:
+            citation_index.add_trace_references(retrieved_refs)
+    answer.finish()
+    return answer.text, citation_index
+
+
+class AdaptivePacer:
+    """
+    Spaces request starts across worker threads.
+
+    Every call to `wait()` reserves the next start slot `interval` seconds after
+    the previous one. A throttle doubles the interval (up to `max_interval`);
+    each success shrinks it by 10% back towards `min_interval`.
+    """
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.throttles = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            self._sleep(start - now)
+
+    def on_success(self):
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * 0.9)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            self.interval = min(self.max_interval, max(self.interval * 2, self.min_interval, 0.25))
+            # Push back slots already handed out so the whole pool slows down at once
+            self._next_start = max(self._next_start, self._clock() + self.interval)
+
+
+def warm_answer_cache(answer_cache, generate, pairs=None, max_workers=DEFAULT_WORKERS,
+                      min_interval=DEFAULT_MIN_INTERVAL, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                      time_budget=None, clock=time.monotonic):
+    """
+    Generates and stores answers for `(role, query)` pairs (default: every
+    quick-action query of every role). `generate(query, role)` must return
+    (responsetext, citation_index). Queries already in the cache are skipped, so
+    a warm-up cut short by `time_budget` (seconds) can simply be run again.
+
+    Returns a report dict: counts per outcome, per role, throttles and duration.
+    """
+    started = clock()
+    deadline = started + time_budget if time_budget is not None else None
+    pacer = AdaptivePacer(min_interval=min_interval)
+
+    # The same query can appear under several quick actions of one role
+    unique = {}
+    for role, query in (pairs if pairs is not None else quick_action_queries()):
+        unique.setdefault(cache_key(query, role), (role, query))
+
+    def out_of_time():
+        return deadline is not None and clock() >= deadline
+
+    def warm(role, query):
+        if answer_cache.get(query, role):
+            return role, 'already_cached'
+        for attempt in range(max_attempts):
+            pacer.wait()
+            if out_of_time():
+                return role, 'skipped'
+            try:
+                responsetext, citation_index = generate(query, role)
+            except Exception as e:
+                if is_throttle_error(e) and attempt < max_attempts - 1:
+                    pacer.on_throttle()
+                    print(f"[warmup] Throttled on '{query[:40]}' ({role}), interval now {pacer.interval:.2f}s")
+                    continue
+                print(f"[warmup] Failed '{query[:40]}' ({role}): {str(e)}")
+                return role, 'failed'
+            pacer.on_success()
+            stored = answer_cache.put(query, role, responsetext, citation_index)
+            return role, 'warmed' if stored else 'uncacheable'
+        return role, 'failed'
+
+    outcomes = ('warmed', 'already_cached', 'uncacheable', 'failed', 'skipped')
+    report = {outcome: 0 for outcome in outcomes}
+    by_role = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for role, outcome in pool.map(lambda pair: warm(*pair), unique.values()):
+            report[outcome] += 1
+            by_role.setdefault(role, {o: 0 for o in outcomes})[outcome] += 1
+
+    report['queries'] = len(unique)
+    report['throttles'] = pacer.throttles
+    report['duration_seconds'] = round(clock() - started, 2)
+    report['by_role'] = by_role
+    return report
@@ -0,0 +1,168 @@
+"""
+Pipelined WebSocket sender for API Gateway management API frames.
+
+`post_to_connection` is a blocking HTTPS call. Making it inline for every part
+stalls reading the Bedrock event stream, and once a client has disconnected
+every further call fails with `GoneException` while the generation carries on.
+`WebSocketSender` moves the sends onto a small worker pool behind bounded
+queues so they overlap with reading the stream, and records which connections
+have gone away so the caller can stop generating.
+"""
+
+import json
+import queue
+import threading
+import time
+
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_WORKERS = 2
+# API Gateway WebSocket frames are limited to 128 KB; stay well below it when merging
+MAX_COALESCED_CHARS = 32 * 1024
+
+_STOP = object()
+
+
+def is_gone_error(exc):
+    """True when a botocore error means the WebSocket connection no longer exists."""
+    code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+    return code == "GoneException" or type(exc).__name__ == "GoneException"
+
+
+class WebSocketSender:
+    """
+    Sends JSON frames to WebSocket connections from background worker threads.
+
+    Frames for one connection are always handled by the same worker, so they
+    are delivered in the order `send()` was called. Each worker has a bounded
+    queue: when the client is slower than Bedrock, `send()` blocks (backpressure)
+    and the worker merges consecutive queued `chunk` frames into a single call.
+
+    A `GoneException` marks the connection as gone; queued frames for it are
+    dropped and `send()` returns False from then on.
+    """
+
+    def __init__(self, client, max_queue=DEFAULT_MAX_QUEUE, workers=DEFAULT_WORKERS,
+                 coalesce_chunks=True):
+        self._client = client
+        self._coalesce = coalesce_chunks
+        self._queues = [queue.Queue(maxsize=max_queue) for _ in range(max(1, workers))]
+        self._gone = set()
+        self._lock = threading.Lock()
+        self._latencies_ms = []
+        self._frames = 0
+        self._errors = 0
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), daemon=True, name=f"ws-sender-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ── Producer side ─────────────────────────────────────────────────────
+    def send(self, connection_id, frame):
+        """Queue a frame; blocks while the connection's queue is full."""
+        if self._closed or self.is_gone(connection_id):
+            return False
+        with self._lock:
+            self._frames += 1
+        self._queue_for(connection_id).put((connection_id, frame))
+        return True
+
+    def is_gone(self, connection_id):
+        return connection_id in self._gone
+
+    def mark_gone(self, connection_id):
+        """Treat a connection as closed without waiting for a failed send."""
+        self._gone.add(connection_id)
+
+    def close(self, timeout=10):
+        """Send everything still queued, stop the workers and return `stats()`."""
+        if not self._closed:
+            self._closed = True
+            for q in self._queues:
+                q.put(_STOP)
+            deadline = time.monotonic() + timeout
+            for thread in self._threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+        return self.stats()
+
+    def latencies_ms(self):
+        """Per-send latencies (milliseconds) in completion order."""
+        with self._lock:
+            return list(self._latencies_ms)
+
+    def stats(self):
+        """Frame, call and per-send latency counters (milliseconds)."""
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            frames, errors = self._frames, self._errors
+        return {
+            "frames": frames,
+            "sends": len(latencies),
+            "errors": errors,
+            "gone": len(self._gone),
+            "latency_ms_p50": _percentile(latencies, 50),
+            "latency_ms_p95": _percentile(latencies, 95),
+            "latency_ms_max": round(latencies[-1], 1) if latencies else 0.0,
+        }
+
+    # ── Worker side ───────────────────────────────────────────────────────
+    def _queue_for(self, connection_id):
+        return self._queues[hash(connection_id) % len(self._queues)]
+
+    def _run(self, q):
+        while True:
+            batch = [q.get()]
+            # Under backpressure take everything already waiting in one go
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            for connection_id, frame in self._merge([i for i in batch if i is not _STOP]):
+                self._post(connection_id, frame)
+            if stop:
+                return
+
+    def _merge(self, items):
+        if not self._coalesce:
+            return items
+        merged = []
+        for connection_id, frame in items:
+            if (merged and frame.get("type") == "chunk"
+                    and merged[-1][0] == connection_id
+                    and merged[-1][1].get("type") == "chunk"
+                    and len(merged[-1][1]["chunk"]) + len(frame["chunk"]) <= MAX_COALESCED_CHARS):
+                previous = merged[-1][1]
+                merged[-1] = (connection_id, {**previous, "chunk": previous["chunk"] + frame["chunk"]})
+            else:
+                merged.append((connection_id, frame))
+        return merged
+
+    def _post(self, connection_id, frame):
+        if self.is_gone(connection_id):
+            return
+        started = time.perf_counter()
+        try:
+            self._client.post_to_connection(ConnectionId=connection_id, Data=json.dumps(frame))
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            if is_gone_error(e):
+                self._gone.add(connection_id)
+                print(f"WebSocket connection gone: {connection_id}")
+            else:
+                print(f"WebSocket error: {str(e)}")
+            return
+        with self._lock:
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return round(sorted_values[idx], 1)
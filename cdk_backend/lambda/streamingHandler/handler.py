@@ -1,68 +1,114 @@
 import json
-import boto3
 import os
+import uuid
 from datetime import datetime
 
-# Initialize AWS clients
-bedrock_agent = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
-lambda_client = boto3.client('lambda')
+from navigator.analytics import AnalyticsPublisher, interaction_record
+from navigator.answer_cache import AnswerCache, is_quick_action
+from navigator.aws import lazy_client, lazy_table
+from navigator.citations import CitationFeed, CitationIndex, Presigner, kb_lookup_references
+from navigator.metrics import RequestTrace, model_usage
+from navigator.response import ResponseAccumulator
+from navigator.roles import metric_role, role_session_state
+from navigator.session_state import SessionRoleStore
+from navigator.sse import StreamRegistry, StreamingResponse, last_event_id, request_params
+from navigator.streaming import SentenceSegmenter
+
+# AWS clients (created on first use)
+bedrock_agent = lazy_client('bedrock-agent-runtime', region_name='us-west-2')
+lambda_client = lazy_client('lambda')
+s3 = lazy_client('s3')
+sqs = lazy_client('sqs')
 
 agent_id = os.environ["AGENT_ID"]
 agent_alias_id = os.environ["AGENT_ALIAS_ID"]
 LOG_CLASSIFIER_FN_NAME = os.environ['LOG_CLASSIFIER_FN_NAME']
 
-def get_role_specific_instructions(user_role):
-    """
-    Returns role-specific system instructions for the Bedrock Agent.
-    """
-    role_instructions = {
-        'instructor': """You are assisting a certified MHFA Instructor. Focus your responses on:
-- Teaching methodologies and best practices for conducting MHFA courses
-- Course preparation, lesson planning, and classroom management
-- Instructor certification requirements, renewals, and continuing education
-- Accessing instructor-specific resources, manuals, and training materials
-- Professional development and staying current with MHFA updates
-- Handling challenging classroom scenarios and participant questions
-
-Use professional, peer-to-peer language. Provide pedagogical insights and reference instructor resources.""",
-
-        'staff': """You are assisting organizational staff implementing MHFA programs. Focus your responses on:
-- Program implementation strategies and organizational rollout
-- Scheduling, coordinating, and managing MHFA training sessions
-- Tracking employee certifications and program metrics
-- Budget considerations and resource allocation
-- Measuring program effectiveness and ROI
-- Integration with existing workplace wellness initiatives
-- Case studies and organizational best practices
-
-Use administrative, coordination-focused language. Provide strategic guidance for program management.""",
-
-        'learner': """You are assisting a MHFA course participant or learner. Focus your responses on:
-- Basic MHFA concepts, principles, and the ALGEE action plan
-- Course registration, certification process, and requirements
-- Practical application of MHFA skills in daily life
-- Understanding mental health conditions and crisis situations
-- Where to find additional learning resources and support
-- Recertification process and maintaining skills
-- Self-care and personal wellness while helping others
-
-Use clear, educational, supportive language. Make concepts accessible and actionable."""
-    }
-
-    return role_instructions.get(user_role, role_instructions['learner'])
+# Interaction records go to the analytics queue (batched by logclassifier);
+# without ANALYTICS_QUEUE_URL each record is sent as an async logclassifier invoke
+ANALYTICS_QUEUE_URL = os.environ.get('ANALYTICS_QUEUE_URL')
+analytics = AnalyticsPublisher(ANALYTICS_QUEUE_URL, sqs_client=sqs, lambda_client=lambda_client,
+                               function_name=LOG_CLASSIFIER_FN_NAME)
+
+# Knowledge-base references are sent as `citations` events while the answer streams,
+# with download URLs presigned in the background (valid CITATION_URL_TTL_SECONDS)
+CITATION_URL_TTL_SECONDS = int(os.environ.get('CITATION_URL_TTL_SECONDS', '3600'))
+presigner = Presigner(s3, ttl_seconds=CITATION_URL_TTL_SECONDS)
+
+# Answer cache (disabled when ANSWER_CACHE_TABLE is not set)
+ANSWER_CACHE_TABLE = os.environ.get('ANSWER_CACHE_TABLE')
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '86400'))
+answer_cache = (
+    AnswerCache(lazy_table(ANSWER_CACHE_TABLE), ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
+    if ANSWER_CACHE_TABLE else None
+)
+
+# Which role context each agent session already has (in-process only when SESSION_TABLE is not set)
+SESSION_TABLE = os.environ.get('SESSION_TABLE')
+session_roles = SessionRoleStore(lazy_table(SESSION_TABLE) if SESSION_TABLE else None)
+
+# Answers longer than RESPONSE_SPILL_CHARS are spooled and uploaded to RESPONSE_SPILL_BUCKET;
+# logclassifier then gets an S3 reference instead of the full text (disabled when unset)
+RESPONSE_SPILL_BUCKET = os.environ.get('RESPONSE_SPILL_BUCKET')
+RESPONSE_SPILL_CHARS = int(os.environ.get('RESPONSE_SPILL_CHARS', '0')) if RESPONSE_SPILL_BUCKET else 0
+
+# Resumable streams: the last SSE_REPLAY_EVENTS events of each session's generation are
+# kept so a client reconnecting with Last-Event-ID gets the rest instead of a new answer.
+# A generation without a reader for SSE_RESUME_GRACE_SECONDS is abandoned; a finished one
+# stays resumable for SSE_RETAIN_SECONDS. Idle streams get a heartbeat comment.
+SSE_REPLAY_EVENTS = int(os.environ.get('SSE_REPLAY_EVENTS', '512'))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RESUME_GRACE_SECONDS = float(os.environ.get('SSE_RESUME_GRACE_SECONDS', '10'))
+SSE_RETAIN_SECONDS = float(os.environ.get('SSE_RETAIN_SECONDS', '60'))
+SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', '2000'))
+streams = StreamRegistry(max_events=SSE_REPLAY_EVENTS, grace_seconds=SSE_RESUME_GRACE_SECONDS,
+                         retain_seconds=SSE_RETAIN_SECONDS)
+
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'X-Session-Id',
+    'X-Accel-Buffering': 'no',
+}
+
+def sse_response(stream, after_id=0):
+    """Streams `stream` from after `after_id`; X-Session-Id lets the client resume it."""
+    return StreamingResponse(
+        status_code=200,
+        headers={**SSE_HEADERS, 'X-Session-Id': stream.session_id},
+        body=stream.subscribe(after_id, heartbeat_seconds=SSE_HEARTBEAT_SECONDS, retry_ms=SSE_RETRY_MS),
+    )
 
 def lambda_handler(event, context):
     """
-    Lambda handler that returns a generator for streaming responses.
-    This works with Lambda Function URLs with InvokeMode: RESPONSE_STREAM
+    Returns a StreamingResponse whose body is a generator of SSE events.
+    It is written out by `navigator.sse` (server.py), locally or behind the
+    Lambda Web Adapter on a Function URL with InvokeMode: RESPONSE_STREAM.
+    A request with Last-Event-ID resumes the session's current stream.
     """
+    request_trace = RequestTrace(Transport='sse', UserRole='guest', CacheHit=False)
     try:
-        # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        # Parse request body (or query string)
+        body = request_params(event)
         query = body.get("querytext", "").strip()
         session_id = body.get("session_id", context.aws_request_id)
         user_role = body.get("user_role", "guest")
 
+        resume_after = last_event_id(event)
+        if resume_after is not None:
+            stream = streams.get(session_id)
+            if stream:
+                print(f"🔁 Resuming SSE stream for session {session_id} after event {resume_after}")
+                return sse_response(stream, resume_after)
+            if not query:
+                # Nothing to resume; 204 also tells an EventSource to stop reconnecting
+                print(f"🔁 No resumable SSE stream for session {session_id}")
+                return {'statusCode': 204, 'headers': {'Access-Control-Allow-Origin': '*'}, 'body': ''}
+        request_trace.set_dimension('UserRole', metric_role(user_role))
+        request_trace.properties.update(session_id=session_id, request_id=context.aws_request_id)
+
         print(f"🔵 Streaming Request - Session: {session_id}, Role: {user_role}, Query: {query}")
 
         if not query:
@@ -75,43 +121,45 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Query text is required'})
             }
 
-        # Get role-specific instructions
-        role_instructions = get_role_specific_instructions(user_role)
-
-        # Invoke Bedrock Agent with streaming
-        response = bedrock_agent.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=session_id,
-            inputText=query,
-            sessionState={
-                'sessionAttributes': {
-                    'user_role': user_role,
-                    'role_instructions': role_instructions
-                },
-                'promptSessionAttributes': {
-                    'role_context': role_instructions
-                }
-            }
-        )
-
-        # For streaming response, return response with stream
-        return awslambda.stream_response(
-            statusCode=200,
-            headers={
-                'Content-Type': 'text/event-stream',
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'Access-Control-Allow-Origin': '*',
-                'X-Accel-Buffering': 'no',
-            },
-            body=stream_bedrock_response(response, session_id, query, user_role)
-        )
+        # A cached answer skips the agent session, so only turns that cannot depend on
+        # the conversation are served from (and stored in) the cache
+        cache_turn = bool(answer_cache) and (is_quick_action(query) or session_roles.is_new_session(session_id))
+        cached = answer_cache.get(query, user_role) if cache_turn else None
+        request_trace.set_dimension('CacheHit', bool(cached))
+        if cached:
+            print(f"⚡ Answer cache hit ({cached.source}) for role {user_role}")
+            body = stream_cached_answer(cached, session_id, query, user_role, request_trace)
+            session_roles.remember_replay(session_id)
+        else:
+            # Full role instructions only on the session's first turn or after a role change
+            full_context = session_roles.needs_full_context(session_id, user_role)
+            session_state = role_session_state(user_role, full_context)
+            request_trace.properties['role_context'] = 'full' if full_context else 'key'
+            request_trace.count('SessionStateBytes', len(json.dumps(session_state)))
+
+            # Invoke Bedrock Agent with streaming
+            with request_trace.span('BedrockInvokeMs'):
+                response = bedrock_agent.invoke_agent(
+                    agentId=agent_id,
+                    agentAliasId=agent_alias_id,
+                    sessionId=session_id,
+                    inputText=query,
+                    enableTrace=True,  # Knowledge base citations are only reported in the trace
+                    sessionState=session_state
+                )
+            session_roles.remember(session_id, user_role)
+            body = stream_bedrock_response(response, session_id, query, user_role, request_trace,
+                                           cache_answer=cache_turn)
+
+        # Generated on the session's stream and written out as it arrives (chunked transfer encoding)
+        return sse_response(streams.start(session_id, body))
 
     except Exception as e:
         print(f"❌ Error in streaming handler: {str(e)}")
         import traceback
         traceback.print_exc()
+        request_trace.count('Errors')
+        request_trace.emit()
 
         return {
             'statusCode': 500,
@@ -122,77 +170,140 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def stream_bedrock_response(response, session_id, query, user_role):
+def stream_bedrock_response(response, session_id, query, user_role, request_trace, cache_answer=False):
     """
-    Generator function that yields SSE-formatted chunks.
+    Generator of `chunk` / `citations` / `complete` frames for one answer; the
+    session's SessionStream numbers and buffers them as SSE events. With
+    `cache_answer` the finished answer is stored in the answer cache.
     """
-    full_response = ""
-    citations = []
+    answer = ResponseAccumulator(spill_chars=RESPONSE_SPILL_CHARS)
+    citation_index = CitationIndex()
+    citation_feed = CitationFeed(presigner)
 
     try:
         print(f"🔄 Starting to stream response")
+        completion = response['completion']
 
-        for event in response['completion']:
+        for event in completion:
             if 'chunk' in event:
                 chunk = event['chunk']
                 if 'bytes' in chunk:
-                    chunk_text = chunk['bytes'].decode('utf-8')
-                    full_response += chunk_text
+                    # Decoded incrementally: a chunk may end inside a multi-byte character
+                    chunk_text = answer.feed(chunk['bytes'])
+                    request_trace.mark('FirstChunkMs')
+                    request_trace.mark('LastChunkMs', first_only=False)
+                    request_trace.count('Chunks')
                     print(f"📨 Streaming chunk ({len(chunk_text)} chars)")
 
-                    # Yield SSE formatted chunk
-                    chunk_data = json.dumps({'type': 'chunk', 'chunk': chunk_text})
-                    yield f"data: {chunk_data}\n\n"
+                    if chunk_text:
+                        yield {'type': 'chunk', 'chunk': chunk_text}
+
+                for citation in chunk.get('attribution', {}).get('citations', []):
+                    citation_feed.publish(citation_index.add_attribution(citation))
+
+            usage = model_usage(event)
+            if usage:
+                request_trace.count('InputTokens', usage.get('inputTokens', 0))
+                request_trace.count('OutputTokens', usage.get('outputTokens', 0))
 
             # Extract citations
-            if 'trace' in event:
-                trace = event['trace'].get('trace', {})
-                if 'orchestrationTrace' in trace:
-                    orch_trace = trace['orchestrationTrace']
-                    if 'observation' in orch_trace:
-                        observation = orch_trace['observation']
-                        if 'knowledgeBaseLookupOutput' in observation:
-                            kb_output = observation['knowledgeBaseLookupOutput']
-                            retrieved_refs = kb_output.get('retrievedReferences', [])
-                            for ref in retrieved_refs:
-                                location = ref.get('location', {})
-                                s3_location = location.get('s3Location', {})
-                                uri = s3_location.get('uri', '')
-                                if uri and uri not in [c.get('uri') for c in citations]:
-                                    citations.append({
-                                        'uri': uri,
-                                        'content': ref.get('content', {}).get('text', '')[:200]
-                                    })
-
-        print(f"✅ Streaming complete, {len(citations)} citations found")
+            citation_feed.publish(citation_index.add_trace_references(kb_lookup_references(event)))
+            yield from citation_feed.ready()
+
+        tail = answer.finish()
+        if tail:
+            yield {'type': 'chunk', 'chunk': tail}
+        # References still being presigned go out before the `complete` event
+        yield from citation_feed.flush()
+
+        print(f"✅ Streaming complete, {answer.chars} chars, {len(citation_index)} citations found")
+
+        # Materialize the answer once; a spilled answer was streamed and is only kept in S3
+        full_response = answer.text
+        response_s3_uri = spill_response(answer, session_id) if answer.spilled else None
 
         # Send final message with citations
-        final_data = json.dumps({
+        yield {
             'type': 'complete',
             'responsetext': full_response,
-            'citations': citations
-        })
-        yield f"data: {final_data}\n\n"
-
-        # Log the interaction asynchronously
-        try:
-            lambda_client.invoke(
-                FunctionName=LOG_CLASSIFIER_FN_NAME,
-                InvocationType='Event',
-                Payload=json.dumps({
-                    'querytext': query,
-                    'responsetext': full_response,
-                    'session_id': session_id,
-                    'user_role': user_role,
-                    'timestamp': datetime.now().isoformat()
-                })
-            )
-        except Exception as log_error:
-            print(f"⚠️ Logging error: {str(log_error)}")
+            'citations': citation_index.as_sources()
+        }
+        request_trace.mark('CompleteMs')
+
+        if cache_answer and full_response is not None:
+            answer_cache.put(query, user_role, full_response, citation_index)
+            print(f"📊 Answer cache stats: {json.dumps(answer_cache.stats())}")
+
+        with request_trace.span('LogDispatchMs'):
+            if full_response is not None:
+                log_interaction(session_id, query, full_response, user_role)
+            else:
+                log_interaction(session_id, query, answer.preview, user_role,
+                                response_s3_uri=response_s3_uri, response_chars=answer.chars)
+        request_trace.count('ResponseChars', answer.chars)
 
+    except GeneratorExit:
+        # No client reconnected within the grace period, or a new question replaced this one
+        print("🛑 SSE stream closed, abandoning generation")
+        request_trace.count('AbandonedGenerations')
+        close = getattr(completion, 'close', None)
+        if close:
+            close()
+        raise
     except Exception as e:
         print(f"❌ Stream error: {str(e)}")
         import traceback
         traceback.print_exc()
-        error_data = json.dumps({'type': 'error', 'message': str(e)})
-        yield f"data: {error_data}\n\n"
+        request_trace.count('Errors')
+        yield {'type': 'error', 'message': str(e)}
+    finally:
+        request_trace.emit()
+
+def stream_cached_answer(cached, session_id, query, user_role, request_trace):
+    """
+    Generator that replays a cached answer with the same chunk/complete frames.
+    """
+    try:
+        request_trace.mark('FirstChunkMs')
+        segmenter = SentenceSegmenter()
+        for part in segmenter.feed(cached.responsetext) + segmenter.flush():
+            yield {'type': 'chunk', 'chunk': part}
+
+        yield {
+            'type': 'complete',
+            'responsetext': cached.responsetext,
+            'citations': cached.citations.as_sources()
+        }
+        request_trace.mark('CompleteMs')
+
+        print(f"📊 Answer cache stats: {json.dumps(answer_cache.stats())}")
+        with request_trace.span('LogDispatchMs'):
+            log_interaction(session_id, query, cached.responsetext, user_role)
+        request_trace.count('ResponseChars', len(cached.responsetext))
+    finally:
+        request_trace.emit()
+
+def spill_response(answer, session_id):
+    """Uploads an answer that outgrew RESPONSE_SPILL_CHARS. Returns its S3 URI, or None."""
+    key = f"responses/{datetime.utcnow():%Y/%m/%d}/{session_id}-{uuid.uuid4().hex[:8]}.txt"
+    try:
+        return answer.upload(s3, RESPONSE_SPILL_BUCKET, key)
+    except Exception as e:
+        print(f"⚠️ Error spilling response to S3: {str(e)}")
+        return None
+
+def log_interaction(session_id, query, responsetext, user_role, response_s3_uri=None, response_chars=None):
+    """
+    Logs the interaction through the analytics pipeline (logclassifier).
+    For a spilled answer, responsetext is a preview and the full text is at response_s3_uri.
+    """
+    record = interaction_record(
+        session_id, query, responsetext,
+        user_role=user_role,
+        response_s3_uri=response_s3_uri,
+        response_chars=response_chars,
+    )
+    try:
+        analytics.publish(record)
+    except Exception as log_error:
+        print(f"⚠️ Logging error: {str(log_error)}")
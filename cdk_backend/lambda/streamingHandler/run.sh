@@ -0,0 +1,6 @@
+#!/bin/sh
+# Lambda handler when deployed with the Lambda Web Adapter layer
+# (AWS_LAMBDA_EXEC_WRAPPER=/opt/bootstrap, AWS_LWA_INVOKE_MODE=response_stream,
+# AWS_LWA_READINESS_CHECK_PATH=/health); the adapter proxies Function URL requests to PORT.
+export PYTHONPATH="/opt/python:${PYTHONPATH}"
+exec python3 server.py
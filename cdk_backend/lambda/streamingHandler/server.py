@@ -0,0 +1,15 @@
+"""
+Runs streamingHandler as an SSE server (see navigator.sse).
+
+In Lambda this is started by run.sh behind the Lambda Web Adapter; locally:
+
+    PYTHONPATH=../shared/python AGENT_ID=... AGENT_ALIAS_ID=... LOG_CLASSIFIER_FN_NAME=... python server.py
+    curl -N -X POST localhost:8080/ -d '{"querytext": "What is ALGEE?", "user_role": "learner"}'
+"""
+
+from navigator.sse import run
+
+from handler import lambda_handler
+
+if __name__ == '__main__':
+    run(lambda_handler)
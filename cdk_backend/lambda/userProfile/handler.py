@@ -6,13 +6,15 @@ based on user roles (Instructor, Staff, Learner).
 """
 
 import json
-import boto3
 import os
 from datetime import datetime
 from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-cognito = boto3.client('cognito-idp')
+from navigator.aws import lazy_client, lazy_resource
+from navigator.recommendations import RECOMMENDATIONS
+
+dynamodb = lazy_resource('dynamodb')
+cognito = lazy_client('cognito-idp')
 
 USER_PROFILE_TABLE = os.environ.get('USER_PROFILE_TABLE')
 USER_POOL_ID = os.environ.get('USER_POOL_ID')
@@ -24,178 +26,6 @@ CORS_HEADERS = {
     'Access-Control-Max-Age': '600',
 }
 
-# Role-specific recommendations
-RECOMMENDATIONS = {
-    'instructor': {
-        'quick_actions': [
-            {
-                'title': 'Course Planning',
-                'description': 'Access course materials and lesson plans',
-                'icon': 'school',
-                'queries': [
-                    'Show me the latest MHFA course curriculum',
-                    'What are best practices for teaching mental health first aid?',
-                    'How do I prepare for an upcoming MHFA course?'
-                ]
-            },
-            {
-                'title': 'Student Management',
-                'description': 'Track student progress and engagement',
-                'icon': 'people',
-                'queries': [
-                    'How do I track student attendance?',
-                    'What are the assessment criteria for MHFA certification?',
-                    'How can I support struggling learners?'
-                ]
-            },
-            {
-                'title': 'Training Resources',
-                'description': 'Access instructor guides and materials',
-                'icon': 'library_books',
-                'queries': [
-                    'Show me instructor training resources',
-                    'What materials do I need for blended courses?',
-                    'Where can I find updated training videos?'
-                ]
-            },
-            {
-                'title': 'Certification & Credits',
-                'description': 'Manage certifications and continuing education',
-                'icon': 'verified',
-                'queries': [
-                    'How do I maintain my instructor certification?',
-                    'What are the requirements for recertification?',
-                    'How do I earn CEUs for teaching MHFA?'
-                ]
-            }
-        ],
-        'suggested_topics': [
-            'Blended Course Delivery',
-            'Virtual Training Best Practices',
-            'Student Assessment Methods',
-            'Crisis Intervention Techniques',
-            'Cultural Competency in Training'
-        ],
-        'recent_updates': [
-            'New curriculum updates for Mental Health First Aid USA',
-            'Updated assessment rubrics available',
-            'Virtual training platform enhancements'
-        ]
-    },
-    'staff': {
-        'quick_actions': [
-            {
-                'title': 'Operations Dashboard',
-                'description': 'View training operations and metrics',
-                'icon': 'dashboard',
-                'queries': [
-                    'Show me current course enrollment numbers',
-                    'What are the training completion rates?',
-                    'How many instructors are active this month?'
-                ]
-            },
-            {
-                'title': 'Instructor Support',
-                'description': 'Manage instructor requests and issues',
-                'icon': 'support_agent',
-                'queries': [
-                    'How do I onboard new instructors?',
-                    'What support resources are available for instructors?',
-                    'How do I handle instructor certification renewals?'
-                ]
-            },
-            {
-                'title': 'Course Management',
-                'description': 'Schedule and coordinate training courses',
-                'icon': 'event',
-                'queries': [
-                    'How do I schedule a new MHFA course?',
-                    'What are the requirements for blended courses?',
-                    'How do I update course information?'
-                ]
-            },
-            {
-                'title': 'Reporting & Analytics',
-                'description': 'Access program metrics and insights',
-                'icon': 'analytics',
-                'queries': [
-                    'Show me monthly training statistics',
-                    'What are the most popular MHFA courses?',
-                    'Generate a report on instructor performance'
-                ]
-            }
-        ],
-        'suggested_topics': [
-            'Learning Management System',
-            'Course Scheduling Procedures',
-            'Instructor Credentialing',
-            'Program Quality Assurance',
-            'Stakeholder Communication'
-        ],
-        'recent_updates': [
-            'New LMS features released',
-            'Updated staff training protocols',
-            'Improved reporting dashboard'
-        ]
-    },
-    'learner': {
-        'quick_actions': [
-            {
-                'title': 'My Courses',
-                'description': 'View enrolled courses and progress',
-                'icon': 'school',
-                'queries': [
-                    'Show me my enrolled MHFA courses',
-                    'What is my course completion status?',
-                    'How do I access my course materials?'
-                ]
-            },
-            {
-                'title': 'Find Training',
-                'description': 'Search for available MHFA courses',
-                'icon': 'search',
-                'queries': [
-                    'What MHFA courses are available near me?',
-                    'How do I enroll in a Mental Health First Aid course?',
-                    'What are the different types of MHFA training?'
-                ]
-            },
-            {
-                'title': 'Certification',
-                'description': 'Track certification and renewal',
-                'icon': 'verified',
-                'queries': [
-                    'How do I get my MHFA certification?',
-                    'When does my certification expire?',
-                    'How do I renew my Mental Health First Aid certification?'
-                ]
-            },
-            {
-                'title': 'Resources & Support',
-                'description': 'Access learning materials and help',
-                'icon': 'help',
-                'queries': [
-                    'Where can I find additional MHFA resources?',
-                    'How do I contact my instructor?',
-                    'What support is available for learners?'
-                ]
-            }
-        ],
-        'suggested_topics': [
-            'Course Enrollment Process',
-            'Blended Learning Format',
-            'Certification Requirements',
-            'Mental Health Resources',
-            'Community Support Groups'
-        ],
-        'recent_updates': [
-            'New online course modules available',
-            'Updated certification process',
-            'Mobile app for course access launched'
-        ]
-    }
-}
-
 def lambda_handler(event, context):
     """Main Lambda handler"""
     print(f"[USER_PROFILE] Event: {json.dumps(event)}")
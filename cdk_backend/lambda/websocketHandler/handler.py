@@ -1,12 +1,95 @@
 import json
-import boto3
 import traceback
 import os 
 
+from navigator.admission import AdmissionController, ConcurrencyGate, TokenBucketLimiter
+from navigator.aws import lazy_client, lazy_table
+from navigator.connections import ConnectionRegistry
+from navigator.metrics import RequestTrace
+from navigator.scheduler import (
+    DEFAULT_PRIORITY_ROLES, PRIORITY_LANE, STANDARD_LANE, GenerationScheduler, lane_for
+)
+from navigator.session_state import is_escalated
+
 # Initialize AWS clients
-lambda_client = boto3.client('lambda')
+lambda_client = lazy_client('lambda')
+sqs = lazy_client('sqs')
 response_function_arn = os.environ['RESPONSE_FUNCTION_ARN']
 
+# Scheduler mode: generations go to FIFO queues (one per lane) drained by a bounded
+# worker pool; without queue URLs chatResponseHandler is invoked asynchronously
+GENERATION_QUEUE_URL = os.environ.get('GENERATION_QUEUE_URL')
+PRIORITY_QUEUE_URL = os.environ.get('PRIORITY_QUEUE_URL')
+PRIORITY_ROLES = frozenset(
+    r.strip().lower() for r in os.environ.get('PRIORITY_ROLES', ','.join(DEFAULT_PRIORITY_ROLES)).split(',')
+    if r.strip()
+)
+scheduler = GenerationScheduler(
+    {STANDARD_LANE: GENERATION_QUEUE_URL, PRIORITY_LANE: PRIORITY_QUEUE_URL},
+    sqs_client=sqs, lambda_client=lambda_client, function_name=response_function_arn,
+)
+
+# Escalated sessions (recorded by the notify-admin action group) get the priority lane
+SESSION_TABLE = os.environ.get('SESSION_TABLE')
+session_table = lazy_table(SESSION_TABLE) if SESSION_TABLE else None
+
+# Open connections, read by chatResponseHandler (registry disabled when unset)
+CONNECTIONS_TABLE = os.environ.get('CONNECTIONS_TABLE')
+connections = ConnectionRegistry(lazy_table(CONNECTIONS_TABLE)) if CONNECTIONS_TABLE else None
+
+# Admission control (disabled when ADMISSION_TABLE is not set): token buckets per
+# connection and per session, and a cap on generations in flight across containers
+ADMISSION_TABLE = os.environ.get('ADMISSION_TABLE')
+CONNECTION_RATE_PER_MINUTE = float(os.environ.get('CONNECTION_RATE_PER_MINUTE', '12'))
+CONNECTION_BURST = int(os.environ.get('CONNECTION_BURST', '4'))
+SESSION_RATE_PER_MINUTE = float(os.environ.get('SESSION_RATE_PER_MINUTE', '20'))
+SESSION_BURST = int(os.environ.get('SESSION_BURST', '6'))
+MAX_IN_FLIGHT_GENERATIONS = int(os.environ.get('MAX_IN_FLIGHT_GENERATIONS', '0'))
+BUSY_RETRY_AFTER_MS = int(os.environ.get('BUSY_RETRY_AFTER_MS', '5000'))
+# Lease of a queued request (scheduler mode), covering its wait in the session's queue;
+# the worker renews it to the normal length when the generation starts
+QUEUED_LEASE_SECONDS = int(os.environ.get('QUEUED_LEASE_SECONDS', '900'))
+
+admission = None
+if ADMISSION_TABLE:
+    admission_table = lazy_table(ADMISSION_TABLE)
+    admission = AdmissionController(
+        connection_limiter=TokenBucketLimiter(admission_table, CONNECTION_RATE_PER_MINUTE, CONNECTION_BURST),
+        session_limiter=TokenBucketLimiter(admission_table, SESSION_RATE_PER_MINUTE, SESSION_BURST),
+        gate=ConcurrencyGate(admission_table, MAX_IN_FLIGHT_GENERATIONS,
+                             retry_after=BUSY_RETRY_AFTER_MS / 1000) if MAX_IN_FLIGHT_GENERATIONS else None,
+    )
+
+def admit_message(connection_id, session_id, request_id):
+    """
+    Runs admission control for one message and publishes its outcome as
+    metrics. Returns the Admission, or None when admission control is off.
+    """
+    if not admission:
+        return None
+    request_trace = RequestTrace(Route='sendMessage', Outcome='admitted')
+    with request_trace.span('AdmissionMs'):
+        # A queued request may wait behind its session's earlier messages, so its lease
+        # lasts until the worker renews it
+        decision = admission.admit(request_id, connection_id=connection_id, session_id=session_id,
+                                   lease_seconds=QUEUED_LEASE_SECONDS if scheduler.enabled else None)
+    request_trace.set_dimension('Outcome', decision.reason)
+    request_trace.count('Admitted' if decision.admitted else 'Throttled')
+    if decision.in_flight is not None:
+        request_trace.record('InFlightGenerations', decision.in_flight, unit='Count')
+    request_trace.properties.update(connection_id=connection_id, session_id=session_id)
+    request_trace.emit()
+    return decision
+
+def choose_lane(session_id, user_role):
+    """Scheduler lane for a message; escalation lookups only happen when there is a priority queue."""
+    if not PRIORITY_QUEUE_URL:
+        return STANDARD_LANE
+    escalated = False
+    if session_table and session_id and lane_for(user_role, priority_roles=PRIORITY_ROLES) != PRIORITY_LANE:
+        escalated = is_escalated(session_table, session_id)
+    return lane_for(user_role, escalated=escalated, priority_roles=PRIORITY_ROLES)
+
 def lambda_handler(event, context):
     try:
         # 1. Extract WebSocket context
@@ -17,10 +100,14 @@ def lambda_handler(event, context):
         # 2. Route handling
         if route_key == '$connect':
             print(f"New connection: {connection_id}")
+            if connections:
+                connections.register(connection_id)
             return {'statusCode': 200}
             
         elif route_key == '$disconnect':
             print(f"Disconnected: {connection_id}")
+            if connections:
+                connections.remove(connection_id)
             return {'statusCode': 200}
 
         elif route_key == 'sendMessage':
@@ -31,28 +118,66 @@ def lambda_handler(event, context):
             location = body.get('location')
             session_id = body.get('session_id')
             user_role = body.get('user_role', 'guest')  # Extract user role for personalization
+            message_id = body.get('message_id')  # Client id for the message, used by cancelMessage
 
             if not query:
                 raise ValueError("Empty query received")
 
+            if connections:
+                connections.touch(connection_id, session_id=session_id, user_role=user_role)
+
+            # 4. Admission control: reject with a `busy` frame instead of starting a generation
+            request_id = getattr(context, 'aws_request_id', None) or connection_id
+            message_id = message_id or request_id
+            decision = admit_message(connection_id, session_id, request_id)
+            if decision and not decision.admitted:
+                print(f"🚦 Rejected message from {connection_id} ({decision.reason}), "
+                      f"retry after {decision.retry_after}s")
+                # The route response is delivered to the client as a frame
+                return {'statusCode': 200, 'body': json.dumps(decision.busy_frame())}
+
             payload_to_cf_evaluator = {
                 'querytext': query,
                 'connectionId': connection_id,
                 'session_id': session_id,
-                'user_role': user_role  # Pass role to evaluator
+                'user_role': user_role,  # Pass role to evaluator
+                'message_id': message_id
             }
 
             if location:
                 payload_to_cf_evaluator['location'] = location
+            if decision and decision.lease_id:
+                # chatResponseHandler frees the concurrency slot when it finishes
+                payload_to_cf_evaluator['admission_lease'] = decision.lease_id
 
-            # 5. Fire off the evaluator asynchronously
-            lambda_client.invoke(
-                FunctionName=response_function_arn,
-                InvocationType='Event',
-                Payload=json.dumps(payload_to_cf_evaluator)
-            )
+            # 5. Schedule the generation (queued per session, or invoked asynchronously)
+            try:
+                lane = choose_lane(session_id, user_role)
+                transport = scheduler.submit(
+                    payload_to_cf_evaluator,
+                    group_id=session_id or connection_id,
+                    dedup_id=request_id,
+                    lane=lane,
+                )
+                print(f"📬 Scheduled generation for {connection_id} via {transport} ({lane} lane)")
+            except Exception:
+                if decision and decision.lease_id:
+                    admission.gate.release(decision.lease_id)
+                raise
             
             return {'statusCode': 200}
+
+        elif route_key == 'cancelMessage':
+            # Flag the message; chatResponseHandler polls the flag while it streams
+            body = json.loads(event.get('body', '{}'))
+            message_id = body.get('message_id')
+            if not message_id:
+                return {'statusCode': 400, 'body': json.dumps({'error': 'cancelMessage requires a message_id'})}
+            if not connections:
+                return {'statusCode': 501, 'body': json.dumps({'error': 'Cancellation is not enabled'})}
+            connections.cancel(connection_id, message_id)
+            print(f"⏹️ Cancel requested for message {message_id} on {connection_id}")
+            return {'statusCode': 200}
             
         else:
             # unrecognized route
@@ -29,6 +29,8 @@ import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import * as events from 'aws-cdk-lib/aws-events';
 import * as targets from 'aws-cdk-lib/aws-events-targets';
 import * as s3n from 'aws-cdk-lib/aws-s3-notifications';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
 
 /**
  * Configuration constants for the Learning Navigator stack
@@ -43,6 +45,26 @@ const CONFIG = {
   DYNAMODB_ESCALATED_QUERIES_TABLE: 'NCMWEscalatedQueries',
   DYNAMODB_USER_PROFILES_TABLE: 'NCMWUserProfiles',
   DYNAMODB_FEEDBACK_TABLE: 'NCMWResponseFeedback',
+  // GSI (session_id, timestamp) on the feedback table, which is managed outside this
+  // stack: create it with scripts/create-feedback-session-index.sh
+  DYNAMODB_FEEDBACK_SESSION_INDEX: 'SessionIndex',
+  DYNAMODB_ANSWER_CACHE_TABLE: 'NCMWAnswerCache',
+  DYNAMODB_SESSION_METADATA_TABLE: 'NCMWSessionMetadata',
+  DYNAMODB_CONNECTIONS_TABLE: 'NCMWWebSocketConnections',
+  DYNAMODB_ADMISSION_TABLE: 'NCMWAdmissionControl',
+  DYNAMODB_ANALYTICS_ROLLUP_TABLE: 'NCMWAnalyticsRollups',
+  // First day (YYYY-MM-DD) the analytics rollups count in full; earlier windows are
+  // counted from the rows, and so is every window while it is empty. Set it to the
+  // day after the rollups were first deployed, or run scripts/backfill-rollups.py
+  // and set the date it prints.
+  ANALYTICS_ROLLUP_SINCE: '',
+  // Session log rows are spread over this many DayIndex partitions per day
+  SESSION_LOGS_DAY_BUCKET_SHARDS: '1',
+  // First day (YYYY-MM-DD) every session log row carries day_bucket; earlier
+  // analytics windows fall back to a scan. Empty: every window scans and
+  // GET /conversations is disabled. Set it to the deploy date on a fresh
+  // deployment, or run scripts/backfill-day-buckets.py on an existing table.
+  SESSION_LOGS_DAY_INDEX_SINCE: '',
 
   // S3 Buckets
   KNOWLEDGE_BASE_BUCKET: 'national-council',
@@ -54,6 +76,10 @@ const CONFIG = {
   LAMBDA_TIMEOUT_SECONDS: 120,
   LAMBDA_TIMEOUT_EMAIL: 120,
 
+  // Generation scheduler: concurrent chatResponseHandler workers per lane
+  GENERATION_WORKERS: 20,
+  PRIORITY_GENERATION_WORKERS: 10,
+
   // Cognito
   COGNITO_PASSWORD_MIN_LENGTH: 8,
 
@@ -214,6 +240,17 @@ export class LearningNavigatorStack extends cdk.Stack {
         billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
       });
 
+      // Rows by UTC day (day_bucket, written by logclassifier) for time-window queries.
+      // Only the small filter attributes are projected: readers fetch query / response
+      // by key for the rows they return, so answer bodies are not copied into the index
+      sessionLogsTable.addGlobalSecondaryIndex({
+        indexName: 'DayIndex',
+        partitionKey: { name: 'day_bucket', type: dynamodb.AttributeType.STRING },
+        sortKey: { name: 'original_ts', type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.INCLUDE,
+        nonKeyAttributes: ['location', 'user_role'],
+      });
+
       /**
        * Escalated Queries Table
        * Stores user queries that require admin follow-up
@@ -244,6 +281,61 @@ export class LearningNavigatorStack extends cdk.Stack {
         billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
       });
 
+      /**
+       * Answer Cache Table
+       * Caches agent answers by normalized query text and user role.
+       * Entries expire via TTL and are invalidated by bumping the KB version item.
+       */
+      const answerCacheTable = new dynamodb.Table(this, 'AnswerCacheTable', {
+        tableName: CONFIG.DYNAMODB_ANSWER_CACHE_TABLE,
+        partitionKey: { name: 'cache_key', type: dynamodb.AttributeType.STRING },
+        timeToLiveAttribute: 'expires_at',
+        removalPolicy: cdk.RemovalPolicy.DESTROY,
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      });
+
+      // Which role context each Bedrock Agent session already holds
+      const sessionMetadataTable = new dynamodb.Table(this, 'SessionMetadataTable', {
+        tableName: CONFIG.DYNAMODB_SESSION_METADATA_TABLE,
+        partitionKey: { name: 'session_id', type: dynamodb.AttributeType.STRING },
+        timeToLiveAttribute: 'expires_at',
+        removalPolicy: cdk.RemovalPolicy.DESTROY,
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      });
+
+      // Open WebSocket connections (written on $connect, removed on $disconnect, TTL 2h)
+      const connectionsTable = new dynamodb.Table(this, 'WebSocketConnectionsTable', {
+        tableName: CONFIG.DYNAMODB_CONNECTIONS_TABLE,
+        partitionKey: { name: 'connection_id', type: dynamodb.AttributeType.STRING },
+        timeToLiveAttribute: 'expires_at',
+        removalPolicy: cdk.RemovalPolicy.DESTROY,
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      });
+
+      // Rate-limit token buckets (per connection / session) and the in-flight generation leases
+      const admissionTable = new dynamodb.Table(this, 'AdmissionControlTable', {
+        tableName: CONFIG.DYNAMODB_ADMISSION_TABLE,
+        partitionKey: { name: 'bucket_key', type: dynamodb.AttributeType.STRING },
+        timeToLiveAttribute: 'expires_at',
+        removalPolicy: cdk.RemovalPolicy.DESTROY,
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      });
+
+      /**
+       * Analytics Rollup Table
+       * Daily and hourly counters (messages, sessions, locations, roles, votes)
+       * maintained by logclassifier and feedback with atomic ADD updates.
+       * Per-day session markers are kept for distinct counts; hourly ones expire via TTL.
+       */
+      const analyticsRollupTable = new dynamodb.Table(this, 'AnalyticsRollupTable', {
+        tableName: CONFIG.DYNAMODB_ANALYTICS_ROLLUP_TABLE,
+        partitionKey: { name: 'rollup', type: dynamodb.AttributeType.STRING },
+        sortKey: { name: 'bucket', type: dynamodb.AttributeType.STRING },
+        timeToLiveAttribute: 'expires_at',
+        removalPolicy: cdk.RemovalPolicy.DESTROY, // TODO: Use RETAIN for production
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      });
+
     const bedrockRoleAgent = new iam.Role(this, 'BedrockRole3', {
       assumedBy: new iam.ServicePrincipal('bedrock.amazonaws.com'),
       managedPolicies: [
@@ -336,6 +428,12 @@ export class LearningNavigatorStack extends cdk.Stack {
         'learner courses', 'administrative procedures', 'National Council programs', 'mental wellness',
         'crisis support', 'Learning Ecosystem navigation', 'data insights', 'chatBOT', 'chatbot'.
 
+      4. The role_context prompt attribute holds detailed guidance for the user's role on the first turn of a
+        session. On later turns it is only the role key; tailor your answer to that role:
+         • instructor: teaching methods, course preparation, certification renewals, instructor resources; peer-to-peer tone.
+         • staff: program rollout, scheduling, certification tracking, budget and ROI; administrative tone.
+         • learner: MHFA basics and ALGEE, registration and certification, practical application, self-care; clear, supportive tone.
+
       Always maintain a helpful, professional, and supportive tone that empowers users in their learning journey.`
       
 
@@ -364,21 +462,36 @@ export class LearningNavigatorStack extends cdk.Stack {
       adminEmail
     );
 
+    /**
+     * Shared Python Layer
+     * `navigator` package (lambda/shared/python) with the lazy AWS client factory and
+     * the streaming, caching and storage helpers; attached to every Python handler
+     */
+    const sharedLayer = new lambda.LayerVersion(this, 'NavigatorSharedLayer', {
+      code: lambda.Code.fromAsset('lambda/shared'),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_12],
+      description: 'Learning Navigator shared Python modules',
+    });
+
     const notificationFn = new lambda.Function(this, 'NotifyAdminFn', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/email'),
+      layers: [sharedLayer],
       architecture: lambdaArchitecture,
       environment: {
         VERIFIED_SOURCE_EMAIL: adminEmail,
         ADMIN_EMAIL: adminEmail,
         ESCALATED_QUERIES_TABLE: escalatedQueriesTable.tableName,
+        // Escalated sessions get their follow-ups scheduled on the priority lane
+        SESSION_TABLE: sessionMetadataTable.tableName,
       },
       timeout: cdk.Duration.seconds(60),
     });
 
     // Grant permissions to write to escalated queries table
     escalatedQueriesTable.grantWriteData(notificationFn);
+    sessionMetadataTable.grantWriteData(notificationFn);
     
     // 2) Create the Action Group
     const notifyActionGroup = new bedrock.AgentActionGroup({
@@ -414,33 +527,124 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/logclassifier'),  
+      layers: [sharedLayer],
       timeout: cdk.Duration.seconds(30),
       environment: {  
         BUCKET:     dashboardLogsBucket.bucketName,
         DYNAMODB_TABLE: sessionLogsTable.tableName,
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+        DAY_BUCKET_SHARDS: CONFIG.SESSION_LOGS_DAY_BUCKET_SHARDS,
       },
     });
 
     sessionLogsTable.grantReadWriteData(logclassifier)
+    analyticsRollupTable.grantReadWriteData(logclassifier);
     dashboardLogsBucket.grantRead(logclassifier);
+
+    /**
+     * Analytics Queue
+     * Chat handlers publish one interaction record per answer; logclassifier
+     * consumes them in batches and writes them with BatchWriteItem
+     */
+    const analyticsDeadLetterQueue = new sqs.Queue(this, 'AnalyticsDeadLetterQueue', {
+      retentionPeriod: cdk.Duration.days(14),
+    });
+
+    const analyticsQueue = new sqs.Queue(this, 'AnalyticsQueue', {
+      // At least 6x the consumer timeout, as recommended for Lambda event sources
+      visibilityTimeout: cdk.Duration.seconds(180),
+      retentionPeriod: cdk.Duration.days(4),
+      deadLetterQueue: { queue: analyticsDeadLetterQueue, maxReceiveCount: 3 },
+    });
+
+    logclassifier.addEventSource(new lambdaEventSources.SqsEventSource(analyticsQueue, {
+      batchSize: 100,
+      maxBatchingWindow: cdk.Duration.seconds(5),
+      reportBatchItemFailures: true,
+    }));
     // Note: Bedrock access removed - logclassifier no longer uses Nova Lite for sentiment/classification
 
     const chatResponseHandler = new lambda.Function(this, 'chatResponseHandler', {
-      runtime: lambda.Runtime.NODEJS_20_X,
-      handler: 'handler.handler',
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/chatResponseHandler'),
       architecture: lambdaArchitecture,
+      layers: [sharedLayer],
       environment: {
         WS_API_ENDPOINT: webSocketStage.callbackUrl,
         AGENT_ID: agent.agentId,
         AGENT_ALIAS_ID: AgentAlias.aliasId,
-        LOG_CLASSIFIER_FN_NAME: logclassifier.functionName
+        LOG_CLASSIFIER_FN_NAME: logclassifier.functionName,
+        ANALYTICS_QUEUE_URL: analyticsQueue.queueUrl,
+        STREAM_MIN_CHARS: '120',
+        STREAM_MAX_DELAY_MS: '250',
+        WS_SEND_WORKERS: '2',
+        WS_SEND_QUEUE_SIZE: '64',
+        ANSWER_CACHE_TABLE: answerCacheTable.tableName,
+        ANSWER_CACHE_TTL_SECONDS: '86400',
+        // Sources are streamed with presigned download URLs (KB bucket read grant below)
+        CITATION_URL_TTL_SECONDS: '3600',
+        // Answers above this size go to S3 and logclassifier gets a reference
+        RESPONSE_SPILL_BUCKET: dashboardLogsBucket.bucketName,
+        RESPONSE_SPILL_CHARS: '100000',
+        // Full role instructions are only sent on a session's first turn
+        SESSION_TABLE: sessionMetadataTable.tableName,
+        // Requests for closed connections or cancelled messages are dropped; checked again while streaming
+        CONNECTIONS_TABLE: connectionsTable.tableName,
+        CONNECTION_CHECK_INTERVAL_MS: '1000',
+        // Releases the concurrency slot taken by websocketHandler; the queue worker renews
+        // it when the generation starts, or takes a new one (same cap as websocketHandler)
+        ADMISSION_TABLE: admissionTable.tableName,
+        MAX_IN_FLIGHT_GENERATIONS: '40',
+        BUSY_RETRY_AFTER_MS: '5000',
+        // Mid-stream agent failures are retried without re-sending delivered text
+        AGENT_MAX_ATTEMPTS: '3',
+        RETRY_BASE_DELAY_MS: '250',
+        RETRY_MAX_DELAY_MS: '4000',
+        RETRY_RESERVE_MS: '20000',
       },
       timeout: cdk.Duration.seconds(120),
     });
 
     knowledgeBaseDataBucket.grantRead(chatResponseHandler);
+    answerCacheTable.grantReadWriteData(chatResponseHandler);
+    sessionMetadataTable.grantReadWriteData(chatResponseHandler);
+    connectionsTable.grantReadWriteData(chatResponseHandler);
+    admissionTable.grantReadWriteData(chatResponseHandler);
+    dashboardLogsBucket.grantPut(chatResponseHandler);
     logclassifier.grantInvoke(chatResponseHandler);
+    analyticsQueue.grantSendMessages(chatResponseHandler);
+
+    /**
+     * Generation Scheduler
+     * websocketHandler enqueues chat generations on FIFO queues grouped by session;
+     * each lane is drained by chatResponseHandler with a bounded worker count.
+     * The priority lane (staff / instructor roles, escalated sessions) has its own
+     * queue and workers so it never waits behind the standard backlog.
+     */
+    const generationLanes = [
+      { id: 'Generation', workers: CONFIG.GENERATION_WORKERS },
+      { id: 'PriorityGeneration', workers: CONFIG.PRIORITY_GENERATION_WORKERS },
+    ].map(({ id, workers }) => {
+      const deadLetterQueue = new sqs.Queue(this, `${id}DeadLetterQueue`, {
+        fifo: true,
+        retentionPeriod: cdk.Duration.days(4),
+      });
+      const queue = new sqs.Queue(this, `${id}Queue`, {
+        fifo: true,
+        // Longer than the worker timeout; an answer that old is not worth a second try
+        visibilityTimeout: cdk.Duration.seconds(180),
+        retentionPeriod: cdk.Duration.hours(1),
+        deadLetterQueue: { queue: deadLetterQueue, maxReceiveCount: 2 },
+      });
+      chatResponseHandler.addEventSource(new lambdaEventSources.SqsEventSource(queue, {
+        batchSize: 1,
+        maxConcurrency: workers,
+        reportBatchItemFailures: true,
+      }));
+      return queue;
+    });
+    const [generationQueue, priorityGenerationQueue] = generationLanes;
 
     chatResponseHandler.role?.addManagedPolicy(
       cdk.aws_iam.ManagedPolicy.fromAwsManagedPolicyName('AmazonBedrockFullAccess'),
@@ -453,14 +657,34 @@ export class LearningNavigatorStack extends cdk.Stack {
     const webSocketHandler = new lambda.Function(this, 'web-socket-handler', {
       runtime: lambda.Runtime.PYTHON_3_12,
       code: lambda.Code.fromAsset('lambda/websocketHandler'),
+      layers: [sharedLayer],
       handler: 'handler.lambda_handler',
       timeout: cdk.Duration.seconds(120),
       environment: {
-        RESPONSE_FUNCTION_ARN: chatResponseHandler.functionArn
+        RESPONSE_FUNCTION_ARN: chatResponseHandler.functionArn,
+        CONNECTIONS_TABLE: connectionsTable.tableName,
+        // Admission control: token buckets per connection / session and a global cap on
+        // generations in flight or queued; rejected messages get a `busy` frame
+        ADMISSION_TABLE: admissionTable.tableName,
+        CONNECTION_RATE_PER_MINUTE: '12',
+        CONNECTION_BURST: '4',
+        SESSION_RATE_PER_MINUTE: '20',
+        SESSION_BURST: '6',
+        MAX_IN_FLIGHT_GENERATIONS: '40',
+        BUSY_RETRY_AFTER_MS: '5000',
+        // Scheduler mode: generations are queued per session instead of invoked directly
+        GENERATION_QUEUE_URL: generationQueue.queueUrl,
+        PRIORITY_QUEUE_URL: priorityGenerationQueue.queueUrl,
+        PRIORITY_ROLES: 'staff,instructor',
+        SESSION_TABLE: sessionMetadataTable.tableName,
       }
     });
 
     chatResponseHandler.grantInvoke(webSocketHandler)
+    connectionsTable.grantReadWriteData(webSocketHandler);
+    admissionTable.grantReadWriteData(webSocketHandler);
+    sessionMetadataTable.grantReadData(webSocketHandler);
+    generationLanes.forEach((queue) => queue.grantSendMessages(webSocketHandler));
 
     const webSocketIntegration = new apigatewayv2_integrations.WebSocketLambdaIntegration('web-socket-integration', webSocketHandler);
 
@@ -471,9 +695,23 @@ export class LearningNavigatorStack extends cdk.Stack {
       }
     );
 
+    // Connection lifecycle feeds the connection registry
+    webSocketApi.addRoute('$connect', { integration: webSocketIntegration });
+    webSocketApi.addRoute('$disconnect', { integration: webSocketIntegration });
+
+    // Stops an in-flight answer; the chat handler notices the flag and sends a `cancelled` frame.
+    // The route response carries the handler's 4xx/501 error bodies back to the client
+    webSocketApi.addRoute('cancelMessage',
+      {
+        integration: webSocketIntegration,
+        returnResponse: true
+      }
+    );
+
     const emailHandler = new lambda.Function(this, 'EmailReplyHandler', {
       runtime: lambda.Runtime.PYTHON_3_12,
       code: lambda.Code.fromAsset('lambda/emailReply'),
+      layers: [sharedLayer],
       handler: 'handler.lambda_handler',
       memorySize: 2048,
       timeout: cdk.Duration.minutes(2),
@@ -645,6 +883,7 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/adminFile'),  
+      layers: [sharedLayer],
       memorySize: 1024,
       timeout: cdk.Duration.seconds(30),
       environment: {
@@ -667,10 +906,18 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/kb-sync'),
-      timeout: cdk.Duration.minutes(5),
+      layers: [sharedLayer],
+      // Waits for the ingestion job to finish (typically 2-5 minutes) before refreshing the answer cache
+      timeout: cdk.Duration.minutes(15),
       environment: {
         KNOWLEDGE_BASE_ID: kb.knowledgeBaseId,
         DATA_SOURCE_ID: knowledgeBaseDataSource.dataSourceId,
+        ANSWER_CACHE_TABLE: answerCacheTable.tableName,
+        // Quick-action answers are regenerated after every completed ingestion
+        AGENT_ID: agent.agentId,
+        AGENT_ALIAS_ID: AgentAlias.aliasId,
+        WARMUP_CONCURRENCY: '3',
+        WARMUP_MIN_INTERVAL_MS: '500',
         // Optional: Add SNS topic ARN for admin notifications if needed
         // ADMIN_NOTIFICATION_TOPIC_ARN: adminNotificationTopic.topicArn,
       },
@@ -690,6 +937,26 @@ export class LearningNavigatorStack extends cdk.Stack {
       ],
     }));
 
+    answerCacheTable.grantReadWriteData(kbSyncLambda);
+
+    // Answer-cache warm-up runs the quick-action queries through the agent
+    kbSyncLambda.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['bedrock:InvokeAgent'],
+      resources: [
+        `arn:aws:bedrock:${this.region}:${this.account}:agent-alias/${agent.agentId}/${AgentAlias.aliasId}`,
+      ],
+    }));
+
+    // Allow kb-sync to hand a long-running ingestion watch off to a fresh invocation of itself
+    kbSyncLambda.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['lambda:InvokeFunction'],
+      resources: [`arn:aws:lambda:${this.region}:${this.account}:function:*KBSyncFunction*`],
+    }));
+
+    // adminFile sync asks kb-sync to watch the ingestion job it started
+    fileHandler.addEnvironment('KB_SYNC_FN_NAME', kbSyncLambda.functionName);
+    kbSyncLambda.grantInvoke(fileHandler);
+
     // Configure S3 bucket to trigger Lambda on PUT and DELETE events
     // Note: Since we're using an imported bucket (fromBucketName), we need to cast it
     // to allow adding event notifications
@@ -777,6 +1044,7 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/sessionLogs'),
+      layers: [sharedLayer],
       timeout: cdk.Duration.seconds(30),
       environment: {
         GROUP_NAME: logGroupNameChatResponseHandler,
@@ -813,20 +1081,32 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code:    lambda.Code.fromAsset('lambda/retrieveSessionLogs'),
-      timeout: cdk.Duration.seconds(10),
+      layers: [sharedLayer],
+      // API Gateway's integration limit; scans past the budget return a continuation token
+      timeout: cdk.Duration.seconds(29),
       environment: {
         DYNAMODB_TABLE: sessionLogsTable.tableName,
         FEEDBACK_TABLE: 'NCMWResponseFeedback',
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+        ROLLUP_SINCE: CONFIG.ANALYTICS_ROLLUP_SINCE,
+        DAY_INDEX: 'DayIndex',
+        DAY_INDEX_SINCE: CONFIG.SESSION_LOGS_DAY_INDEX_SINCE,
+        DAY_BUCKET_SHARDS: CONFIG.SESSION_LOGS_DAY_BUCKET_SHARDS,
+        FEEDBACK_SESSION_INDEX: CONFIG.DYNAMODB_FEEDBACK_SESSION_INDEX,
       },
     });
 
-    // Allow it to read from the sessions table and feedback table
+    // Allow it to read from the sessions table, the rollups and the feedback table
     sessionLogsTable.grantReadData(retrieveSessionLogsFn);
+    analyticsRollupTable.grantReadData(retrieveSessionLogsFn);
 
     // Grant permission to read from feedback table
     retrieveSessionLogsFn.addToRolePolicy(new iam.PolicyStatement({
       actions: ['dynamodb:Scan', 'dynamodb:Query', 'dynamodb:GetItem'],
-      resources: [`arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`],
+      resources: [
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`,
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback/index/*`,
+      ],
     }));
 
     // 2) Hook it into API Gateway
@@ -845,6 +1125,76 @@ export class LearningNavigatorStack extends cdk.Stack {
       authorizationType: apigateway.AuthorizationType.COGNITO,
     });
 
+    // ──────────────────────────────────────────────────────────────────────────────
+    // Conversations API (cursor-paginated browsing, newest first, from the DayIndex)
+    // ──────────────────────────────────────────────────────────────────────────────
+    const conversationsFn = new lambda.Function(this, 'ConversationsFn', {
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'handler.lambda_handler',
+      code:    lambda.Code.fromAsset('lambda/conversations'),
+      layers: [sharedLayer],
+      // Each page is a bounded number of Limit'ed index queries
+      timeout: cdk.Duration.seconds(10),
+      environment: {
+        DYNAMODB_TABLE: sessionLogsTable.tableName,
+        FEEDBACK_TABLE: CONFIG.DYNAMODB_FEEDBACK_TABLE,
+        DAY_INDEX: 'DayIndex',
+        DAY_INDEX_SINCE: CONFIG.SESSION_LOGS_DAY_INDEX_SINCE,
+        DAY_BUCKET_SHARDS: CONFIG.SESSION_LOGS_DAY_BUCKET_SHARDS,
+        FEEDBACK_SESSION_INDEX: CONFIG.DYNAMODB_FEEDBACK_SESSION_INDEX,
+      },
+    });
+
+    sessionLogsTable.grantReadData(conversationsFn);
+    conversationsFn.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['dynamodb:Query'],
+      resources: [
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/${CONFIG.DYNAMODB_FEEDBACK_TABLE}/index/*`,
+      ],
+    }));
+
+    const conversations = AdminApi.root.addResource('conversations');
+    conversations.addMethod('GET', new apigateway.LambdaIntegration(conversationsFn, { proxy: true }), {
+      authorizer:        userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
+    // ──────────────────────────────────────────────────────────────────────────────
+    // Feedback API (thumbs up / down from the chat, vote stats for the dashboard)
+    // ──────────────────────────────────────────────────────────────────────────────
+    const feedbackFn = new lambda.Function(this, 'FeedbackFn', {
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'handler.lambda_handler',
+      code:    lambda.Code.fromAsset('lambda/feedback'),
+      layers: [sharedLayer],
+      timeout: cdk.Duration.seconds(10),
+      environment: {
+        FEEDBACK_TABLE: CONFIG.DYNAMODB_FEEDBACK_TABLE,
+        // Every vote is added to the daily / hourly rollups the analytics endpoint reads
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+      },
+    });
+
+    analyticsRollupTable.grantReadWriteData(feedbackFn);
+    feedbackFn.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['dynamodb:PutItem', 'dynamodb:DeleteItem', 'dynamodb:Scan'],
+      resources: [
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/${CONFIG.DYNAMODB_FEEDBACK_TABLE}`,
+      ],
+    }));
+
+    const feedback = AdminApi.root.addResource('feedback');
+    const feedbackIntegration = new apigateway.LambdaIntegration(feedbackFn, { proxy: true });
+
+    // POST /feedback - Votes come from the public chat, which has no Cognito session
+    feedback.addMethod('POST', feedbackIntegration);
+
+    // GET /feedback - Vote statistics
+    feedback.addMethod('GET', feedbackIntegration, {
+      authorizer:        userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
     // ──────────────────────────────────────────────────────────────────────────────
     // Escalated Queries API (Admin email notifications management)
     // ──────────────────────────────────────────────────────────────────────────────
@@ -852,6 +1202,7 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code:    lambda.Code.fromAsset('lambda/escalatedQueries'),
+      layers: [sharedLayer],
       timeout: cdk.Duration.seconds(10),
       environment: {
         ESCALATED_QUERIES_TABLE: escalatedQueriesTable.tableName,
@@ -866,6 +1217,7 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.update_query_status',
       code:    lambda.Code.fromAsset('lambda/escalatedQueries'),
+      layers: [sharedLayer],
       timeout: cdk.Duration.seconds(10),
       environment: {
         ESCALATED_QUERIES_TABLE: escalatedQueriesTable.tableName,
@@ -911,6 +1263,7 @@ export class LearningNavigatorStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/userProfile'),
+      layers: [sharedLayer],
       timeout: cdk.Duration.seconds(30),
       environment: {
         USER_PROFILE_TABLE: userProfileTable.tableName,
@@ -18,18 +18,15 @@ import {
   People as PeopleIcon,
   QuestionAnswer as QuestionIcon,
 } from "@mui/icons-material";
-import axios from "axios";
 
 import AdminAppHeader from "./AdminAppHeader";
-import { DOCUMENTS_API } from "../utilities/constants";
 import { getIdToken } from "../utilities/auth";
+import { fetchSessionLogs } from "../utilities/sessionLogs";
 import AccessibleColors from "../utilities/accessibleColors";
 
 /* ------------------------------------------------------------------ */
 /*  Constants                                                          */
 /* ------------------------------------------------------------------ */
-const ANALYTICS_API = `${DOCUMENTS_API}session-logs`;
-
 const defaultCategories = [
   "Training & Courses",
   "Instructor Certification",
@@ -61,10 +58,7 @@ export default function AdminAnalytics() {
     async function fetchAnalytics() {
       try {
         const token = await getIdToken();
-        const { data } = await axios.get(ANALYTICS_API, {
-          params: { timeframe },
-          headers: { Authorization: `Bearer ${token}` },
-        });
+        const data = await fetchSessionLogs({ timeframe }, token);
 
         // normalize categories
         const counts = {};
@@ -34,14 +34,11 @@ import {
   CartesianGrid,
   Tooltip
 } from "recharts";
-import axios from "axios";
-import { DOCUMENTS_API } from "../utilities/constants";
 import { getIdToken, logout } from "../utilities/auth";
+import { fetchSessionLogs } from "../utilities/sessionLogs";
 import MHFALogo from "../Assets/mhfa_logo.png";
 import AccessibleColors from "../utilities/accessibleColors";
 
-const ANALYTICS_API = `${DOCUMENTS_API}session-logs`;
-
 function AdminDashboard() {
   const navigate = useNavigate();
   const location = useLocation();
@@ -85,17 +82,14 @@ function AdminDashboard() {
         const dateStr = date.toISOString().split('T')[0];
 
         promises.push(
-          axios.get(ANALYTICS_API, {
-            params: {
-              timeframe: 'custom',
-              start_date: dateStr,
-              end_date: dateStr
-            },
-            headers: { Authorization: `Bearer ${token}` },
-          }).then(response => ({
+          fetchSessionLogs({
+            timeframe: 'custom',
+            start_date: dateStr,
+            end_date: dateStr
+          }, token).then(data => ({
             date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
-            queries: response.data.user_count || 0,
-            rawData: response.data
+            queries: data.user_count || 0,
+            rawData: data
           })).catch(() => ({
             date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
             queries: 0,
@@ -108,10 +102,7 @@ function AdminDashboard() {
       setUsageTrends(results);
 
       // Fetch today's data for the metric cards
-      const { data } = await axios.get(ANALYTICS_API, {
-        params: { timeframe: 'today' },
-        headers: { Authorization: `Bearer ${token}` },
-      });
+      const data = await fetchSessionLogs({ timeframe: 'today' }, token);
 
       // Calculate total queries including neutral (no feedback) conversations
       const totalSentiment = (data.sentiment?.positive || 0) +
@@ -35,9 +35,8 @@ import {
   Analytics as AnalyticsIcon,
 } from "@mui/icons-material";
 import { useNavigate } from "react-router-dom";
-import axios from "axios";
-import { DOCUMENTS_API } from "../utilities/constants";
 import { getIdToken } from "../utilities/auth";
+import { fetchSessionLogs } from "../utilities/sessionLogs";
 import AdminAppHeader from "./AdminAppHeader";
 import {
   PieChart,
@@ -55,8 +54,6 @@ import {
   AreaChart,
 } from "recharts";
 
-const ANALYTICS_API = `${DOCUMENTS_API}session-logs`;
-
 // Chart color schemes
 const SENTIMENT_COLORS = {
   positive: '#4CAF50',
@@ -84,10 +81,7 @@ function AdminDashboardSimple() {
     try {
       setLoading(true);
       const token = await getIdToken();
-      const { data } = await axios.get(ANALYTICS_API, {
-        params: { timeframe: timeframe },
-        headers: { Authorization: `Bearer ${token}` },
-      });
+      const data = await fetchSessionLogs({ timeframe: timeframe }, token);
 
       console.log('📊 Admin Analytics Data:', data);
       console.log('📊 Sentiment Counts:', data.sentiment);
@@ -378,8 +378,11 @@ function BotFileCheckReply({ message, fileName, fileStatus, citations, isLoading
                             if (ref.source) {
                               try {
                                 console.log('🔵 Citation clicked, source:', ref.source);
-                                // If S3 URI, fetch presigned URL from backend
-                                if (ref.source.startsWith('s3://')) {
+                                if (ref.url && ref.url_expires_at > Date.now()) {
+                                  // Presigned while the answer streamed and still valid
+                                  window.open(ref.url, '_blank', 'noopener,noreferrer');
+                                } else if (ref.source.startsWith('s3://')) {
+                                  // If S3 URI, fetch presigned URL from backend
                                   console.log('🔵 Fetching presigned URL for S3 URI...');
                                   const response = await axios.post(
                                     `${DOCUMENTS_API}presigned-url`,
@@ -94,6 +94,7 @@ function ChatBody() {
   const [userRole, setUserRole] = useState(null);
 
   const scrollRef = useRef(null);
+  const activeRequestRef = useRef(null);                          // { socket, messageId } of the answer in flight
 
   /* ───────────────────────── Check for user role on mount ──────────────── */
   useEffect(() => {
@@ -141,6 +142,18 @@ function ChatBody() {
       )
     );
 
+  // Keep the presigned URLs that arrived in `citations` frames on the final citations
+  const withStreamedLinks = (citations, streamed = []) => {
+    const links = {};
+    streamed.forEach((c) => (c.references || []).forEach((ref) => {
+      if (ref.url) links[ref.source] = { url: ref.url, url_expires_at: ref.url_expires_at };
+    }));
+    return citations.map((c) => ({
+      ...c,
+      references: (c.references || []).map((ref) => ({ ...ref, ...links[ref.source] })),
+    }));
+  };
+
   // Reset chat conversation (used when switching languages)
   const resetChat = () => {
     setMessages([]);
@@ -171,7 +184,9 @@ function ChatBody() {
   const askBot = (question) => {
     const authToken = localStorage.getItem("authToken") || "";
     const socket = new WebSocket(`${WEBSOCKET_API}?token=${authToken}`);
+    const messageId = uuidv4(); // Lets the user cancel this answer (cancelMessage)
     let streamedText = ""; // Accumulate all chunks
+    activeRequestRef.current = { socket, messageId };
 
     socket.onopen = () => {
       const payload = {
@@ -179,6 +194,7 @@ function ChatBody() {
         querytext:  question,
         session_id: sessionId,
         user_role:  userRole || "guest", // Include user role for personalization
+        message_id: messageId,
       };
       console.log("🔵 Sent payload with role:", payload);
       socket.send(JSON.stringify(payload));
@@ -217,6 +233,50 @@ function ChatBody() {
               scrollRef.current.scrollIntoView({ behavior: 'smooth', block: 'end' });
             }
           });
+        } else if (data.type === 'citations') {
+          // Sources found while the answer is still streaming (with presigned download URLs)
+          setMessages((prev) =>
+            prev.map((m) =>
+              m.status === "PROCESSING" || m.status === "STREAMING"
+                ? {
+                    ...m,
+                    citations: [...(m.citations || []), { text: "", references: data.references || [] }]
+                  }
+                : m
+            )
+          );
+        } else if (data.type === 'reset') {
+          // A retried answer diverged from what was streamed: start the message over
+          streamedText = "";
+          setMessages((prev) =>
+            prev.map((m) =>
+              m.status === "STREAMING" ? { ...m, content: "" } : m
+            )
+          );
+        } else if (data.type === 'busy') {
+          // Rejected by admission control (rate limit or capacity); nothing was generated
+          const seconds = Math.max(1, Math.ceil((data.retry_after_ms || 0) / 1000));
+          replaceProcessing(
+            `The assistant is handling many questions right now. Please try again in ${seconds} second${seconds === 1 ? "" : "s"}.`
+          );
+          setProcessing(false);
+          socket.close();
+        } else if (data.type === 'cancelled') {
+          // Stopped by the user: keep whatever was streamed so far
+          setMessages((prev) =>
+            prev.map((m) =>
+              m.status === "STREAMING" || m.status === "PROCESSING"
+                ? {
+                    ...m,
+                    content: streamedText || "Response stopped.",
+                    status: "RECEIVED",
+                    citations: m.citations || []
+                  }
+                : m
+            )
+          );
+          setProcessing(false);
+          socket.close();
         } else if (data.type === 'complete') {
           // Complete message with citations
           const { responsetext, citations } = data;
@@ -227,9 +287,9 @@ function ChatBody() {
               m.status === "STREAMING" || m.status === "PROCESSING"
                 ? {
                     ...m,
-                    content: responsetext,
+                    content: responsetext ?? streamedText, // null for answers too long to resend
                     status: "RECEIVED",
-                    citations: citations || []
+                    citations: withStreamedLinks(citations || [], m.citations)
                   }
                 : m
             )
@@ -271,9 +331,19 @@ function ChatBody() {
 
     socket.onclose = (e) => {
       console.log(`🟠 Socket closed (${e.code})`);
+      if (activeRequestRef.current?.socket === socket) {
+        activeRequestRef.current = null;
+      }
     };
   };
 
+  /* Ask the backend to stop the answer in flight; it replies with a `cancelled` frame */
+  const handleStop = () => {
+    const active = activeRequestRef.current;
+    if (!active || active.socket.readyState !== WebSocket.OPEN) return;
+    active.socket.send(JSON.stringify({ action: "cancelMessage", message_id: active.messageId }));
+  };
+
   /* ────────────────────── suggested prompts (role-based) ─────────────────────────── */
   const getSuggestedPrompts = () => {
     // Return role-specific prompts based on user role
@@ -996,6 +1066,7 @@ function ChatBody() {
               <Box flex={1}>
                 <ChatInput
                   onSendMessage={handleSend}
+                  onStop={handleStop}
                   processing={processing}
                   message={inputValue}
                   setMessage={setInputValue}
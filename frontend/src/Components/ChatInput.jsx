@@ -1,11 +1,12 @@
 import React, { useState, useRef, useEffect } from "react";
 import { TextField, Box, IconButton, CircularProgress, Tooltip } from "@mui/material";
 import SendIcon from "@mui/icons-material/Send";
+import StopIcon from "@mui/icons-material/Stop";
 import MicIcon from "@mui/icons-material/Mic";
 import MicOffIcon from "@mui/icons-material/MicOff";
 import { useTheme } from "@mui/material/styles";
 
-function ChatInput({ onSendMessage, processing, message, setMessage }) {
+function ChatInput({ onSendMessage, onStop, processing, message, setMessage }) {
   const [isFocused, setIsFocused] = useState(false);
   const [isListening, setIsListening] = useState(false);
   const [speechSupported, setSpeechSupported] = useState(false);
@@ -62,6 +63,9 @@ function ChatInput({ onSendMessage, processing, message, setMessage }) {
     }
   };
 
+  // While an answer is generating, the send button becomes a stop button (when supported)
+  const canStop = processing && Boolean(onStop);
+
   const toggleSpeechRecognition = () => {
     if (!recognitionRef.current) return;
 
@@ -200,9 +204,9 @@ function ChatInput({ onSendMessage, processing, message, setMessage }) {
       )}
 
       <IconButton
-        aria-label="send"
-        disabled={processing || !message?.trim()}
-        onClick={handleSendMessage}
+        aria-label={canStop ? "stop" : "send"}
+        disabled={canStop ? false : processing || !message?.trim()}
+        onClick={canStop ? onStop : handleSendMessage}
         sx={{
           backgroundColor: theme.palette.primary.main,
           color: "white",
@@ -226,7 +230,9 @@ function ChatInput({ onSendMessage, processing, message, setMessage }) {
           },
         }}
       >
-        {processing ? (
+        {canStop ? (
+          <StopIcon sx={{ fontSize: { xs: 20, sm: 22, md: 24 } }} />
+        ) : processing ? (
           <CircularProgress size={{ xs: 20, sm: 22, md: 24 }} sx={{ color: 'white' }} />
         ) : (
           <SendIcon sx={{ fontSize: { xs: 20, sm: 22, md: 24 } }} />
@@ -31,14 +31,11 @@ import {
   SentimentNeutral as NeutralIcon,
   SentimentVeryDissatisfied as SadIcon,
 } from "@mui/icons-material";
-import axios from "axios";
 import AdminAppHeader from "./AdminAppHeader";
-import { DOCUMENTS_API } from "../utilities/constants";
 import { getIdToken } from "../utilities/auth";
+import { fetchSessionLogs } from "../utilities/sessionLogs";
 import AccessibleColors from "../utilities/accessibleColors";
 
-const ANALYTICS_API = `${DOCUMENTS_API}session-logs`;
-
 const sentimentColors = {
   positive: "#4CAF50",
   neutral: "#FFC107",
@@ -70,10 +67,7 @@ function ConversationLogs() {
       setLoading(true);
       setError("");
       const token = await getIdToken();
-      const { data } = await axios.get(ANALYTICS_API, {
-        params: { timeframe },
-        headers: { Authorization: `Bearer ${token}` },
-      });
+      const data = await fetchSessionLogs({ timeframe }, token);
 
       setConversations(data.conversations || []);
       setSentiment(data.sentiment || {});
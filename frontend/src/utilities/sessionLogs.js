@@ -0,0 +1,33 @@
+// Session log analytics (GET /session-logs)
+import axios from 'axios';
+import { DOCUMENTS_API } from './constants';
+
+export const ANALYTICS_API = `${DOCUMENTS_API}session-logs`;
+
+// Continuations followed before the totals read so far are shown as they are
+const MAX_CONTINUATIONS = 10;
+
+/**
+ * Fetches the analytics of a window. When the backend runs out of time before it has
+ * read the whole window it answers `partial: true` with a `next_token`; the token
+ * carries the totals so far, so the response to the last continuation covers the
+ * whole window.
+ * @param {object} params - Query parameters (timeframe, start_date, end_date)
+ * @param {string} token - ID token for the Authorization header
+ * @returns {Promise<object>} The last response; `partial` is still true if the window
+ *   was not finished within MAX_CONTINUATIONS
+ */
+export async function fetchSessionLogs(params, token) {
+  const headers = { Authorization: `Bearer ${token}` };
+  let { data } = await axios.get(ANALYTICS_API, { params, headers });
+  for (let i = 0; data.partial && data.next_token && i < MAX_CONTINUATIONS; i++) {
+    ({ data } = await axios.get(ANALYTICS_API, {
+      params: { continuation_token: data.next_token },
+      headers,
+    }));
+  }
+  if (data.partial) {
+    console.warn('[ANALYTICS] Window not fully read; showing the totals so far', params);
+  }
+  return data;
+}
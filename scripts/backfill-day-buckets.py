@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Day Bucket Backfill Script
+Stamps `day_bucket` on session log rows written before logclassifier set it, so
+they are in the DayIndex GSI and the analytics and conversations endpoints can
+read every day from the index. Rows that already have a `day_bucket` are left
+alone, and rows deleted meanwhile are not re-created (conditional updates), so
+it is safe to run against a live table and to re-run.
+
+When it finishes it prints the first day of the table: set
+SESSION_LOGS_DAY_INDEX_SINCE in the stack config to it and redeploy.
+
+--shards must match SESSION_LOGS_DAY_BUCKET_SHARDS. Large tables can be split
+over several copies with --segment / --total-segments.
+
+Usage:
+    python scripts/backfill-day-buckets.py [--table NCMWDashboardSessionlogs] [--region us-west-2] [--shards 1] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk_backend", "lambda", "shared", "python"))
+
+import boto3  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+from navigator.session_logs import day_bucket, scan_pages  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", default="NCMWDashboardSessionlogs", help="session log table name")
+    parser.add_argument("--region", default="us-west-2", help="AWS region")
+    parser.add_argument("--shards", type=int, default=1, help="SESSION_LOGS_DAY_BUCKET_SHARDS")
+    parser.add_argument("--segment", type=int, default=0, help="scan segment run by this copy")
+    parser.add_argument("--total-segments", type=int, default=1, help="copies the scan is split over")
+    parser.add_argument("--dry-run", action="store_true", help="count the rows without updating them")
+    args = parser.parse_args()
+
+    table = boto3.resource("dynamodb", region_name=args.region).Table(args.table)
+    scan_kwargs = {
+        "ProjectionExpression": "session_id, #ts, original_ts, day_bucket",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    if args.total_segments > 1:
+        scan_kwargs.update(Segment=args.segment, TotalSegments=args.total_segments)
+
+    stamped, present, skipped, gone = 0, 0, 0, 0
+    first_day = None
+    print(f"ℹ️  Backfilling day_bucket on {args.table} in {args.region} "
+          f"(shards: {args.shards}{', dry run' if args.dry_run else ''})...")
+    for page in scan_pages(table, **scan_kwargs):
+        for row in page:
+            original_ts = row.get("original_ts")
+            if not isinstance(original_ts, str) or len(original_ts) < 10:
+                skipped += 1
+                continue
+            first_day = min(first_day or original_ts[:10], original_ts[:10])
+            if row.get("day_bucket"):
+                present += 1
+                continue
+            if not args.dry_run:
+                try:
+                    table.update_item(
+                        Key={"session_id": row["session_id"], "timestamp": row["timestamp"]},
+                        UpdateExpression="SET day_bucket = :bucket",
+                        ConditionExpression="attribute_exists(session_id) AND attribute_not_exists(day_bucket)",
+                        ExpressionAttributeValues={":bucket": day_bucket(original_ts, row["session_id"], args.shards)},
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    gone += 1
+                    continue
+            stamped += 1
+        print(f"   {stamped} stamped, {present} already had day_bucket")
+
+    print(f"✅ {stamped} rows {'to stamp' if args.dry_run else 'stamped'}, {present} already had day_bucket, "
+          f"{gone} changed meanwhile, {skipped} without original_ts (not indexable)")
+    if first_day and not args.dry_run and args.total_segments == 1:
+        print(f"ℹ️  Set SESSION_LOGS_DAY_INDEX_SINCE to '{first_day}' and redeploy")
+    elif first_day:
+        print(f"ℹ️  First day seen: {first_day}")
+
+
+if __name__ == "__main__":
+    main()
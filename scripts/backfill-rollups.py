@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Analytics Rollup Backfill Script
+Recomputes the daily and hourly analytics rollups for the days before --until
+(default: today, UTC) from the session log and feedback tables. After that,
+the analytics endpoint can read its totals from the rollups even for windows
+that start before the rollups were deployed.
+
+Those days' counters and session markers are overwritten, not added to, so
+the script is safe to re-run. Days from --until on are left to the live
+writers (logclassifier and feedback). Votes are counted the way the feedback
+handler counts them: each message's newest vote, on the day it was cast.
+
+Run it once the day the rollups were deployed has passed, because that day
+was only partly counted live. Then set ANALYTICS_ROLLUP_SINCE in the stack
+config to the first day it prints, and redeploy.
+
+Usage:
+    python scripts/backfill-rollups.py [--sessions-table NCMWDashboardSessionlogs] [--feedback-table NCMWResponseFeedback] [--rollup-table NCMWAnalyticsRollups] [--region us-west-2] [--until YYYY-MM-DD] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk_backend", "lambda", "shared", "python"))
+
+import boto3  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+from navigator.rollups import SESSIONS, VOTES, day_key, hour_key, interaction_deltas  # noqa: E402
+from navigator.session_logs import scan_pages  # noqa: E402
+
+
+def pair(key):
+    return key["rollup"], key["bucket"]
+
+
+def buckets(timestamp):
+    """('YYYY-MM-DD', 'HH') of an ISO timestamp, or None when it is not one."""
+    try:
+        ts = datetime.fromisoformat(timestamp.split("#")[0])
+    except (AttributeError, ValueError):
+        return None
+    return ts.strftime("%Y-%m-%d"), ts.strftime("%H")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions-table", default="NCMWDashboardSessionlogs", help="session log table name")
+    parser.add_argument("--feedback-table", default="NCMWResponseFeedback", help="feedback table name")
+    parser.add_argument("--rollup-table", default="NCMWAnalyticsRollups", help="rollup table name")
+    parser.add_argument("--region", default="us-west-2", help="AWS region")
+    parser.add_argument("--until", default=datetime.utcnow().strftime("%Y-%m-%d"),
+                        help="first day NOT recomputed (YYYY-MM-DD, default today)")
+    parser.add_argument("--dry-run", action="store_true", help="count without writing")
+    args = parser.parse_args()
+
+    ddb = boto3.resource("dynamodb", region_name=args.region)
+    counters = defaultdict(Counter)          # (rollup, bucket) -> counters
+    day_sessions = defaultdict(set)          # day -> session ids
+    hour_sessions = defaultdict(set)         # (day, hour) -> session ids
+
+    # 1) Conversations, as logclassifier adds them
+    print(f"ℹ️  Reading {args.sessions_table} (days before {args.until})...")
+    rows, skipped = 0, 0
+    for page in scan_pages(ddb.Table(args.sessions_table),
+                           ProjectionExpression="session_id, original_ts, #loc, user_role",
+                           ExpressionAttributeNames={"#loc": "location"}):
+        for row in page:
+            found = buckets(row.get("original_ts"))
+            if not found:
+                skipped += 1
+                continue
+            day, hour = found
+            if day >= args.until:
+                continue
+            deltas = interaction_deltas(row)
+            counters[pair(day_key(day))].update(deltas)
+            counters[pair(hour_key(day, hour))].update(deltas)
+            if row.get("session_id"):
+                day_sessions[day].add(row["session_id"])
+                hour_sessions[(day, hour)].add(row["session_id"])
+            rows += 1
+    for day, sessions in day_sessions.items():
+        counters[pair(day_key(day))][SESSIONS] = len(sessions)
+    for (day, hour), sessions in hour_sessions.items():
+        counters[pair(hour_key(day, hour))][SESSIONS] = len(sessions)
+
+    # 2) Votes: the newest feedback row of each message, on the day it was cast
+    print(f"ℹ️  Reading {args.feedback_table}...")
+    newest = {}
+    for page in scan_pages(ddb.Table(args.feedback_table),
+                           ProjectionExpression="message_id, #ts, feedback",
+                           ExpressionAttributeNames={"#ts": "timestamp"}):
+        for row in page:
+            message_id, ts = row.get("message_id"), row.get("timestamp", "")
+            if message_id and ts >= newest.get(message_id, ("", None))[0]:
+                newest[message_id] = (ts, row.get("feedback"))
+    votes = []
+    for message_id, (ts, feedback) in newest.items():
+        found = buckets(ts)
+        if feedback not in VOTES or not found or found[0] >= args.until:
+            continue
+        day, hour = found
+        counters[pair(day_key(day))][feedback] += 1
+        counters[pair(hour_key(day, hour))][feedback] += 1
+        votes.append((message_id, feedback, day, hour))
+
+    days = sorted(bucket for rollup, bucket in counters if rollup.startswith("day#"))
+    print(f"   {rows} conversations in {len(days)} days, {len(votes)} votes, {skipped} rows without original_ts")
+    if not days:
+        print("ℹ️  Nothing to backfill")
+        return
+    if args.dry_run:
+        print(f"✅ Dry run: {len(counters)} rollup items and {sum(map(len, day_sessions.values()))} session markers "
+              f"from {days[0]} to {days[-1]}")
+        return
+
+    # 3) Overwrite the counters and the day session markers; add the missing vote markers
+    rollups = ddb.Table(args.rollup_table)
+    with rollups.batch_writer(overwrite_by_pkeys=["rollup", "bucket"]) as writer:
+        for (rollup, bucket), values in counters.items():
+            writer.put_item(Item={"rollup": rollup, "bucket": bucket, **{k: n for k, n in values.items() if n}})
+        for day, sessions in day_sessions.items():
+            for session_id in sessions:
+                writer.put_item(Item={"rollup": f"sessions#{day}", "bucket": session_id})
+    kept = 0
+    for message_id, feedback, day, hour in votes:
+        try:
+            rollups.put_item(
+                Item={"rollup": f"vote#{message_id}", "bucket": "vote", "feedback": feedback, "day": day, "hour": hour},
+                ConditionExpression="attribute_not_exists(#r)",
+                ExpressionAttributeNames={"#r": "rollup"},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            kept += 1   # already recorded by the feedback handler
+
+    print(f"✅ {len(counters)} rollup items rewritten from {days[0]} to {days[-1]}, "
+          f"{len(votes) - kept} vote markers added ({kept} already live)")
+    print(f"ℹ️  Set ANALYTICS_ROLLUP_SINCE to '{days[0]}' and redeploy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/bin/bash
+
+# Feedback Session Index Script
+# Adds the SessionIndex GSI (session_id + timestamp) to the feedback table, which
+# the analytics endpoint queries per session instead of scanning every vote.
+# The feedback table is not managed by the CDK stack, so the index is created here.
+#
+# Usage:
+#   ./create-feedback-session-index.sh [--table NCMWResponseFeedback] [--region us-west-2] [--wait]
+
+set -e
+
+# Colors
+GREEN='\033[0;32m'
+RED='\033[0;31m'
+BLUE='\033[0;34m'
+YELLOW='\033[1;33m'
+NC='\033[0m'
+
+print_success() { echo -e "${GREEN}✅ $1${NC}"; }
+print_error() { echo -e "${RED}❌ $1${NC}"; }
+print_info() { echo -e "${BLUE}ℹ️  $1${NC}"; }
+print_warning() { echo -e "${YELLOW}⚠️  $1${NC}"; }
+
+# Default values
+REGION="us-west-2"
+TABLE="NCMWResponseFeedback"
+INDEX="SessionIndex"
+WAIT=false
+
+# Parse arguments
+while [[ $# -gt 0 ]]; do
+    case $1 in
+        --table)
+            TABLE="$2"
+            shift 2
+            ;;
+        --region)
+            REGION="$2"
+            shift 2
+            ;;
+        --wait)
+            WAIT=true
+            shift
+            ;;
+        --help)
+            echo "Usage: ./create-feedback-session-index.sh [OPTIONS]"
+            echo ""
+            echo "Optional:"
+            echo "  --table     Feedback table name (default: NCMWResponseFeedback)"
+            echo "  --region    AWS region (default: us-west-2)"
+            echo "  --wait      Wait until the index is ACTIVE"
+            exit 0
+            ;;
+        *)
+            print_error "Unknown option: $1"
+            exit 1
+            ;;
+    esac
+done
+
+EXISTING=$(aws dynamodb describe-table --table-name "$TABLE" --region "$REGION" \
+    --query "Table.GlobalSecondaryIndexes[?IndexName=='$INDEX'].IndexStatus" --output text)
+if [ -n "$EXISTING" ] && [ "$EXISTING" != "None" ]; then
+    print_warning "$INDEX already exists on $TABLE ($EXISTING)"
+    exit 0
+fi
+
+BILLING=$(aws dynamodb describe-table --table-name "$TABLE" --region "$REGION" \
+    --query "Table.BillingModeSummary.BillingMode" --output text)
+THROUGHPUT=""
+if [ "$BILLING" != "PAY_PER_REQUEST" ]; then
+    # Provisioned tables need capacity for the index too
+    THROUGHPUT=',"ProvisionedThroughput":{"ReadCapacityUnits":5,"WriteCapacityUnits":5}'
+fi
+
+print_info "Creating $INDEX on $TABLE in $REGION..."
+aws dynamodb update-table \
+    --table-name "$TABLE" \
+    --region "$REGION" \
+    --attribute-definitions \
+        AttributeName=session_id,AttributeType=S \
+        AttributeName=timestamp,AttributeType=S \
+    --global-secondary-index-updates \
+        "[{\"Create\":{\"IndexName\":\"$INDEX\",\"KeySchema\":[{\"AttributeName\":\"session_id\",\"KeyType\":\"HASH\"},{\"AttributeName\":\"timestamp\",\"KeyType\":\"RANGE\"}],\"Projection\":{\"ProjectionType\":\"INCLUDE\",\"NonKeyAttributes\":[\"feedback\"]}$THROUGHPUT}}]" \
+    > /dev/null
+
+if [ "$WAIT" = true ]; then
+    print_info "Waiting for $INDEX to backfill..."
+    while true; do
+        STATUS=$(aws dynamodb describe-table --table-name "$TABLE" --region "$REGION" \
+            --query "Table.GlobalSecondaryIndexes[?IndexName=='$INDEX'].IndexStatus" --output text)
+        [ "$STATUS" = "ACTIVE" ] && break
+        echo "   status: $STATUS"
+        sleep 15
+    done
+fi
+
+print_success "$INDEX requested on $TABLE"
+print_info "Until it is ACTIVE the analytics endpoint keeps scanning the feedback table"